@@ -0,0 +1,46 @@
+"""
+Shared fixtures for the benchmark suite.
+
+The pipeline benchmarks run against deterministic stand-ins from
+``imagecoderx.testing``: a local fake Ollama server (selected through
+``ollama_host`` in a temporary ~/.imagecoderx.json) and a fake ``tesseract``
+on PATH. Results are saved under ``.benchmarks/`` with the commit they were
+taken at; compare against an earlier run with e.g.::
+
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:15%
+"""
+import json
+import os
+
+import pytest
+
+from imagecoderx.testing import FakeOllamaServer, install_fake_tesseract
+
+
+@pytest.fixture(scope="session")
+def fake_ollama():
+    with FakeOllamaServer(latency=0.002) as server:
+        yield server
+
+
+def write_config(home, **overrides):
+    """Writes ~/.imagecoderx.json for the fake services under ``home``."""
+    config = {
+        "ollama_model": "fake",
+        "image_interpretation_prompt": "Refine the following code/text...",
+    }
+    config.update(overrides)
+    (home / ".imagecoderx.json").write_text(json.dumps(config))
+
+
+@pytest.fixture
+def fake_env(tmp_path, monkeypatch, fake_ollama):
+    """Points the pipeline at the fake services and returns the temporary directory."""
+    home = tmp_path / "home"
+    home.mkdir()
+    write_config(home, ollama_host=fake_ollama.url)
+    monkeypatch.setenv("HOME", str(home))
+    bin_dir = tmp_path / "bin"
+    install_fake_tesseract(str(bin_dir))
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    return tmp_path
@@ -0,0 +1,32 @@
+"""
+Asset writing throughput: serial vs thread-pool encoding of extracted regions.
+"""
+import numpy as np
+import pytest
+
+from imagecoderx.engine.asset_writer import AssetWriter
+from imagecoderx.engine.regions import RegionSet
+
+
+def make_regions(count=32):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, size=(2160, 3840, 3), dtype=np.uint8)
+    boxes = [((i % 8) / 8, (i // 8) / 4, 1 / 8, 1 / 4) for i in range(count)]
+    return RegionSet.from_boxes(boxes, image=img)
+
+
+@pytest.mark.parametrize("workers", [1, None])
+@pytest.mark.parametrize("format", ["png", "webp"])
+def test_write_regions(benchmark, tmp_path, workers, format):
+    regions = make_regions()
+
+    def run():
+        # Fresh directory every round so nothing is skipped as unchanged
+        out = tmp_path / str(run.round)
+        run.round += 1
+        with AssetWriter(str(out), format=format, compression=1, max_workers=workers) as writer:
+            for region in regions:
+                writer.submit(f"region_{region.index}", region.crop, region=region)
+
+    run.round = 0
+    benchmark.pedantic(run, rounds=3)
@@ -0,0 +1,34 @@
+"""
+Benchmarks of the page IR and the per-format emitters on a merged page of
+synthetic region snippets, i.e. the cost of each extra output format.
+"""
+import pytest
+
+from imagecoderx.engine.emitters import EMITTERS
+from imagecoderx.engine.html_orchestrator import combine_html_sections
+from imagecoderx.engine.page_ir import build_page_ir
+from imagecoderx.engine.regions import RegionSet
+from imagecoderx.testing import WORDS
+
+
+def merged_page(count=40):
+    boxes = [((i % 8) / 8, (i // 8) / 5, 0.1, 0.15) for i in range(count)]
+    regions = RegionSet.from_boxes(boxes)
+    for region in regions:
+        words = " ".join(WORDS[(region.index + j) % len(WORDS)] for j in range(6))
+        region.code = (f'<body><h2 style="font-size:20px; color:#333">{words[:12]}</h2>'
+                       f'<p class="text">{words}<br>{words}</p><button>Go</button></body>')
+    return combine_html_sections(regions)
+
+
+def test_build_page_ir(benchmark):
+    html = merged_page()
+    page = benchmark(build_page_ir, html)
+    benchmark.extra_info["sections"] = len(page.body.children)
+
+
+@pytest.mark.parametrize("output_format", EMITTERS)
+def test_emit(benchmark, output_format):
+    page = build_page_ir(merged_page())
+    code = benchmark(EMITTERS[output_format], page)
+    benchmark.extra_info["bytes"] = len(code)
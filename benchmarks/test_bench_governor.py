@@ -0,0 +1,40 @@
+"""
+Throughput of parallel CPU work with and without the resource governor.
+
+Several worker processes run ``detect_text_regions`` (OpenCV-heavy) at once.
+Ungoverned, every process sizes OpenCV's pool to all cores; with the
+"throughput" preset each worker is single-threaded and pinned to its own
+cores. The gap grows with the core count of the machine; on one core both
+cases do the same work.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from imagecoderx import core, governor
+from imagecoderx.testing import synthetic_screenshot
+
+JOBS = 12
+
+
+def detect(size):
+    img = synthetic_screenshot(*size, regions=40, words_per_region=6)
+    return len(core.detect_text_regions(img))
+
+
+@pytest.mark.parametrize("preset", ["default", "latency", "throughput"])
+def test_parallel_detection(benchmark, preset):
+    workers = max(2, len(governor.available_cores()))
+    options = {}
+    if preset == "latency":
+        # Every worker keeps all cores and threads: the oversubscribed case, made explicit
+        options = {"initializer": governor.configure, "initargs": ({"resources": {"preset": "latency"}},)}
+    elif preset == "throughput":
+        options = {"initializer": governor.init_worker, "initargs": ({}, workers)}
+
+    def run():
+        with ProcessPoolExecutor(max_workers=workers, **options) as pool:
+            return list(pool.map(detect, [(1920, 1080)] * JOBS))
+
+    counts = benchmark.pedantic(run, rounds=3, iterations=1)
+    benchmark.extra_info.update({"workers": workers, "jobs": JOBS, "regions": sum(counts)})
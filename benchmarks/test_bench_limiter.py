@@ -0,0 +1,47 @@
+"""
+Fixed versus adaptive LLM concurrency against a fake server that serves two
+requests at a time: too few slots leave it idle, too many make every call
+queue. extra_info records the per-call latency p95 and the limit reached.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from imagecoderx import llm
+from imagecoderx.testing import FakeOllamaServer
+
+LIMITS = {
+    "fixed_1": {"initial_limit": 1, "min_limit": 1, "max_limit": 1},
+    "fixed_16": {"initial_limit": 16, "min_limit": 16, "max_limit": 16},
+    "adaptive": {"initial_limit": 2, "max_limit": 16},
+}
+
+
+@pytest.fixture(scope="module")
+def busy_server():
+    with FakeOllamaServer(latency=0.01, capacity=2) as server:
+        yield server
+
+
+@pytest.mark.parametrize("mode", LIMITS)
+def test_llm_concurrency(benchmark, busy_server, mode):
+    config = {"ollama_host": busy_server.url, "llm_concurrency": LIMITS[mode]}
+    messages = [{"role": "user", "content": "convert: Hello"}]
+    latencies = []
+
+    def call(_):
+        start = time.perf_counter()
+        llm.chat(config, model="fake", messages=messages)
+        latencies.append(time.perf_counter() - start)
+
+    def run():
+        with ThreadPoolExecutor(16) as executor:
+            list(executor.map(call, range(40)))
+
+    benchmark.pedantic(run, rounds=3, iterations=1)
+    benchmark.extra_info.update({
+        "latency_p95": round(float(np.percentile(latencies, 95)), 4),
+        "limit": llm.get_limiter(config).limit,
+    })
@@ -0,0 +1,40 @@
+"""
+Cost of recording metrics on the hot path: a counter increment and a histogram
+observation touch only the calling thread's cell, so they should stay well
+under a microsecond and not slow down when several threads record at once.
+"""
+import threading
+
+import pytest
+
+from imagecoderx.metrics import Registry
+
+OPS = 100_000
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_record(benchmark, threads):
+    registry = Registry()
+    counter = registry.counter("ops", "Ops", ("stage",))
+    histogram = registry.histogram("latency_seconds", "Latency", ("model",))
+
+    def work():
+        child = histogram.labels("fake")
+        for i in range(OPS // threads):
+            counter.labels("ocr").inc()
+            child.observe(i * 1e-5)
+
+    rounds = []
+
+    def run():
+        rounds.append(1)
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    benchmark.pedantic(run, rounds=5, iterations=1)
+    # One round under --benchmark-disable
+    assert counter.value("ocr") == len(rounds) * (OPS // threads) * threads
+    benchmark.extra_info.update({"ops": OPS, "threads": threads, "render_bytes": len(registry.render())})
@@ -0,0 +1,125 @@
+"""
+End-to-end benchmarks of convert_image_to_code on synthetic screenshots.
+
+Each case records per-stage timings (from the ``timings`` argument), the peak
+traced memory of one run and a digest of the generated code in ``extra_info``,
+so saved runs can be compared across commits.
+"""
+import tracemalloc
+
+import cv2
+import pytest
+
+from conftest import write_config
+from imagecoderx import core
+from imagecoderx.engine.progressive import ProgressiveDocument
+from imagecoderx.testing import FakeOllamaServer, content_digest, install_fake_rembg, synthetic_screenshot
+
+SIZES = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+DENSITY = {"sparse": 6, "dense": 40}
+TEXT = {"short": 3, "long": 24}
+
+
+def run_case(benchmark, tmp_path, size, density, text):
+    width, height = SIZES[size]
+    img = synthetic_screenshot(width, height, regions=DENSITY[density], words_per_region=TEXT[text])
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, img)
+
+    stages = {}
+    code = benchmark.pedantic(core.convert_image_to_code, args=(path, "html"),
+                              kwargs={"timings": stages}, rounds=3, iterations=1)
+
+    tracemalloc.start()
+    core.convert_image_to_code(path, "html")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    benchmark.extra_info.update({
+        # Timings of the last benchmark round
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        "peak_mb": round(peak / 2**20, 2),
+        "output_digest": content_digest(code),
+    })
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_pipeline_size(benchmark, fake_env, size):
+    run_case(benchmark, fake_env, size, "sparse", "short")
+
+
+@pytest.mark.parametrize("density", DENSITY)
+@pytest.mark.parametrize("text", TEXT)
+def test_pipeline_density(benchmark, fake_env, density, text):
+    run_case(benchmark, fake_env, "1080p", density, text)
+
+
+@pytest.mark.parametrize("ocr_mode", ["region", "page"])
+def test_pipeline_ocr_mode(benchmark, fake_env, fake_ollama, ocr_mode):
+    # Per-region OCR spawns tesseract once per region; page mode runs it once
+    write_config(fake_env / "home", ollama_host=fake_ollama.url, ocr_mode=ocr_mode)
+    run_case(benchmark, fake_env, "1080p", "dense", "short")
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_detect_text_regions(benchmark, size):
+    width, height = SIZES[size]
+    img = synthetic_screenshot(width, height, regions=DENSITY["dense"], words_per_region=TEXT["long"])
+    regions = benchmark(core.detect_text_regions, img)
+    benchmark.extra_info["regions"] = len(regions)
+
+
+@pytest.mark.parametrize("fastpath", [False, True])
+def test_pipeline_fastpath(benchmark, fake_env, fake_ollama, fastpath):
+    # With the fast path, simple text regions never reach the (fake) LLM
+    write_config(fake_env / "home", ollama_host=fake_ollama.url, fastpath=fastpath)
+    run_case(benchmark, fake_env, "1080p", "dense", "short")
+
+
+def test_pipeline_progressive_first_output(benchmark, fake_env):
+    # Time to the draft page versus the whole run, with a slow model
+    img = synthetic_screenshot(1920, 1080, regions=DENSITY["sparse"], words_per_region=TEXT["short"])
+    path = str(fake_env / "shot.png")
+    cv2.imwrite(path, img)
+    documents = []
+
+    def run():
+        documents.append(ProgressiveDocument(str(fake_env / "shot.html")))
+        return core.convert_image_to_formats(path, ["html"], progress=documents[-1])
+
+    with FakeOllamaServer(latency=0.2) as server:
+        write_config(fake_env / "home", ollama_host=server.url, fastpath=False)
+        benchmark.pedantic(run, rounds=2, iterations=1)
+    benchmark.extra_info.update({
+        "first_write_s": round(documents[-1].first_write, 4),
+        "writes": documents[-1].writes,
+    })
+
+
+@pytest.mark.parametrize("warm", [False, True])
+def test_pipeline_artifact_cache(benchmark, fake_env, fake_ollama, warm):
+    # Warm: detection, background and OCR come from the artifact cache of an earlier run
+    write_config(fake_env / "home", ollama_host=fake_ollama.url,
+                 artifact_cache=str(fake_env / "cache") if warm else None)
+    run_case(benchmark, fake_env, "1080p", "dense", "short")
+
+
+@pytest.mark.parametrize("source", ["file", "bytes"])
+def test_pipeline_input_bytes(benchmark, fake_env, source):
+    # Images arriving as bytes: written to disk and converted as a file (with the
+    # _objects directory), or decoded and converted in memory with the assets returned
+    install_fake_rembg(str(fake_env / "bin"))
+    data = cv2.imencode(".png", synthetic_screenshot(1920, 1080, regions=DENSITY["dense"],
+                                                     words_per_region=TEXT["short"]))[1].tobytes()
+
+    def run():
+        if source == "bytes":
+            assets = {}
+            return core.convert_bytes(data, ["html"], assets), assets
+        path = fake_env / "shot.png"
+        path.write_bytes(data)
+        return core.convert_file(str(path), str(fake_env / "shot.html"), ["html"]), None
+
+    outputs, assets = benchmark.pedantic(run, rounds=3, iterations=1)
+    benchmark.extra_info.update({"output_digest": content_digest(outputs["html"]),
+                                 "asset_bytes": sum(map(len, assets.values())) if assets else None})
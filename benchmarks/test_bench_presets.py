@@ -0,0 +1,33 @@
+"""
+Time and output size of one conversion per config preset ("fast", "balanced",
+"quality"), including object extraction, on a dense 1080p screenshot.
+"""
+import cv2
+import pytest
+
+from conftest import write_config
+from imagecoderx import core
+from imagecoderx.config import PRESETS
+from imagecoderx.testing import content_digest, install_fake_rembg, synthetic_screenshot
+
+
+@pytest.mark.parametrize("preset", PRESETS)
+def test_preset(benchmark, fake_env, fake_ollama, preset):
+    install_fake_rembg(str(fake_env / "bin"))
+    write_config(fake_env / "home", ollama_host=fake_ollama.url, preset=preset)
+    path = str(fake_env / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(1920, 1080, regions=40, words_per_region=3))
+    output_path = str(fake_env / "shot.html")
+
+    def run():
+        fake_ollama.requests.clear()
+        return core.convert_file(path, output_path, ["html"])
+
+    outputs = benchmark.pedantic(run, rounds=3, iterations=1)
+    objects = fake_env / "shot_objects"
+    benchmark.extra_info.update({
+        "output_bytes": len(outputs["html"].encode("utf-8")),
+        "asset_bytes": sum(f.stat().st_size for f in objects.iterdir()) if objects.exists() else 0,
+        "llm_requests": len(fake_ollama.requests),
+        "output_digest": content_digest(outputs["html"]),
+    })
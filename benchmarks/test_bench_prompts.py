@@ -0,0 +1,67 @@
+"""
+Prompt-evaluation cost per region of the old concatenated prompt versus
+prompts.build_messages, against a fake server that charges per prompt character
+not covered by the prefix shared with the previous request (a KV-cache model).
+extra_info records the evaluated characters and tokens per region.
+"""
+import pytest
+
+from imagecoderx import prompts
+from imagecoderx.testing import WORDS, FakeOllamaServer
+
+CONFIG = {"image_interpretation_prompt": "Refine the following code/text..."}
+
+
+def legacy_messages(text, boxes, region_box):
+    # The prompt process_text_with_llm used to build: instructions, per-character
+    # coordinates of the first ten boxes and the region, then the text
+    max_x = max(box["x2"] for box in boxes)
+    max_y = max(box["y2"] for box in boxes)
+    info = "Text structure:\n"
+    for box in boxes[:10]:
+        info += f"Char '{box['char']}': x={box['x1'] / max_x:.2f}, y={box['y1'] / max_y:.2f}\n"
+    x, y, w, h = region_box
+    info += f"Text Regions:\nRegion 0: x={x:.2f}, y={y:.2f}, width={w:.2f}, height={h:.2f}\n"
+    prompt = f"{CONFIG['image_interpretation_prompt']} html. {info}"
+    return [{"role": "user", "content": f"{prompt}: {text}"}]
+
+
+def regions(count=20, words=12):
+    for i in range(count):
+        boxes = []
+        for j in range(words):
+            text = WORDS[(i * 7 + j) % len(WORDS)]
+            boxes.append({"char": text, "x1": (j % 4) * 90, "y1": (j // 4) * 30,
+                          "x2": (j % 4) * 90 + 12 * len(text), "y2": (j // 4) * 30 + 20})
+        yield "".join(b["char"] for b in boxes), boxes, ((i % 5) / 5, (i // 5) / 4, 0.18, 0.2)
+
+
+BUILDERS = {
+    "legacy": legacy_messages,
+    "builder": lambda text, boxes, box: prompts.build_messages(CONFIG, "html", text, boxes, box),
+}
+
+
+@pytest.mark.parametrize("builder", BUILDERS)
+def test_prompt_eval(benchmark, builder):
+    from ollama import Client
+
+    with FakeOllamaServer(per_char_latency=2e-5, prefix_cache=True) as server:
+        client = Client(host=server.url)
+        cases = list(regions())
+
+        evaluated = []
+
+        def run():
+            evaluated.clear()
+            for text, boxes, box in cases:
+                response = client.chat(model="fake", messages=BUILDERS[builder](text, boxes, box))
+                evaluated.append(response.prompt_eval_count)
+
+        benchmark.pedantic(run, rounds=3, iterations=1)
+        sent = [BUILDERS[builder](*case) for case in cases]
+        benchmark.extra_info.update({
+            "evaluated_tokens_per_region": round(sum(evaluated) / len(cases), 1),
+            "prompt_tokens_per_region": round(sum(prompts.count_tokens(m["content"]) for ms in sent for m in ms)
+                                              / len(cases), 1),
+        })
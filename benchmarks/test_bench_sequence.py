@@ -0,0 +1,46 @@
+"""
+Converting a screen recording: every frame on its own versus sequence mode.
+
+The recording has two screens; each is held for a few frames (duplicates) and
+then edited in one spot a couple of times (diffs). Frame by frame, every frame
+pays for detection, OCR and one LLM call per region; sequence mode converts the
+key frames in full and carries the unchanged regions of the diff frames over.
+"""
+import cv2
+import pytest
+
+from imagecoderx import core, sequence
+from imagecoderx.testing import synthetic_screenshot
+
+HOLD = 3
+EDITS = 2
+
+
+def write_recording(directory):
+    index = 0
+    for seed in range(2):
+        frame = synthetic_screenshot(1280, 800, regions=20, words_per_region=6, seed=seed)
+        for edit in range(EDITS + 1):
+            if edit:
+                frame = frame.copy()
+                cv2.putText(frame, f"edit {edit}", (60 + 200 * edit, 760), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+            for _ in range(HOLD):
+                index += 1
+                cv2.imwrite(str(directory / f"frame{index}.png"), frame)
+    return index
+
+
+@pytest.mark.parametrize("mode", ["per_frame", "sequence"])
+def test_recording(benchmark, fake_env, fake_ollama, mode):
+    frames = fake_env / "frames"
+    frames.mkdir()
+    count = write_recording(frames)
+
+    def run():
+        fake_ollama.requests.clear()
+        if mode == "sequence":
+            return sequence.convert_sequence(str(frames), str(fake_env / "out"))
+        return [core.convert_image_to_code(str(frames / f"frame{i}.png"), "html") for i in range(1, count + 1)]
+
+    benchmark.pedantic(run, rounds=2, iterations=1)
+    benchmark.extra_info.update({"frames": count, "llm_requests": len(fake_ollama.requests)})
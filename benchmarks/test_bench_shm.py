@@ -0,0 +1,81 @@
+"""
+Transport of a decoded 4K screenshot to worker processes: pickling the whole
+image or each crop with every task, versus one shared memory copy with tasks
+that carry only a handle and a box (see imagecoderx.engine.shm).
+
+The task itself is a trivial reduction, so the timings are dominated by the
+transport. The pool is created once per module so process start-up is excluded.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from imagecoderx.engine.shm import SharedImage, run_on_crop
+from imagecoderx.testing import synthetic_screenshot
+
+GRID = 4
+
+
+def crop_mean(crop):
+    return float(crop.mean())
+
+
+def crop_of(image, box):
+    x1, y1, x2, y2 = box
+    return crop_mean(image[y1:y2, x1:x2])
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        # Start the workers before timing
+        list(pool.map(abs, range(4)))
+        yield pool
+
+
+@pytest.fixture(scope="module")
+def image():
+    return synthetic_screenshot(3840, 2160, regions=40)
+
+
+def boxes(image):
+    height, width = image.shape[:2]
+    th, tw = height // GRID, width // GRID
+    return [(x, y, x + tw, y + th) for y in range(0, th * GRID, th) for x in range(0, tw * GRID, tw)]
+
+
+def test_pickle_image(benchmark, pool, image):
+    tiles = boxes(image)
+    result = benchmark(lambda: list(pool.map(crop_of, [image] * len(tiles), tiles)))
+    benchmark.extra_info["bytes_per_task"] = image.nbytes
+    assert len(result) == GRID * GRID
+
+
+def test_pickle_crops(benchmark, pool, image):
+    tiles = boxes(image)
+    result = benchmark(lambda: list(pool.map(crop_mean, [image[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles])))
+    benchmark.extra_info["bytes_per_task"] = image.nbytes // len(tiles)
+    assert len(result) == GRID * GRID
+
+
+def test_shared_memory(benchmark, pool, image):
+    tiles = boxes(image)
+
+    def run():
+        # Includes the one copy into the segment and its removal
+        with SharedImage(image) as shared:
+            return list(pool.map(run_on_crop, [crop_mean] * len(tiles), [shared.handle] * len(tiles), tiles))
+
+    result = benchmark(run)
+    expected = [crop_of(image, box) for box in tiles]
+    assert np.allclose(result, expected)
+
+
+def test_shared_memory_tasks_only(benchmark, pool, image):
+    # Cost per stage once the image is shared (later stages reuse the segment)
+    tiles = boxes(image)
+    with SharedImage(image) as shared:
+        result = benchmark(lambda: list(pool.map(run_on_crop, [crop_mean] * len(tiles),
+                                                 [shared.handle] * len(tiles), tiles)))
+    assert len(result) == GRID * GRID
@@ -0,0 +1,78 @@
+"""
+Benchmarks for the region spatial index.
+
+Run with ``pytest benchmarks/test_bench_spatial_index.py`` (requires the
+``benchmark`` extra, i.e. ``pytest-benchmark``).
+"""
+import numpy as np
+import pytest
+
+from imagecoderx.algorithms.spatial_index import SpatialIndex, merge_overlapping_boxes
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def make_boxes(n, seed=0):
+    # Dense screen: box sizes shrink as the count grows, like text lines on a large page
+    rng = np.random.default_rng(seed)
+    scale = 1 / np.sqrt(n)
+    xy = rng.uniform(0, 1, size=(n, 2))
+    wh = rng.uniform(0.2, 2.0, size=(n, 2)) * scale
+    return np.hstack((xy, wh))
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bulk_load(benchmark, n):
+    boxes = make_boxes(n)
+    benchmark(SpatialIndex, boxes)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_intersects_query(benchmark, n):
+    index = SpatialIndex(make_boxes(n))
+    queries = make_boxes(100, seed=1)
+
+    def run():
+        for q in queries:
+            index.intersects(q)
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_nearest_query(benchmark, n):
+    index = SpatialIndex(make_boxes(n))
+    points = np.random.default_rng(2).uniform(0, 1, size=(100, 2))
+
+    def run():
+        for x, y in points:
+            index.nearest(x, y, k=8)
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_intersecting_pairs(benchmark, n):
+    index = SpatialIndex(make_boxes(n))
+    benchmark(index.intersecting_pairs)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_merge_overlapping(benchmark, n):
+    boxes = make_boxes(n)
+    benchmark.pedantic(merge_overlapping_boxes, args=(boxes,), rounds=3)
+
+
+def test_naive_pairs_baseline_1k(benchmark):
+    # O(n^2) reference for comparison with test_intersecting_pairs[1000]
+    c = SpatialIndex(make_boxes(1_000)).corners
+
+    def naive():
+        return [
+            (i, j)
+            for i in range(len(c))
+            for j in range(i + 1, len(c))
+            if c[i, 0] <= c[j, 2] and c[j, 0] <= c[i, 2] and c[i, 1] <= c[j, 3] and c[j, 1] <= c[i, 3]
+        ]
+
+    benchmark.pedantic(naive, rounds=1)
@@ -1,67 +0,0 @@
-def apply_custom_algorithms(code, output_format="html"):
-    """Applies custom algorithms and formats the code based on the output format."""
-    if output_format == "html":
-        # Check if the code already contains HTML tags
-        if "<html" in code.lower() and "<body" in code.lower():
-            formatted_code = code
-        else:
-            formatted_code = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Generated Code</title>
-</head>
-<body>
-    <pre>{code}</pre>
-</body>
-</html>"""
-    elif output_format == "tsx":
-        formatted_code = f"""
-import React from 'react';
-
-const GeneratedComponent: React.FC = () => {{
-  return (
-    <div>
-      <pre>{code}</pre>
-    </div>
-  );
-}};
-
-export default GeneratedComponent;
-"""
-    elif output_format == "jsx":
-        formatted_code = f"""
-import React from 'react';
-
-const GeneratedComponent = () => {{
-  return (
-    <div>
-      <pre>{code}</pre>
-    </div>
-  );
-}};
-
-export default GeneratedComponent;
-"""
-    elif output_format == "dart":
-        formatted_code = f"""
-import 'package:flutter/material.dart';
-
-class GeneratedWidget extends StatelessWidget {{
-  @override
-  Widget build(BuildContext context) {{
-    return Scaffold(
-      body: SingleChildScrollView(
-        child: Text(
-          \'{code}\',
-        ),
-      ),
-    );
-  }}
-}}
-"""
-    else:
-        formatted_code = code  # Default: no formatting
-
-    return formatted_code
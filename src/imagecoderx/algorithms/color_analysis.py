@@ -6,30 +6,35 @@ def rgb_to_hex(rgb: Tuple[int, int, int]) -> str:
     """Convert RGB tuple to hex color string."""
     return '#{:02x}{:02x}{:02x}'.format(rgb[0], rgb[1], rgb[2])
 
-def detect_background_style(image_path: str) -> Dict:
+def _mean_rgb(region: np.ndarray) -> Tuple[int, int, int]:
+    """Mean color of a BGR view as an (r, g, b) tuple, computed without copying the pixels."""
+    b, g, r = cv2.mean(region)[:3]
+    return int(r), int(g), int(b)
+
+def detect_background_style(image: Union[str, np.ndarray], gradient_threshold: float = 30) -> Dict:
     """
     Analyzes image background to detect if it's solid color or gradient,
     and returns appropriate CSS background properties.
+    Accepts an image path or an already decoded BGR image. Opposite sides whose mean
+    colors differ by more than gradient_threshold (summed over r, g, b) make a gradient.
     """
-    img = cv2.imread(image_path)
+    img = cv2.imread(image) if isinstance(image, str) else image
     if img is None:
         return {"type": "solid", "color": "#FFFFFF"}
 
-    # Convert BGR to RGB
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
     height, width = img.shape[:2]
 
-    # Analyze different regions of the image
-    left = img_rgb[height//4:3*height//4, :width//4]
-    right = img_rgb[height//4:3*height//4, 3*width//4:]
-    top = img_rgb[:height//4, width//4:3*width//4]
-    bottom = img_rgb[3*height//4:, width//4:3*width//4]
+    # Analyze different regions of the image (views into img, averaged in BGR order)
+    left = img[height//4:3*height//4, :width//4]
+    right = img[height//4:3*height//4, 3*width//4:]
+    top = img[:height//4, width//4:3*width//4]
+    bottom = img[3*height//4:, width//4:3*width//4]
 
     # Calculate mean colors for each region
-    left_color = tuple(map(int, np.mean(left, axis=(0, 1))))
-    right_color = tuple(map(int, np.mean(right, axis=(0, 1))))
-    top_color = tuple(map(int, np.mean(top, axis=(0, 1))))
-    bottom_color = tuple(map(int, np.mean(bottom, axis=(0, 1))))
+    left_color = _mean_rgb(left)
+    right_color = _mean_rgb(right)
+    top_color = _mean_rgb(top)
+    bottom_color = _mean_rgb(bottom)
 
     # Calculate color differences
     def color_diff(c1, c2):
@@ -38,10 +43,7 @@ def detect_background_style(image_path: str) -> Dict:
     horizontal_diff = color_diff(left_color, right_color)
     vertical_diff = color_diff(top_color, bottom_color)
 
-    # Threshold for considering it a gradient
-    GRADIENT_THRESHOLD = 30
-
-    if max(horizontal_diff, vertical_diff) > GRADIENT_THRESHOLD:
+    if max(horizontal_diff, vertical_diff) > gradient_threshold:
         if horizontal_diff > vertical_diff:
             return {
                 "type": "gradient",
@@ -55,13 +57,10 @@ def detect_background_style(image_path: str) -> Dict:
                 "colors": [rgb_to_hex(top_color), rgb_to_hex(bottom_color)]
             }
     else:
-        # Use k-means to find the most dominant solid color
-        pixels = img_rgb.reshape(-1, 3)
-        pixels = np.float32(pixels)
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-        _, _, centers = cv2.kmeans(pixels, 1, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-        dominant_color = tuple(map(int, centers[0]))
-        
+        # With a single cluster the k-means center is the mean color, so take it
+        # directly instead of building a float32 copy of every pixel
+        dominant_color = _mean_rgb(img)
+
         return {
             "type": "solid",
             "color": rgb_to_hex(dominant_color)
@@ -1,4 +0,0 @@
-def apply_custom_algorithms(code):
-    """Applies custom algorithms to refine the code."""
-    # Implement your custom algorithms here
-    return f"Algorithm applied: {code}"  # Placeholder
@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+
+# Labels produced by classify_boxes. "code" regions go through OCR and the LLM,
+# "logo"/"background" regions are exported as images and "empty" ones are dropped.
+CODE, LOGO, BACKGROUND, EMPTY = "code", "logo", "background", "empty"
+
+# Thresholds for the rules in classify_boxes
+EMPTY_STD = 6.0             # gray level standard deviation of a blank panel
+EMPTY_EDGE_DENSITY = 0.004  # fraction of edge pixels in a blank panel
+IMAGE_CHROMA = 60.0         # mean chroma (max - min channel) above which a region looks like a picture
+IMAGE_STD = 40.0            # gray level spread of photos and illustrations
+TEXT_INK_MAX = 0.45         # text rarely covers more than this fraction of its box
+LOGO_MAX_AREA = 0.02        # relative area below which a picture is treated as a logo/icon
+
+
+# Rows of the image turned into feature maps at a time, and the rows read around each
+# band so that Canny and the adaptive threshold see the same neighbourhood as on the full image
+BAND_ROWS = 32
+BAND_MARGIN = 8
+
+
+def _band_maps(img: np.ndarray, top: int, bottom: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the (gray, edge, ink, chroma) maps of image rows top:bottom, each uint8."""
+    start, stop = max(top - BAND_MARGIN, 0), min(bottom + BAND_MARGIN, img.shape[0])
+    band = np.ascontiguousarray(img[start:stop])
+    gray = cv2.cvtColor(band, cv2.COLOR_BGR2GRAY) if band.ndim == 3 else band
+    edges = cv2.Canny(gray, 100, 200, L2gradient=False) // 255
+    # Ink: pixels noticeably darker or lighter than their neighbourhood (text strokes)
+    ink = cv2.adaptiveThreshold(gray, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    if band.ndim == 3:
+        chroma = cv2.subtract(band.max(axis=2), band.min(axis=2))
+    else:
+        chroma = np.zeros_like(gray)
+    rows = slice(top - start, bottom - start)
+    return gray[rows], edges[rows], ink[rows], chroma[rows]
+
+
+def _integral_at(img: np.ndarray, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    """
+    Values of the integral images of the gray level, its square and the edge, ink and
+    chroma maps at the points (ys, xs), as a (5, len(ys)) array. The integral images are
+    built BAND_ROWS rows at a time (cv2.integral of the band plus the running totals of
+    the rows above) and only the requested points are read, so no full-size integral
+    image is ever allocated.
+    """
+    height, width = img.shape[:2]
+    values = np.zeros((5, len(ys)))
+    carry = np.zeros((5, width + 1))
+    for top in range(0, height, BAND_ROWS):
+        bottom = min(top + BAND_ROWS, height)
+        gray, edges, ink, chroma = _band_maps(img, top, bottom)
+        # Integral row r sums the image rows above r, so this band covers rows top + 1 .. bottom
+        inside = np.flatnonzero((ys > top) & (ys <= bottom))
+        rows, cols = ys[inside] - top, xs[inside]
+        gray_sum, gray_sqsum = cv2.integral2(gray, sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+        integrals = (gray_sum, gray_sqsum, cv2.integral(edges), cv2.integral(ink), cv2.integral(chroma))
+        for k, integral in enumerate(integrals):
+            values[k, inside] = integral[rows, cols] + carry[k, cols]
+            carry[k] += integral[-1]
+    return values
+
+
+def region_features(img: np.ndarray, boxes) -> dict[str, np.ndarray]:
+    """
+    Computes per-box feature columns for pixel boxes (x1, y1, x2, y2).
+
+    Every statistic is a box sum read from integral images at the four box corners
+    (see _integral_at), for all boxes at once with array indexing.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    height, width = img.shape[:2]
+    x1 = np.clip(boxes[:, 0], 0, width)
+    y1 = np.clip(boxes[:, 1], 0, height)
+    x2 = np.clip(boxes[:, 2], x1, width)
+    y2 = np.clip(boxes[:, 3], y1, height)
+    box_w = np.maximum(x2 - x1, 1)
+    box_h = np.maximum(y2 - y1, 1)
+
+    corners = _integral_at(img, np.concatenate((y2, y1, y2, y1)), np.concatenate((x2, x2, x1, x1)))
+    br, tr, bl, tl = corners.reshape(5, 4, -1).transpose(1, 0, 2)
+    sums = br - tr - bl + tl
+    pixels = (x2 - x1) * (y2 - y1)
+    count = np.maximum(pixels, 1)
+    mean = sums[0] / count
+    std = np.sqrt(np.maximum(sums[1] / count - mean ** 2, 0))
+    # Boxes without pixels get zero features
+    has_pixels = pixels > 0
+    return {
+        "area": pixels / (width * height),
+        "aspect": box_w / box_h,
+        "mean": np.where(has_pixels, mean, 0.0),
+        "std": np.where(has_pixels, std, 0.0),
+        "edge_density": np.where(has_pixels, sums[2] / count, 0.0),
+        "ink": np.where(has_pixels, sums[3] / count, 0.0),
+        "chroma": np.where(has_pixels, sums[4] / count, 0.0),
+    }
+
+
+def classify_boxes(img: np.ndarray, boxes) -> np.ndarray:
+    """
+    Labels pixel boxes (x1, y1, x2, y2) as code, logo, background or empty by applying
+    threshold rules to the feature columns of all boxes at once. Returns an array of
+    label strings.
+    """
+    f = region_features(img, boxes)
+    labels = np.full(len(f["area"]), CODE, dtype=object)
+
+    empty = (f["std"] < EMPTY_STD) & (f["edge_density"] < EMPTY_EDGE_DENSITY)
+    # Pictures: colourful with a wide tonal range, or so much "ink" that it cannot be text
+    picture = ~empty & (
+        ((f["chroma"] > IMAGE_CHROMA) & (f["std"] > IMAGE_STD))
+        | (f["ink"] > TEXT_INK_MAX)
+    )
+    # Square-ish small pictures are icons/logos, everything else is a background image
+    logo = picture & (f["area"] < LOGO_MAX_AREA) & (f["aspect"] > 0.5) & (f["aspect"] < 2.0)
+
+    labels[picture] = BACKGROUND
+    labels[logo] = LOGO
+    labels[empty] = EMPTY
+    return labels
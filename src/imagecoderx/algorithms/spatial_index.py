@@ -0,0 +1,292 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+Box = Tuple[float, float, float, float]
+
+
+def boxes_to_array(boxes) -> np.ndarray:
+    """
+    Converts (x, y, width, height) boxes into an (n, 4) float64 array of
+    (x1, y1, x2, y2) corners, which is the layout the index works on.
+    """
+    arr = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    corners = arr.copy()
+    corners[:, 2] += corners[:, 0]
+    corners[:, 3] += corners[:, 1]
+    return corners
+
+
+def array_to_boxes(corners: np.ndarray) -> list[Box]:
+    """Converts an (n, 4) corner array back into a list of (x, y, width, height) tuples."""
+    return [
+        (float(x1), float(y1), float(x2 - x1), float(y2 - y1))
+        for x1, y1, x2, y2 in corners
+    ]
+
+
+def _ragged_arange(counts: np.ndarray) -> np.ndarray:
+    """Returns concatenated aranges of the given lengths, e.g. [2, 3] -> [0, 1, 0, 1, 2]."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(total, dtype=np.int64) - starts
+
+
+class SpatialIndex:
+    """
+    Uniform grid index over axis-aligned boxes.
+
+    Boxes are bulk loaded once into a CSR layout (cell offsets + box ids sorted
+    by cell), so every query only touches the cells it overlaps instead of all
+    boxes. Input boxes use the same (x, y, width, height) convention as
+    ``detect_text_regions`` and may be relative or pixel coordinates.
+    """
+
+    def __init__(self, boxes, cell_size: Optional[float] = None):
+        self.corners = boxes_to_array(boxes)
+        n = len(self.corners)
+        if n == 0:
+            self.origin = np.zeros(2)
+            self.cell_size = 1.0
+            self.shape = (1, 1)
+            self._offsets = np.zeros(2, dtype=np.int64)
+            self._ids = np.zeros(0, dtype=np.int64)
+            return
+
+        self.origin = self.corners[:, :2].min(axis=0)
+        extent = np.maximum(self.corners[:, 2:].max(axis=0) - self.origin, 1e-12)
+
+        if cell_size is None:
+            # Cells about the size of a typical box keep the number of cells
+            # each box spans (and each query visits) small.
+            sizes = self.corners[:, 2:] - self.corners[:, :2]
+            cell_size = float(np.median(sizes.max(axis=1)))
+            # Avoid a grid with far more cells than boxes.
+            min_cell = float(np.sqrt(extent[0] * extent[1] / (4 * n)))
+            cell_size = max(cell_size, min_cell, 1e-12)
+        self.cell_size = float(cell_size)
+        self.shape = tuple(int(v) for v in np.floor(extent / self.cell_size).astype(np.int64) + 1)
+
+        cx1, cy1, cx2, cy2 = self._cell_ranges(self.corners)
+        span_x = cx2 - cx1 + 1
+        span_y = cy2 - cy1 + 1
+        per_box = span_x * span_y
+
+        # Expand every box into the cells it covers.
+        box_ids = np.repeat(np.arange(n, dtype=np.int64), per_box)
+        local = _ragged_arange(per_box)
+        rep_span_x = np.repeat(span_x, per_box)
+        cell_x = np.repeat(cx1, per_box) + local % rep_span_x
+        cell_y = np.repeat(cy1, per_box) + local // rep_span_x
+        cell_ids = cell_y * self.shape[0] + cell_x
+
+        order = np.argsort(cell_ids, kind="stable")
+        self._ids = box_ids[order]
+        counts = np.bincount(cell_ids, minlength=self.shape[0] * self.shape[1])
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self) -> int:
+        return len(self.corners)
+
+    def _cell_ranges(self, corners: np.ndarray):
+        """Returns the inclusive cell ranges (cx1, cy1, cx2, cy2) covered by each box."""
+        lo = np.floor((corners[:, :2] - self.origin) / self.cell_size).astype(np.int64)
+        hi = np.floor((corners[:, 2:] - self.origin) / self.cell_size).astype(np.int64)
+        lo = np.clip(lo, 0, np.array(self.shape) - 1)
+        hi = np.clip(hi, 0, np.array(self.shape) - 1)
+        return lo[:, 0], lo[:, 1], hi[:, 0], hi[:, 1]
+
+    def _candidates(self, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+        """Returns the unique ids of boxes registered in cells overlapping the rectangle."""
+        if len(self) == 0:
+            return self._ids
+        cx1, cy1, cx2, cy2 = (v[0] for v in self._cell_ranges(np.array([[x1, y1, x2, y2]])))
+        rows = np.arange(cy1, cy2 + 1, dtype=np.int64) * self.shape[0]
+        starts = self._offsets[rows + cx1]
+        ends = self._offsets[rows + cx2 + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts, lengths) + _ragged_arange(lengths)
+        return np.unique(self._ids[positions])
+
+    def intersects(self, box: Box) -> np.ndarray:
+        """Returns the ids of all boxes that overlap ``box`` (touching edges count)."""
+        x1, y1, x2, y2 = boxes_to_array([box])[0]
+        ids = self._candidates(x1, y1, x2, y2)
+        c = self.corners[ids]
+        mask = (c[:, 0] <= x2) & (c[:, 2] >= x1) & (c[:, 1] <= y2) & (c[:, 3] >= y1)
+        return ids[mask]
+
+    def contained_in(self, box: Box) -> np.ndarray:
+        """Returns the ids of all boxes that lie completely inside ``box``."""
+        x1, y1, x2, y2 = boxes_to_array([box])[0]
+        ids = self._candidates(x1, y1, x2, y2)
+        c = self.corners[ids]
+        mask = (c[:, 0] >= x1) & (c[:, 1] >= y1) & (c[:, 2] <= x2) & (c[:, 3] <= y2)
+        return ids[mask]
+
+    def containing(self, box: Box) -> np.ndarray:
+        """Returns the ids of all boxes that completely contain ``box``."""
+        x1, y1, x2, y2 = boxes_to_array([box])[0]
+        ids = self._candidates(x1, y1, x1, y1)
+        c = self.corners[ids]
+        mask = (c[:, 0] <= x1) & (c[:, 1] <= y1) & (c[:, 2] >= x2) & (c[:, 3] >= y2)
+        return ids[mask]
+
+    def locate(self, points) -> np.ndarray:
+        """
+        Vectorized point-in-box lookup: returns, for each (x, y) point, the id of the
+        smallest box containing it, or -1 if no box contains it.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.full(len(points), -1, dtype=np.int64)
+        if len(self) == 0 or len(points) == 0:
+            return result
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        inside = np.all((cells >= 0) & (cells < np.array(self.shape)), axis=1)
+        point_ids = np.nonzero(inside)[0]
+        cell_ids = cells[inside, 1] * self.shape[0] + cells[inside, 0]
+
+        # Expand every point into (point, candidate box) pairs from its cell
+        starts = self._offsets[cell_ids]
+        lengths = self._offsets[cell_ids + 1] - starts
+        pair_point = np.repeat(point_ids, lengths)
+        pair_box = self._ids[np.repeat(starts, lengths) + _ragged_arange(lengths)]
+        c = self.corners[pair_box]
+        p = points[pair_point]
+        hit = (c[:, 0] <= p[:, 0]) & (p[:, 0] <= c[:, 2]) & (c[:, 1] <= p[:, 1]) & (p[:, 1] <= c[:, 3])
+        pair_point, pair_box, c = pair_point[hit], pair_box[hit], c[hit]
+
+        # Keep the smallest containing box per point
+        area = (c[:, 2] - c[:, 0]) * (c[:, 3] - c[:, 1])
+        order = np.lexsort((pair_box, area, pair_point))
+        pair_point, pair_box = pair_point[order], pair_box[order]
+        first = np.ones(len(pair_point), dtype=bool)
+        first[1:] = pair_point[1:] != pair_point[:-1]
+        result[pair_point[first]] = pair_box[first]
+        return result
+
+    def nearest(self, x: float, y: float, k: int = 1) -> np.ndarray:
+        """
+        Returns the ids of the ``k`` boxes closest to the point (x, y), nearest first.
+        The distance to a box is zero when the point lies inside it.
+        """
+        n = len(self)
+        k = min(k, n)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+
+        cx = int(np.clip(np.floor((x - self.origin[0]) / self.cell_size), 0, self.shape[0] - 1))
+        cy = int(np.clip(np.floor((y - self.origin[1]) / self.cell_size), 0, self.shape[1] - 1))
+
+        max_ring = max(self.shape)
+        ring = 0
+        while True:
+            lo_x, hi_x = max(cx - ring, 0), min(cx + ring, self.shape[0] - 1)
+            lo_y, hi_y = max(cy - ring, 0), min(cy + ring, self.shape[1] - 1)
+            rows = np.arange(lo_y, hi_y + 1, dtype=np.int64) * self.shape[0]
+            starts = self._offsets[rows + lo_x]
+            lengths = self._offsets[rows + hi_x + 1] - starts
+            ids = np.unique(self._ids[np.repeat(starts, lengths) + _ragged_arange(lengths)])
+            if len(ids) >= k or ring >= max_ring:
+                dist = self._distances(ids, x, y)
+                order = np.argsort(dist, kind="stable")[:k]
+                # Unvisited boxes lie outside the searched square, so they are
+                # at least ``ring`` cells away from the point.
+                if ring >= max_ring or dist[order[-1]] <= ring * self.cell_size:
+                    return ids[order]
+            ring += 1
+
+    def _distances(self, ids: np.ndarray, x: float, y: float) -> np.ndarray:
+        c = self.corners[ids]
+        dx = np.maximum(np.maximum(c[:, 0] - x, 0.0), x - c[:, 2])
+        dy = np.maximum(np.maximum(c[:, 1] - y, 0.0), y - c[:, 3])
+        return np.hypot(dx, dy)
+
+    def intersecting_pairs(self) -> np.ndarray:
+        """
+        Returns an (m, 2) array of id pairs (i < j) for every pair of overlapping boxes.
+        Pairs are generated per cell, so only boxes sharing a cell are compared.
+        """
+        if len(self) < 2:
+            return np.zeros((0, 2), dtype=np.int64)
+        counts = np.diff(self._offsets)
+        # For each entry, pair it with the entries after it in the same cell.
+        cell_end = np.repeat(self._offsets[1:], counts)
+        entry = np.arange(len(self._ids), dtype=np.int64)
+        followers = cell_end - entry - 1
+        left = np.repeat(entry, followers)
+        right = left + 1 + _ragged_arange(followers)
+        i = self._ids[left]
+        j = self._ids[right]
+        a = np.minimum(i, j)
+        b = np.maximum(i, j)
+        ca = self.corners[a]
+        cb = self.corners[b]
+        mask = (ca[:, 0] <= cb[:, 2]) & (cb[:, 0] <= ca[:, 2]) & (ca[:, 1] <= cb[:, 3]) & (cb[:, 1] <= ca[:, 3])
+        keys = np.unique(a[mask] * len(self) + b[mask])
+        return np.stack((keys // len(self), keys % len(self)), axis=1)
+
+
+def _connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Labels the connected components of the graph given by ``pairs`` (min-label propagation)."""
+    labels = np.arange(n, dtype=np.int64)
+    if len(pairs) == 0:
+        return labels
+    a, b = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        previous = labels.copy()
+        np.minimum.at(labels, a, low)
+        np.minimum.at(labels, b, low)
+        # Pointer jumping shortens long chains.
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def merge_overlapping_boxes(boxes: Sequence[Box], margin: float = 0.0) -> list[Box]:
+    """
+    Merges boxes that overlap (or lie within ``margin`` of each other) into their
+    common bounding box, repeating until no merged boxes overlap.
+    """
+    corners = boxes_to_array(boxes)
+    while len(corners) > 1:
+        grown = corners + np.array([-margin, -margin, margin, margin]) / 2
+        index = SpatialIndex(array_to_boxes(grown))
+        labels = _connected_components(len(corners), index.intersecting_pairs())
+        groups, inverse = np.unique(labels, return_inverse=True)
+        if len(groups) == len(corners):
+            break
+        merged = np.empty((len(groups), 4))
+        merged[:, :2] = np.inf
+        merged[:, 2:] = -np.inf
+        np.minimum.at(merged[:, 0], inverse, corners[:, 0])
+        np.minimum.at(merged[:, 1], inverse, corners[:, 1])
+        np.maximum.at(merged[:, 2], inverse, corners[:, 2])
+        np.maximum.at(merged[:, 3], inverse, corners[:, 3])
+        corners = merged
+    return array_to_boxes(corners)
+
+
+def remove_contained_boxes(boxes: Sequence[Box]) -> list[Box]:
+    """
+    Drops boxes that lie completely inside another box, keeping the original order
+    of the remaining ones. Exact duplicates keep their first occurrence.
+    """
+    boxes = list(boxes)
+    if len(boxes) < 2:
+        return boxes
+    index = SpatialIndex(boxes)
+    pairs = index.intersecting_pairs()
+    if len(pairs) == 0:
+        return boxes
+    c = index.corners
+    a, b = pairs[:, 0], pairs[:, 1]
+    b_in_a = np.all(c[b, :2] >= c[a, :2], axis=1) & np.all(c[b, 2:] <= c[a, 2:], axis=1)
+    a_in_b = np.all(c[a, :2] >= c[b, :2], axis=1) & np.all(c[a, 2:] <= c[b, 2:], axis=1)
+    drop = np.zeros(len(boxes), dtype=bool)
+    drop[b[b_in_a]] = True
+    # Identical boxes contain each other; only drop the later one (a < b).
+    drop[a[a_in_b & ~b_in_a]] = True
+    return [box for box, dropped in zip(boxes, drop) if not dropped]
@@ -0,0 +1,593 @@
+"""
+Coordinator/worker mode for converting large batches of screenshots.
+
+The coordinator enqueues one job per image; workers on any number of nodes lease
+jobs from a shared queue, convert them and write the outputs atomically under a
+directory named after the job id (a hash of the image bytes and formats), so a job
+that runs twice, e.g. after its lease expired, produces the same files. Failed jobs
+are retried with exponential backoff up to ``max_attempts``.
+
+Queues are selected by URL:
+
+- ``sqlite:///path/to/queue.db``: a SQLite database, for workers on one machine
+  or a shared filesystem with working locks
+- ``redis://host:port/prefix``: any server speaking the Redis protocol
+  (see ``imagecoderx.testing.FakeRedisServer`` for a local stand-in)
+
+Command line::
+
+    imagecoderx-batch enqueue <queue-url> <image>... [--output-dir <dir>] [--out <format>[,<format>...]] [--deadline <seconds>]
+    imagecoderx-batch work <queue-url> [--worker-id <id>] [--lease <seconds>] [--max-jobs <n>]
+                           [--metrics-port <port>] [--metrics-file <path>]
+    imagecoderx-batch report <queue-url>
+
+Workers export their metrics (see ``imagecoderx.metrics``) on ``/metrics`` with
+``--metrics-port`` and/or rewrite a Prometheus textfile after every job with
+``--metrics-file``.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from imagecoderx import metrics
+from imagecoderx.engine.emitters import parse_output_formats
+from imagecoderx.engine.progressive import write_atomic
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+JOBS = metrics.REGISTRY.counter("imagecoderx_batch_jobs", "Batch jobs processed by this worker, by outcome", ("result",))
+
+
+class Lease:
+    """A job handed to one worker until ``expires`` (epoch seconds); ``token`` proves ownership."""
+
+    __slots__ = ("job_id", "payload", "attempts", "token", "expires")
+
+    def __init__(self, job_id: str, payload: dict, attempts: int, token: str, expires: float):
+        self.job_id = job_id
+        self.payload = payload
+        self.attempts = attempts
+        self.token = token
+        self.expires = expires
+
+    def __repr__(self) -> str:
+        return f"Lease({self.job_id!r}, attempts={self.attempts})"
+
+
+class JobQueue(ABC):
+    """
+    Interface of the queue backends; a backend missing one of the abstract methods
+    cannot be instantiated. ``put`` ignores job ids that already exist;
+    ``complete``, ``fail`` and ``extend`` return False when the lease was lost
+    (it expired and another worker took the job).
+    """
+
+    def __init__(self, max_attempts: int = 3, retry_delay: float = 5.0):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    @abstractmethod
+    def put(self, job_id: str, payload: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def lease(self, worker: str, seconds: float) -> Optional[Lease]:
+        ...
+
+    @abstractmethod
+    def extend(self, lease: Lease, seconds: float) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, lease: Lease, result: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str) -> bool:
+        ...
+
+    @abstractmethod
+    def jobs(self) -> Iterator[dict]:
+        """Yields one dict per job: id, state, attempts, worker, error, result and timestamps."""
+        ...
+
+    def close(self) -> None:
+        pass
+
+    def backoff(self, attempts: int) -> float:
+        return self.retry_delay * 2 ** max(attempts - 1, 0)
+
+
+class SQLiteQueue(JobQueue):
+    """Job queue in a SQLite database; leases are taken inside BEGIN IMMEDIATE transactions."""
+
+    def __init__(self, path: str, max_attempts: int = 3, retry_delay: float = 5.0):
+        super().__init__(max_attempts, retry_delay)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL DEFAULT 0,
+                lease_token TEXT,
+                lease_expires REAL,
+                worker TEXT,
+                error TEXT,
+                result TEXT,
+                enqueued_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, available_at)")
+
+    def put(self, job_id: str, payload: dict) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO jobs (id, payload, enqueued_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(payload), time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def lease(self, worker: str, seconds: float) -> Optional[Lease]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases count as failed attempts
+                self._db.execute(
+                    "UPDATE jobs SET state = 'failed', error = 'lease expired', finished_at = ? "
+                    "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                row = self._db.execute(
+                    "SELECT id, payload, attempts FROM jobs "
+                    "WHERE (state = 'queued' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?) "
+                    "ORDER BY enqueued_at LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_token = ?, "
+                    "lease_expires = ?, worker = ?, started_at = ? WHERE id = ?",
+                    (token, now + seconds, worker, now, row["id"]),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return Lease(row["id"], json.loads(row["payload"]), row["attempts"] + 1, token, now + seconds)
+
+    def _update_leased(self, lease: Lease, assignments: str, values: tuple) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND lease_token = ? AND state = 'leased'",
+                values + (lease.job_id, lease.token),
+            )
+            return cursor.rowcount == 1
+
+    def extend(self, lease: Lease, seconds: float) -> bool:
+        lease.expires = time.time() + seconds
+        return self._update_leased(lease, "lease_expires = ?", (lease.expires,))
+
+    def complete(self, lease: Lease, result: dict) -> bool:
+        return self._update_leased(lease, "state = 'done', result = ?, error = NULL, finished_at = ?",
+                                   (json.dumps(result), time.time()))
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        now = time.time()
+        if lease.attempts >= self.max_attempts:
+            return self._update_leased(lease, "state = 'failed', error = ?, finished_at = ?", (error, now))
+        return self._update_leased(lease, "state = 'queued', error = ?, available_at = ?",
+                                   (error, now + self.backoff(lease.attempts)))
+
+    def jobs(self) -> Iterator[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, state, attempts, worker, error, result, enqueued_at, started_at, finished_at "
+                "FROM jobs ORDER BY enqueued_at"
+            ).fetchall()
+        for row in rows:
+            job = dict(row)
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+            yield job
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class RespConnection:
+    """Minimal Redis protocol (RESP2) client: ``execute("HSET", key, field, value)``."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, timeout: float = 30.0):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile("rb")
+        self._lock = threading.Lock()
+
+    def execute(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        with self._lock:
+            self._sock.sendall(b"".join(parts))
+            return self._read()
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)[:-2]
+            return data.decode()
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise RuntimeError(f"Unexpected reply: {line!r}")
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+
+class RedisQueue(JobQueue):
+    """
+    Job queue on a Redis-protocol server. Each job is a hash ``<prefix>:job:<id>``;
+    ``<prefix>:queued`` is the list of runnable ids, ``<prefix>:leases`` and
+    ``<prefix>:delayed`` are sorted sets of lease expiries and retry times. A ZREM
+    that returns 1 decides which worker requeues an expired or delayed job, so only
+    plain commands are needed (no scripts or transactions).
+
+    A claim moves the id from ``queued`` to the ``<prefix>:processing`` list in one
+    LMOVE, so a job is never only in the memory of a worker. An id in ``processing``
+    without a lease belongs to a worker that died before recording it; it gets a lease
+    of ``claim_grace`` seconds (ZADD NX, so a live worker's own lease wins) and is
+    requeued when that expires.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, prefix: str = "imagecoderx",
+                 max_attempts: int = 3, retry_delay: float = 5.0, claim_grace: float = 30.0):
+        super().__init__(max_attempts, retry_delay)
+        self.prefix = prefix
+        self.claim_grace = claim_grace
+        self._conn = RespConnection(host, port)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def put(self, job_id: str, payload: dict) -> bool:
+        key = self._key("job", job_id)
+        if not self._conn.execute("HSETNX", key, "payload", json.dumps(payload)):
+            return False
+        self._conn.execute("HSET", key, "state", QUEUED, "attempts", 0, "enqueued_at", time.time())
+        self._conn.execute("RPUSH", self._key("all"), job_id)
+        self._conn.execute("RPUSH", self._key("queued"), job_id)
+        return True
+
+    def _requeue_due(self, now: float) -> None:
+        for job_id in self._conn.execute("ZRANGEBYSCORE", self._key("delayed"), "-inf", now):
+            if self._conn.execute("ZREM", self._key("delayed"), job_id) == 1:
+                self._conn.execute("RPUSH", self._key("queued"), job_id)
+        for job_id in self._conn.execute("LRANGE", self._key("processing"), 0, -1):
+            if self._conn.execute("ZSCORE", self._key("leases"), job_id) is None:
+                self._conn.execute("ZADD", self._key("leases"), "NX", now + self.claim_grace, job_id)
+        for job_id in self._conn.execute("ZRANGEBYSCORE", self._key("leases"), "-inf", now):
+            if self._conn.execute("ZREM", self._key("leases"), job_id) != 1:
+                continue
+            key = self._key("job", job_id)
+            if self._conn.execute("HGET", key, "state") in (DONE, FAILED):
+                # A leftover copy of a finished job: it only leaves processing
+                self._conn.execute("LREM", self._key("processing"), 1, job_id)
+                continue
+            if int(self._conn.execute("HGET", key, "attempts") or 0) >= self.max_attempts:
+                self._conn.execute("HSET", key, "state", FAILED, "error", "lease expired", "finished_at", now)
+            else:
+                # Queued again before it leaves processing, so a crash in between cannot lose it
+                self._conn.execute("RPUSH", self._key("queued"), job_id)
+            self._conn.execute("LREM", self._key("processing"), 1, job_id)
+
+    def lease(self, worker: str, seconds: float) -> Optional[Lease]:
+        now = time.time()
+        self._requeue_due(now)
+        job_id = self._conn.execute("LMOVE", self._key("queued"), self._key("processing"), "LEFT", "RIGHT")
+        if job_id is None:
+            return None
+        key = self._key("job", job_id)
+        token = uuid.uuid4().hex
+        attempts = self._conn.execute("HINCRBY", key, "attempts", 1)
+        self._conn.execute("HSET", key, "state", LEASED, "lease_token", token, "lease_expires", now + seconds,
+                           "worker", worker, "started_at", now)
+        self._conn.execute("ZADD", self._key("leases"), now + seconds, job_id)
+        payload = json.loads(self._conn.execute("HGET", key, "payload"))
+        return Lease(job_id, payload, attempts, token, now + seconds)
+
+    def _owns(self, lease: Lease) -> bool:
+        key = self._key("job", lease.job_id)
+        return self._conn.execute("HGET", key, "lease_token") == lease.token and \
+            self._conn.execute("HGET", key, "state") == LEASED
+
+    def extend(self, lease: Lease, seconds: float) -> bool:
+        if not self._owns(lease):
+            return False
+        lease.expires = time.time() + seconds
+        self._conn.execute("ZADD", self._key("leases"), lease.expires, lease.job_id)
+        self._conn.execute("HSET", self._key("job", lease.job_id), "lease_expires", lease.expires)
+        return True
+
+    def complete(self, lease: Lease, result: dict) -> bool:
+        if not self._owns(lease):
+            return False
+        self._conn.execute("HSET", self._key("job", lease.job_id), "state", DONE, "result", json.dumps(result),
+                           "error", "", "finished_at", time.time())
+        self._conn.execute("ZREM", self._key("leases"), lease.job_id)
+        self._conn.execute("LREM", self._key("processing"), 1, lease.job_id)
+        return True
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        if not self._owns(lease):
+            return False
+        now = time.time()
+        key = self._key("job", lease.job_id)
+        if lease.attempts >= self.max_attempts:
+            self._conn.execute("HSET", key, "state", FAILED, "error", error, "finished_at", now)
+        else:
+            self._conn.execute("HSET", key, "state", QUEUED, "error", error)
+            self._conn.execute("ZADD", self._key("delayed"), now + self.backoff(lease.attempts), lease.job_id)
+        self._conn.execute("ZREM", self._key("leases"), lease.job_id)
+        self._conn.execute("LREM", self._key("processing"), 1, lease.job_id)
+        return True
+
+    def jobs(self) -> Iterator[dict]:
+        for job_id in self._conn.execute("LRANGE", self._key("all"), 0, -1):
+            reply = self._conn.execute("HGETALL", self._key("job", job_id))
+            fields = dict(zip(reply[::2], reply[1::2]))
+            yield {
+                "id": job_id,
+                "state": fields.get("state"),
+                "attempts": int(fields.get("attempts") or 0),
+                "worker": fields.get("worker"),
+                "error": fields.get("error") or None,
+                "result": json.loads(fields["result"]) if fields.get("result") else None,
+                "enqueued_at": float(fields["enqueued_at"]) if fields.get("enqueued_at") else None,
+                "started_at": float(fields["started_at"]) if fields.get("started_at") else None,
+                "finished_at": float(fields["finished_at"]) if fields.get("finished_at") else None,
+            }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def open_queue(url: str, **options) -> JobQueue:
+    """Opens a queue from a ``sqlite:///path`` or ``redis://host:port/prefix`` URL."""
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        return SQLiteQueue(parsed.path or url[len("sqlite://"):], **options)
+    if parsed.scheme == "redis":
+        prefix = parsed.path.strip("/") or "imagecoderx"
+        return RedisQueue(parsed.hostname or "127.0.0.1", parsed.port or 6379, prefix, **options)
+    raise ValueError(f"Unsupported queue URL: {url} (expected sqlite:///path or redis://host:port/prefix)")
+
+
+def job_id_for(image_path: str, output_formats: list[str]) -> str:
+    """Job id: a hash of the image bytes and requested formats, so re-enqueueing is a no-op."""
+    digest = hashlib.blake2b(digest_size=12)
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(",".join(output_formats).encode())
+    return digest.hexdigest()
+
+
+def enqueue(queue: JobQueue, image_paths: list[str], output_dir: str, output_formats: list[str] = ("html",),
+            save_backgrounds: bool = False, deadline: Optional[float] = None) -> int:
+    """
+    Adds one job per image and returns how many were new. ``deadline`` is the
+    seconds a job may take once a worker starts it (see engine.deadline).
+    """
+    added = 0
+    output_formats = list(output_formats)
+    for image_path in image_paths:
+        job_id = job_id_for(image_path, output_formats)
+        payload = {
+            "image": os.path.abspath(image_path),
+            "formats": output_formats,
+            "output_dir": os.path.abspath(os.path.join(output_dir, job_id)),
+            "save_backgrounds": save_backgrounds,
+        }
+        if deadline is not None:
+            payload["deadline"] = deadline
+        added += queue.put(job_id, payload)
+    return added
+
+
+def output_paths(payload: dict) -> dict[str, str]:
+    """{format: path} of the files a job writes."""
+    stem = os.path.splitext(os.path.basename(payload["image"]))[0]
+    return {fmt: os.path.join(payload["output_dir"], f"{stem}.{fmt}") for fmt in payload["formats"]}
+
+
+def process_job(payload: dict) -> dict:
+    """
+    Converts the job's image and writes every format atomically. Outputs left by an
+    earlier attempt that got as far as writing them are reused. Returns the result
+    recorded in the queue, with the degradations applied to meet the job's deadline.
+    """
+    from imagecoderx import core
+    from imagecoderx.engine.deadline import Deadline
+    from imagecoderx.engine.run_store import RunStore
+
+    paths = output_paths(payload)
+    if all(os.path.exists(path) for path in paths.values()):
+        return {"outputs": paths, "reused": True}
+    os.makedirs(payload["output_dir"], exist_ok=True)
+    first_path = paths[payload["formats"][0]]
+    deadline = None
+    if payload.get("deadline") is not None:
+        deadline = Deadline(payload["deadline"], core.load_config().get("deadline_estimates"))
+    # A job that is retried resumes from the checkpoints of its earlier attempts
+    with RunStore(os.path.join(payload["output_dir"], "run.db")) as store:
+        outputs = core.convert_file(payload["image"], first_path, payload["formats"],
+                                    payload.get("save_backgrounds", False), deadline=deadline, store=store)
+    if not outputs:
+        raise ValueError(f"Could not convert {payload['image']}")
+    for fmt, code in outputs.items():
+        write_atomic(paths[fmt], code)
+    result = {"outputs": paths, "reused": False}
+    if deadline is not None:
+        result["degradations"] = deadline.degradations
+    return result
+
+
+def run_worker(queue: JobQueue, worker_id: Optional[str] = None, lease_seconds: float = 600.0,
+               max_jobs: Optional[int] = None, poll_interval: float = 1.0, exit_when_idle: bool = True,
+               handler=process_job, metrics_file: Optional[str] = None) -> int:
+    """
+    Leases and processes jobs until the queue is empty (or ``max_jobs`` is reached).
+    While a job runs its lease is extended every third of ``lease_seconds``; a worker
+    that dies simply lets the lease expire and another worker retries the job.
+    With ``metrics_file``, the process metrics are written there after every job.
+    Returns the number of jobs completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    completed = 0
+    while max_jobs is None or completed < max_jobs:
+        lease = queue.lease(worker_id, lease_seconds)
+        if lease is None:
+            if exit_when_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(lease_seconds / 3):
+                if not queue.extend(lease, lease_seconds):
+                    print(f"Lost lease on job {lease.job_id}")
+                    return
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            result = handler(lease.payload)
+        except Exception as e:
+            done.set()
+            thread.join()
+            print(f"Job {lease.job_id} failed (attempt {lease.attempts}): {e}")
+            queue.fail(lease, f"{type(e).__name__}: {e}")
+            JOBS.labels("failed").inc()
+        else:
+            done.set()
+            thread.join()
+            JOBS.labels("reused" if result.get("reused") else "done").inc()
+            if queue.complete(lease, result):
+                completed += 1
+        if metrics_file:
+            metrics.REGISTRY.write_textfile(metrics_file)
+    return completed
+
+
+def throughput_report(queue: JobQueue) -> dict:
+    """
+    Aggregates the queue: jobs per state, retries, jobs per worker, job duration
+    percentiles and overall throughput between the first start and the last finish.
+    """
+    jobs = list(queue.jobs())
+    states = {}
+    workers = {}
+    durations = []
+    for job in jobs:
+        states[job["state"]] = states.get(job["state"], 0) + 1
+        if job["state"] == DONE:
+            workers[job["worker"]] = workers.get(job["worker"], 0) + 1
+            if job["started_at"] and job["finished_at"]:
+                durations.append(job["finished_at"] - job["started_at"])
+    started = [job["started_at"] for job in jobs if job["started_at"]]
+    finished = [job["finished_at"] for job in jobs if job["state"] == DONE and job["finished_at"]]
+    elapsed = max(finished) - min(started) if finished and started else 0.0
+    return {
+        "jobs": len(jobs),
+        "states": states,
+        "retries": sum(max(job["attempts"] - 1, 0) for job in jobs),
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "jobs_per_minute": round(len(finished) / elapsed * 60, 2) if elapsed else 0.0,
+        "duration_mean": round(float(np.mean(durations)), 3) if durations else 0.0,
+        "duration_p95": round(float(np.percentile(durations, 95)), 3) if durations else 0.0,
+        "failed": [{"id": job["id"], "error": job["error"]} for job in jobs if job["state"] == FAILED],
+    }
+
+
+def _option(args: list[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args):
+            return args[idx + 1]
+    return default
+
+
+def main():
+    usage = ("Usage: imagecoderx-batch enqueue <queue-url> <image>... [--output-dir <dir>] [--out <format>[,...]]"
+             " [--deadline <seconds>]\n"
+             "       imagecoderx-batch work <queue-url> [--worker-id <id>] [--lease <seconds>] [--max-jobs <n>]"
+             " [--metrics-port <port>] [--metrics-file <path>]\n"
+             "       imagecoderx-batch report <queue-url>")
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ("enqueue", "work", "report"):
+        print(usage)
+        sys.exit(1)
+    command, url, rest = args[0], args[1], args[2:]
+    queue = open_queue(url)
+    try:
+        if command == "enqueue":
+            options = {"--output-dir", "--out", "--deadline"}
+            images = [a for i, a in enumerate(rest) if a not in options and (i == 0 or rest[i - 1] not in options)]
+            images = [a for a in images if a != "--save-backgrounds"]
+            formats = parse_output_formats(_option(rest, "--out", "html"))
+            deadline = _option(rest, "--deadline")
+            added = enqueue(queue, images, _option(rest, "--output-dir", "batch_output"), formats,
+                            save_backgrounds="--save-backgrounds" in rest,
+                            deadline=float(deadline) if deadline else None)
+            print(f"Enqueued {added} new jobs ({len(images) - added} already queued)")
+        elif command == "work":
+            max_jobs = _option(rest, "--max-jobs")
+            port = _option(rest, "--metrics-port")
+            if port:
+                metrics.start_http_server(int(port))
+                print(f"Serving metrics on port {port}")
+            completed = run_worker(queue, _option(rest, "--worker-id"), float(_option(rest, "--lease", "600")),
+                                   int(max_jobs) if max_jobs else None, metrics_file=_option(rest, "--metrics-file"))
+            print(f"Completed {completed} jobs")
+        else:
+            print(json.dumps(throughput_report(queue), indent=2))
+    finally:
+        queue.close()
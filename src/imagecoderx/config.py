@@ -1,21 +1,216 @@
+"""
+The global configuration in ~/.imagecoderx.json.
+
+Every setting has a default. ``"preset"`` ("fast", "balanced" or "quality") picks the
+values of the speed/quality tunables across region detection, color analysis, OCR
+and the LLM stages; keys in the file override the preset. Values are checked against
+SCHEMA when the file is loaded: a value of the wrong type or out of range is reported
+and replaced by its default, an unknown key is reported and kept.
+
+The file is read once per process and again only when it changes (its modification
+time or size), or when HOME points at another one.
+"""
 import os
 import json
+from typing import Optional
+
+DEFAULT_PRESET = "balanced"
+
+# "balanced" is the pipeline's behaviour when no preset is configured
+PRESETS = {
+    "fast": {
+        "region_kernel": 7,               # core.detect_text_regions: dilation kernel size
+        "region_dilate_iterations": 1,
+        "object_kernel": 50,              # core.detect_objects_and_remove_background
+        "object_padding": 50,
+        "extract_objects": False,         # rembg background removal in convert_file
+        "color_sample_size": 32,          # core.get_predominant_color: thumbnail side
+        "kmeans_attempts": 1,
+        "gradient_threshold": 30,         # color_analysis.detect_background_style
+        "ocr_mode": "page",               # one Tesseract pass for the page instead of one per region
+        "fastpath": True,
+        "fastpath_min_confidence": 0.6,
+        "prompt_token_budget": 256,
+        "llm_retries": 1,
+        "structured_retries": 0,
+        "final_refinement": False,        # the final LLM pass over the whole page
+    },
+    "balanced": {
+        "region_kernel": 5,
+        "region_dilate_iterations": 2,
+        "object_kernel": 50,
+        "object_padding": 50,
+        "extract_objects": True,
+        "color_sample_size": 100,
+        "kmeans_attempts": 10,
+        "gradient_threshold": 30,
+        "ocr_mode": "region",
+        "fastpath": True,
+        "fastpath_min_confidence": 0.75,
+        "prompt_token_budget": 512,
+        "llm_retries": 2,
+        "structured_retries": 2,
+        "final_refinement": True,
+    },
+    "quality": {
+        "region_kernel": 5,
+        "region_dilate_iterations": 2,
+        "object_kernel": 50,
+        "object_padding": 50,
+        "extract_objects": True,
+        "color_sample_size": 200,
+        "kmeans_attempts": 10,
+        "gradient_threshold": 20,
+        "ocr_mode": "region",
+        "fastpath": False,
+        "fastpath_min_confidence": 0.9,
+        "prompt_token_budget": 1024,
+        "llm_retries": 3,
+        "structured_retries": 2,
+        "final_refinement": True,
+    },
+}
+
+# Settings outside the presets
+DEFAULTS = {
+    "ollama_model": "llama3.2",
+    "image_interpretation_prompt": "Refine the following code/text...",
+    "ocr_tile_size": 0,
+    "ocr_options": [],
+    "classify_regions": True,
+    "asset_format": "png",
+    "asset_compression": 3,
+    "asset_quality": 90,
+    "prompt_layout_grid": 16,
+    "structured_output": False,
+    "router_min_confidence": 0.5,
+    "llm_retry_delay": 1.0,
+}
+
+
+def _positive(value) -> bool:
+    return value > 0
+
+
+def _non_negative(value) -> bool:
+    return value >= 0
+
+
+def _fraction(value) -> bool:
+    return 0 <= value <= 1
+
+
+_NUMBER = (int, float)
+
+# key: (accepted types, allowed values or a check, or None)
+SCHEMA = {
+    "preset": (str, tuple(PRESETS)),
+    "ollama_model": (str, None),
+    "ollama_host": (str, None),
+    "ollama_hosts": (list, None),
+    "ollama_pool": (dict, None),
+    "image_interpretation_prompt": (str, None),
+    "model_tiers": (list, None),
+    "final_model": (str, None),
+    "router_min_confidence": (_NUMBER, _fraction),
+    "llm_concurrency": (dict, None),
+    "llm_retries": (int, _non_negative),
+    "llm_retry_delay": (_NUMBER, _non_negative),
+    "structured_output": (bool, None),
+    "structured_retries": (int, _non_negative),
+    "prompt_token_budget": (int, _positive),
+    "prompt_layout_grid": (int, _positive),
+    "final_refinement": (bool, None),
+    "fastpath": (bool, None),
+    "fastpath_min_confidence": (_NUMBER, _fraction),
+    "classify_regions": (bool, None),
+    "region_kernel": (int, _positive),
+    "region_dilate_iterations": (int, _non_negative),
+    "object_kernel": (int, _positive),
+    "object_padding": (int, _non_negative),
+    "extract_objects": (bool, None),
+    "color_sample_size": (int, _positive),
+    "kmeans_attempts": (int, _positive),
+    "gradient_threshold": (_NUMBER, _non_negative),
+    "ocr_mode": (str, ("region", "page")),
+    "ocr_tile_size": (int, _non_negative),
+    "ocr_options": (list, None),
+    "cpu_workers": (int, _non_negative),
+    "resources": (dict, None),
+    "artifact_cache": ((str, dict), None),
+    "deadline_estimates": (dict, None),
+    "asset_format": (str, ("png", "webp", "avif")),
+    "asset_compression": (int, _non_negative),
+    "asset_quality": (int, _non_negative),
+}
+
+
+def validate_config(config: dict) -> dict[str, str]:
+    """Returns the problems with a config dict by key (empty if it is valid); unknown keys are not checked."""
+    errors = {}
+    for key, value in config.items():
+        if key not in SCHEMA:
+            continue
+        types, check = SCHEMA[key]
+        types = types if isinstance(types, tuple) else (types,)
+        # bool is an int subclass, but true is not a kernel size
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            errors[key] = f"expected {' or '.join(t.__name__ for t in types)}, got {value!r}"
+        elif callable(check) and not check(value):
+            errors[key] = f"{value!r} is out of range"
+        elif check is not None and not callable(check) and value not in check:
+            errors[key] = f"expected one of {', '.join(check)}, got {value!r}"
+    return errors
+
+
+def resolve_config(config: dict) -> dict:
+    """
+    The effective config for the settings in a config file: the defaults, the preset's
+    tunables, then the file's own values. Problems are printed; invalid values are dropped.
+    """
+    errors = validate_config(config)
+    for key, error in errors.items():
+        print(f"Config error: {key}: {error} (using the default)")
+    for key in config:
+        if key not in SCHEMA:
+            print(f"Warning: unknown config key {key!r}")
+    preset = config.get("preset", DEFAULT_PRESET) if "preset" not in errors else DEFAULT_PRESET
+    resolved = {**DEFAULTS, **PRESETS[preset], "preset": preset}
+    resolved.update((key, value) for key, value in config.items() if key not in errors)
+    return resolved
+
+
+_cache: dict[str, tuple[tuple, dict]] = {}
+
 
-def load_config():
+def load_config(path: Optional[str] = None) -> dict:
     """
-    Loads the global config from ~/.imagecoderx.json or creates
-    a default config if not found.
+    Loads the global config from ~/.imagecoderx.json (or path), creating a default one
+    if not found, and returns it resolved (see resolve_config). The result is cached until
+    the file changes and shared by all callers, so treat it as read-only.
     """
-    config_path = os.path.expanduser("~/.imagecoderx.json")
+    config_path = path or os.path.expanduser("~/.imagecoderx.json")
     if not os.path.exists(config_path):
         default_config = {
-            "ollama_model": "llama3.2",
-            "image_interpretation_prompt": "Refine the following code/text..."
-            # Add more default settings as needed
+            "ollama_model": DEFAULTS["ollama_model"],
+            "image_interpretation_prompt": DEFAULTS["image_interpretation_prompt"],
+            "preset": DEFAULT_PRESET,
         }
         with open(config_path, "w") as f:
             json.dump(default_config, f, indent=2)
-        return default_config
-    else:
+    stat = os.stat(config_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(config_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
         with open(config_path, "r") as f:
-            return json.load(f)
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("the file must hold a JSON object")
+    except (OSError, ValueError) as e:
+        print(f"Error reading config {config_path}: {e} (using the defaults)")
+        config = {}
+    resolved = resolve_config(config)
+    _cache[config_path] = (key, resolved)
+    return resolved
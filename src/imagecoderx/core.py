@@ -1,14 +1,33 @@
 import sys
 import os
+import base64
+import contextlib
+import io
+import json
 import subprocess
+import tarfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from typing import Optional, Union
 import cv2
 import numpy as np
-from bs4 import BeautifulSoup
-from imagecoderx import ocr, llm
-from imagecoderx.algorithms import algorithms
+from imagecoderx import governor, metrics, ocr, llm, router
 from imagecoderx.config import load_config
 from imagecoderx.engine.html_orchestrator import combine_html_sections
+from imagecoderx.engine.regions import RegionSet
+from imagecoderx.engine.asset_writer import AssetWriter, data_uri, load_asset_manifest
+from imagecoderx.engine import fastpath
+from imagecoderx.engine.emitters import EMITTERS, emit, parse_output_formats
+from imagecoderx.engine.page_ir import build_page_ir, is_document
+from imagecoderx.engine.progressive import ProgressiveDocument, draft_snippet, write_atomic
+from imagecoderx.engine.deadline import Deadline, importance
+from imagecoderx.engine.run_store import RunStore, run_id_for
+from imagecoderx.engine.artifact_cache import ArtifactCache, get_cache
+from imagecoderx.engine.shm import SharedImage, run_on_crop
+from imagecoderx.algorithms.region_classifier import CODE, EMPTY, classify_boxes
 from imagecoderx.algorithms import color_analysis
+from imagecoderx.algorithms.spatial_index import SpatialIndex, merge_overlapping_boxes, remove_contained_boxes
 
 def fix_html_tags(html_content: str) -> str:
     """
@@ -18,25 +37,49 @@ def fix_html_tags(html_content: str) -> str:
     html_content = html_content.replace("&lt;", "<").replace("&gt;", ">")
     return html_content
 
-def detect_text_regions(image_path: str) -> list[tuple[float, float, float, float]]:
+def load_image(image: Union[str, np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Returns the decoded BGR image for a path, or the array itself if it is already decoded.
+    Prints an error and returns None when the path cannot be read.
+    """
+    if not isinstance(image, str):
+        return image
+    img = cv2.imread(image)
+    if img is None:
+        print(f"Error: Could not read image at {image}")
+    return img
+
+def decode_image(data: Union[bytes, bytearray, memoryview]) -> Optional[np.ndarray]:
+    """
+    Decodes an encoded image (PNG, JPEG, ...) held in memory into a BGR array.
+    Prints an error and returns None when the data is not an image.
+    """
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) if len(data) else None
+    if img is None:
+        print("Error: Could not decode image data")
+    return img
+
+def detect_text_regions(image: Union[str, np.ndarray], kernel_size: int = 5,
+                        iterations: int = 2) -> list[tuple[float, float, float, float]]:
     """
     Detects regions likely to contain text in the image using OpenCV.
+    Accepts an image path or an already decoded BGR image. Nearby text is merged by
+    dilating with a kernel_size square kernel ("region_kernel" in the config) iterations times.
     Returns a list of tuples, each containing the relative (x, y, width, height) of a text region.
     """
-    img = cv2.imread(image_path)
+    img = load_image(image)
     if img is None:
-        print(f"Error: Could not read image at {image_path}")
         return []
 
     # Convert the image to grayscale
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-    # Apply adaptive thresholding to identify text regions
-    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+    # Apply adaptive thresholding to identify text regions (in place, gray is not needed afterwards)
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2, dst=gray)
 
     # Dilate the thresholded image to merge nearby text regions
-    kernel = np.ones((5, 5), np.uint8)
-    dilated = cv2.dilate(thresh, kernel, iterations=2)
+    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    dilated = cv2.dilate(thresh, kernel, iterations=iterations, dst=thresh)
 
     # Find contours
     contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -59,7 +102,8 @@ def detect_text_regions(image_path: str) -> list[tuple[float, float, float, floa
 
             text_regions.append((relative_x, relative_y, relative_width, relative_height))
 
-    return text_regions
+    # Drop regions nested inside other regions so they are not OCR'd twice
+    return remove_contained_boxes(text_regions)
 
 def analyze_background(image_path: str) -> str:
     """
@@ -90,27 +134,71 @@ def analyze_background(image_path: str) -> str:
     else:
         return "background"
 
-def analyze_element_type(section_path: str) -> str:
+def analyze_element_type(section_path: Union[str, np.ndarray]) -> str:
     """
-    Use rembg result or additional logic to determine if the element is a logo, background, or code.
-    This function can be refined for multi-step analysis or further OCR checks.
+    Determines if an element image (e.g. a rembg result) is a logo, background, or code
+    using the vectorized heuristics in region_classifier (edge density, color variance,
+    text-stroke ink ratio, aspect ratio).
     """
-    # If there's significant text, consider it 'code'
-    # If shape or small area, consider it 'logo'
-    # Otherwise default to 'background'
-    return "code"  # Placeholder
+    img = load_image(section_path)
+    if img is None:
+        return "code"
+    height, width = img.shape[:2]
+    label = classify_boxes(img[:, :, :3] if img.ndim == 3 else img, [(0, 0, width, height)])[0]
+    return "background" if label == EMPTY else label
 
-def get_predominant_color(image_path: str) -> str:
+def classify_regions(regions: RegionSet) -> dict:
+    """
+    Labels every region of a RegionSet (code, logo, background or empty) and drops
+    the empty ones. Features are computed per region on crop views of the shared
+    image; the threshold rules then run vectorized over all regions at once.
+    Returns the number of regions per label.
     """
-    Detects the predominant background color of the image.
+    image_height, image_width = regions.image.shape[:2]
+    labels = classify_boxes(regions.image, [region.pixel_box(image_width, image_height) for region in regions])
+    counts = {}
+    for region, label in zip(regions, labels):
+        region.type = label
+        counts[label] = counts.get(label, 0) + 1
+    regions.discard_type(EMPTY)
+    return counts
+
+def export_image_regions(regions: RegionSet, asset_dir: Optional[str] = None, asset_base_url: str = "",
+                         asset_format: str = "png") -> None:
+    """
+    Gives every logo/background region an image source for combine_html_sections:
+    the crop is written to asset_dir (see AssetWriter) when given, otherwise embedded as a data URI.
+    """
+    image_regions = [region for region in regions if region.type != CODE]
+    if not image_regions:
+        return
+    if asset_dir is None:
+        for region in image_regions:
+            region.filename = data_uri(region.crop, asset_format)
+        return
+    with AssetWriter(asset_dir, format=asset_format, manifest_name="regions.json") as writer:
+        for region in image_regions:
+            writer.submit(f"page_region_{region.index}", region.crop, region=region, role="crop")
+    for region in image_regions:
+        name = f"page_region_{region.index}{writer.ext}"
+        region.filename = f"{asset_base_url.rstrip('/')}/{name}" if asset_base_url else name
+
+def get_predominant_color(image_path: str, sample_size: Optional[int] = None, attempts: Optional[int] = None) -> str:
     """
+    Detects the predominant background color of the image, by k-means on a sample_size
+    square thumbnail with the given number of attempts ("color_sample_size" and
+    "kmeans_attempts" in the config by default).
+    """
+    config = load_config()
+    sample_size = sample_size or config["color_sample_size"]
+    attempts = attempts or config["kmeans_attempts"]
     img = cv2.imread(image_path)
     if img is None:
         print(f"Error: Could not read image at {image_path}")
         return "#FFFFFF"  # Default white color
 
     # Resize the image to reduce computation
-    resized_img = cv2.resize(img, (100, 100), interpolation=cv2.INTER_AREA)
+    resized_img = cv2.resize(img, (sample_size, sample_size), interpolation=cv2.INTER_AREA)
 
     # Reshape the image to be a list of pixels
     pixels = resized_img.reshape((-1, 3))
@@ -121,7 +209,7 @@ def get_predominant_color(image_path: str) -> str:
     # Define criteria and apply kmeans()
     criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
     K = 1  # Number of clusters
-    _, labels, centers = cv2.kmeans(pixels, K, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
+    _, labels, centers = cv2.kmeans(pixels, K, None, criteria, attempts, cv2.KMEANS_RANDOM_CENTERS)
 
     # Get the predominant color
     predominant_color = centers[0].astype(np.uint8)
@@ -130,20 +218,95 @@ def get_predominant_color(image_path: str) -> str:
     hex_color = '#{:02x}{:02x}{:02x}'.format(int(predominant_color[2]), int(predominant_color[1]), int(predominant_color[0]))
     return hex_color
 
-def convert_image_to_code(image_path: str, output_format: str) -> str:
+def convert_image_to_code(image_path: str, output_format: str, asset_manifest=None, asset_base_url: str = "",
+                          timings: Optional[dict] = None, asset_dir: Optional[str] = None) -> str:
     """
     Converts an image to code accurately using Tesseract, Ollama, and custom algorithms.
+    asset_manifest (a manifest.json path or dict from detect_objects_and_remove_background)
+    adds the extracted logo/background images to the page, with src relative to asset_base_url.
+    Regions the classifier finds to be images are written to asset_dir (or inlined as data
+    URIs) instead of going through OCR and the LLM; empty regions are dropped. Simple text
+    regions are generated by rules (see engine.fastpath) unless the "fastpath" config is off.
+    If a timings dict is passed, it is filled with the seconds spent in each stage.
     """
-    # Detect text regions
-    text_regions = detect_text_regions(image_path)
-
-    # Load the image
-    img = cv2.imread(image_path)
+    outputs = convert_image_to_formats(image_path, [output_format], asset_manifest, asset_base_url, timings, asset_dir)
+    return outputs.get(output_format, "")
+
+def convert_image_to_formats(image_path: str, output_formats: list[str], asset_manifest=None, asset_base_url: str = "",
+                             timings: Optional[dict] = None, asset_dir: Optional[str] = None,
+                             progress: Optional[ProgressiveDocument] = None,
+                             deadline: Optional[Deadline] = None, store: Optional[RunStore] = None,
+                             region_results: Optional[dict] = None) -> dict[str, str]:
+    """
+    Runs the pipeline once and returns {format: code} for every format in output_formats
+    (html, tsx, jsx, dart). Regions are generated as HTML, merged into a page IR and each
+    format is emitted from it deterministically, so extra formats cost no model calls.
+    With a ProgressiveDocument, a draft page is written as soon as OCR is done and updated
+    as each region's code arrives; writing the final outputs is still left to the caller.
+    With a Deadline, regions whose LLM call no longer fits the budget get rule or raw-OCR
+    markup instead and the final refinement is skipped if it does not fit; each such
+    degradation is recorded on the Deadline (see engine.deadline).
+    With a RunStore, regions, OCR results, snippets and the final page are checkpointed as
+    they complete, and a rerun on the same image only redoes missing or failed work.
+    With a region_results dict ({pixel box: (text, char boxes, code)}, e.g. from an earlier
+    frame of a sequence whose pixels there are unchanged), text regions with the same pixel
+    box reuse that OCR text and code; the dict is then refilled with this run's regions.
+    See convert_image_to_code for the other arguments.
+    """
+    for output_format in output_formats:
+        if output_format not in EMITTERS:
+            print(f"Error: Unsupported output format {output_format}")
+            return {}
+    start = time.perf_counter()
+    config = load_config()
+    # Thread budgets for OpenCV, Tesseract and onnxruntime come first, before any of them run
+    resources = governor.configure(config)
+    # The router is shared by the process; this image's tier counts are the difference to this snapshot
+    model_router = router.get_router(config)
+    tier_counts = model_router.counts()
+    # Load the image once; every later stage works on it or on views into it
+    img = load_image(image_path)
+    if img is None:
+        metrics.FAILURES.labels("decode").inc()
+        return {}
     image_height, image_width = img.shape[:2]
+    # Regions carry their crop (a view into img), OCR result and generated code
+    regions = RegionSet(image=img)
+    regions.timings["decode"] = time.perf_counter() - start
+
+    # With a run store, a rerun of the same image restores its regions and their finished work;
+    # the artifact cache keeps the deterministic stage outputs for any run of the same pixels
+    cache = get_cache(config)
+    run_id = run_id_for(img) if store is not None or cache is not None else None
+    restored = store.load_regions(run_id) if store is not None else []
+
+    # Detect text regions
+    with regions.timed("detect"):
+        if restored:
+            for row in restored:
+                region = regions.add(row["box"], type=row["type"])
+                region.filename, region.text, region.char_boxes, region.code = (
+                    row["filename"], row["text"], row["char_boxes"], row["code"])
+            print(f"Resuming run {run_id}: {store.stats(run_id)}")
+        else:
+            detection = (config["region_kernel"], config["region_dilate_iterations"])
+            if cache is not None:
+                boxes = cache.cached(cache.key(run_id, "regions", detection), "array",
+                                     lambda: np.array(detect_text_regions(img, *detection), dtype=np.float64).reshape(-1, 4))
+            else:
+                boxes = detect_text_regions(img, *detection)
+            for box in boxes:
+                regions.add(tuple(box))
 
     # Get the background style
-    bg_style = color_analysis.detect_background_style(image_path)
-    bg_css = color_analysis.generate_background_css(bg_style)
+    with regions.timed("background"):
+        threshold = config["gradient_threshold"]
+        if cache is not None:
+            bg_style = cache.cached(cache.key(run_id, "background", threshold), "json",
+                                    lambda: color_analysis.detect_background_style(img, threshold))
+        else:
+            bg_style = color_analysis.detect_background_style(img, threshold)
+        bg_css = color_analysis.generate_background_css(bg_style)
 
     # Initialize HTML structure
     html_content = f"""<!DOCTYPE html>
@@ -162,79 +325,292 @@ def convert_image_to_code(image_path: str, output_format: str) -> str:
     </style>
 </head>
 <body>"""
-    body_content = ""
-    style_content = ""
-
-    # Enhanced approach: store partial HTML segments & data in lists
-    partial_html_list = []
-    element_positions = []
-
-    for i, (x, y, w, h) in enumerate(text_regions):
-        # Calculate absolute coordinates
-        x1 = int(x * image_width)
-        y1 = int(y * image_height)
-        x2 = int((x + w) * image_width)
-        y2 = int((y + h) * image_height)
-
-        # Crop the region from the image
-        region_roi = img[y1:y2, x1:x2]
-
-        # Save the region to a temporary file
-        temp_file = os.path.join(os.path.dirname(image_path), f"temp_region_{i}.png")
-        cv2.imwrite(temp_file, region_roi)
-
-        # Extract text from the region
-        text, boxes = ocr.extract_text_from_image(temp_file)
-
-        # Get code from LLM
-        refined_code = llm.process_text_with_llm(image_path, text, boxes, output_format, [(x, y, w, h)])
-
-        partial_html_list.append(refined_code)
-        element_positions.append({
-            "type": "code",
-            "relative_x": x,
-            "relative_y": y,
-            "width": w,
-            "height": h,
-            "filename": None,
-        })
-
-        # Extract body and style from the code
-        soup = BeautifulSoup(refined_code, 'html.parser')
-        body = soup.find('body')
-        style = soup.find('style')
-
-        if body:
-            body_content += str(body.contents[0]) if body.contents else ""
-        if style:
-            style_content += str(style.contents[0]) if style.contents else ""
-
-        # Remove the temporary file
-        os.remove(temp_file)
+    if config.get("classify_regions", True) and not restored:
+        # Route pictures straight to asset extraction and drop blank panels before OCR/LLM
+        with regions.timed("classify"):
+            detected = len(regions)
+            counts = classify_regions(regions)
+            export_image_regions(regions, asset_dir, asset_base_url, config.get("asset_format", "png"))
+        regions.stats["region_types"] = counts
+        regions.stats["llm_calls_avoided"] = detected - counts.get(CODE, 0)
+        print(f"Region classifier: {counts}, {regions.stats['llm_calls_avoided']} LLM calls avoided")
+    if store is not None and not restored:
+        store.save_regions(run_id, regions, image_path if isinstance(image_path, str) else None)
+
+    regions.stats["reused_regions"] = 0
+    if region_results:
+        for region in regions.of_type(CODE):
+            known = region_results.get(region.pixel_box(image_width, image_height))
+            if region.code is None and known is not None:
+                region.text, region.char_boxes, region.code = known
+                regions.stats["reused_regions"] += 1
+                if store is not None:
+                    store.save_ocr(run_id, region)
+                    store.save_code(run_id, region)
+
+    use_fastpath = config.get("fastpath", True)
+    min_confidence = config.get("fastpath_min_confidence", 0.75)
+    page_background = bg_style["color"] if bg_style["type"] == "solid" else bg_style["colors"][0]
+    regions.stats["fastpath"] = 0
+
+    # Extra Tesseract options ("ocr_options", e.g. ["--psm", "6"]) are part of the OCR cache keys
+    ocr_options = tuple(config.get("ocr_options", ()))
+    page_text = None
+    if config.get("ocr_mode", "region") == "page" and any(r.text is None for r in regions.of_type(CODE)):
+        # One word-level OCR pass over the page, then words are joined to the region boxes
+        with regions.timed("ocr"):
+            tile_size = config.get("ocr_tile_size", 0)
+            if cache is not None:
+                rows = cache.cached(cache.key(run_id, "words", [tile_size, ocr_options]), "json",
+                                    # An empty table may be a failed run, so it is not stored
+                                    lambda: ocr.extract_words(img, tile_size=tile_size, options=ocr_options).tolist() or None)
+                words = np.array([tuple(row) for row in rows or ()], dtype=ocr.WORD_DTYPE)
+            else:
+                words = ocr.extract_words(img, tile_size=tile_size, options=ocr_options)
+            page_text = ocr.PageText(words, [region.pixel_box(image_width, image_height) for region in regions])
+
+    # Boxes nested inside a region (pictures, sub-panels) count towards its complexity
+    index = SpatialIndex(regions.boxes) if len(regions) else None
+
+    # Once a region is given up for the deadline, a late LLM result must not overwrite its fallback
+    abandoned = set()
+    failures = set()
+    code_lock = threading.Lock()
+
+    retries = config.get("llm_retries", 2)
+    retry_delay = config.get("llm_retry_delay", 1.0)
+    regions.stats["failed_regions"] = 0
+    generated = []
+
+    def fallback_code(region):
+        # Rules where they produce anything, the raw OCR text otherwise
+        return fastpath.generate_snippet(region, "html", image_height, page_background)[0] or draft_snippet(region)
+
+    def generate_code(region, rule_confidence=None):
+        nested = max(len(index.contained_in(region.box)) - 1, 0)
+        complexity = router.region_complexity(region.text, region.char_boxes, nested, rule_confidence)
+        # Failed calls are retried with exponential backoff; a region that still fails gets
+        # fallback markup instead of an error message, and is left for a rerun to retry
+        for attempt in range(retries + 1):
+            try:
+                with region.timed("llm"):
+                    code = llm.process_text_with_llm(image_path, region.text, region.char_boxes, "html", [region.box],
+                                                     region_id=region.index, complexity=complexity, raise_errors=True)
+                failed = None
+                break
+            except Exception as e:
+                failed = f"{type(e).__name__}: {e}"
+                delay = retry_delay * 2 ** attempt
+                if attempt == retries or region.index in abandoned or (
+                        deadline is not None and deadline.remaining() < delay + deadline.estimates["llm"]):
+                    break
+                print(f"LLM call for region {region.index} failed ({failed}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        with code_lock:
+            if region.index in abandoned:
+                return
+            if failed is None:
+                region.code = code
+                generated.append(region.index)
+            else:
+                region.code = fallback_code(region)
+                failures.add(region.index)
+                regions.stats["failed_regions"] += 1
+        if store is not None:
+            if failed is None:
+                store.save_code(run_id, region)
+            else:
+                store.mark_failed(run_id, region, failed)
+        if progress is not None:
+            progress.update(region)
+
+    def fall_back(region, reason):
+        with code_lock:
+            abandoned.add(region.index)
+            region.code = fallback_code(region)
+        deadline.degrade("region_llm", reason, region.index)
+        if progress is not None:
+            progress.update(region)
+
+    # LLM calls run concurrently with the remaining OCR; the adaptive limiter decides how
+    # many are in flight at once (see llm.get_limiter). The most important regions go first,
+    # so with a deadline the ones left over are the least important.
+    limiter = llm.get_limiter(config)
+    if deadline is not None:
+        # Latency seen by earlier runs in this process beats the default estimate
+        deadline.observe("llm", limiter.stats()["latency_long"])
+    executor = ThreadPoolExecutor(max_workers=limiter.max_limit, thread_name_prefix="llm")
+    ordered = sorted(regions.of_type(CODE), key=importance, reverse=True)
+    # With "cpu_workers", per-region OCR runs in worker processes that read their crop from
+    # shared memory (see engine.shm) instead of receiving a pickled copy; the resource preset
+    # picks the default and gives each worker its share of the cores (see governor)
+    cpu_workers = config.get("cpu_workers", resources.cpu_workers if resources is not None else 0)
+    if cache is not None:
+        # OCR results of earlier runs on the same pixels
+        for region in ordered:
+            region.cache_key = cache.key(run_id, "ocr", [region.pixel_box(image_width, image_height), ocr_options])
+            if region.code is None and region.text is None and page_text is None:
+                hit = cache.get(region.cache_key, "json")
+                if hit is not None:
+                    region.text, region.char_boxes = hit
+    ocr_jobs = [region for region in ordered if region.code is None and region.text is None]
+    shared = SharedImage(img) if cpu_workers and page_text is None and ocr_jobs else None
+    cpu_pool = None
+    if shared is not None:
+        cpu_pool = ProcessPoolExecutor(max_workers=cpu_workers, initializer=governor.init_worker,
+                                       initargs=(config.get("resources") or {}, cpu_workers))
+    try:
+        ocr_futures = {
+            region.index: cpu_pool.submit(run_on_crop, ocr.extract_text_from_image, shared.handle,
+                                          region.pixel_box(image_width, image_height), ocr_options)
+            for region in (ocr_jobs if cpu_pool is not None else ())
+        }
+        pending = []
+        for region in ordered:
+            if region.code is not None:
+                # Finished in an earlier run
+                continue
+            if region.text is None:
+                if page_text is not None:
+                    region.text, region.char_boxes, region.ocr_confidence = page_text.region_text(region.index)
+                elif region.index in ocr_futures:
+                    with region.timed("ocr"):
+                        region.text, region.char_boxes = ocr_futures[region.index].result()
+                else:
+                    # Extract text from the region; the crop view is streamed to tesseract, not written to disk
+                    with region.timed("ocr"):
+                        region.text, region.char_boxes = ocr.extract_text_from_image(region.crop, ocr_options)
+                if cache is not None and page_text is None and region.text is not None:
+                    cache.put(region.cache_key, "json", [region.text, region.char_boxes])
+            if store is not None:
+                store.save_ocr(run_id, region)
+
+            confidence = None
+            if use_fastpath:
+                # Simple text (headings, labels, buttons, short paragraphs) is emitted by rules;
+                # anything the rules are unsure about is escalated to the LLM
+                with region.timed("fastpath"):
+                    code, confidence = fastpath.generate_snippet(region, "html", image_height, page_background)
+                if code and confidence >= min_confidence:
+                    region.code = code
+                    regions.stats["fastpath"] += 1
+                    generated.append(region.index)
+                    if store is not None:
+                        store.save_code(run_id, region)
+                    continue
+
+            if deadline is not None and not deadline.allows("llm", count=(len(pending) + 1) / limiter.limit):
+                fall_back(region, "not enough time for an LLM call")
+                continue
+            # Get code from LLM
+            pending.append((region, executor.submit(generate_code, region, confidence)))
+        assets = load_asset_manifest(asset_manifest, asset_base_url) if asset_manifest else None
+        if progress is not None:
+            # Every region has its OCR text now; the LLM results replace it as they arrive
+            progress.draft(regions, bg_css, assets)
+        for region, future in pending:
+            try:
+                future.result(timeout=None if deadline is None else deadline.remaining())
+            except TimeoutError:
+                future.cancel()
+                fall_back(region, "deadline reached")
+    finally:
+        # Calls still running past the deadline are left to finish in the background
+        executor.shutdown(wait=deadline is None or not deadline.expired(), cancel_futures=True)
+        if cpu_pool is not None:
+            cpu_pool.shutdown(cancel_futures=True)
+            shared.close()
+    if region_results is not None:
+        # Only finished work is carried over: not fallbacks for failed or abandoned regions
+        region_results.clear()
+        region_results.update(
+            (region.pixel_box(image_width, image_height), (region.text, region.char_boxes, region.code))
+            for region in regions.of_type(CODE)
+            if region.code is not None and region.index not in abandoned and region.index not in failures)
+    regions.stats["llm_concurrency"] = limiter.stats()
+    if cache is not None:
+        regions.stats["artifact_cache"] = cache.stats()
+    if deadline is not None:
+        deadline.observe("llm", regions.stats["llm_concurrency"]["latency_long"])
+
+    if use_fastpath:
+        print(f"Fast path: {regions.stats['fastpath']} of {len(regions.of_type(CODE))} text regions generated without the LLM")
 
     # Merge partial HTML
-    final_combined_html = combine_html_sections(partial_html_list, element_positions)
+    with regions.timed("combine"):
+        final_combined_html = combine_html_sections(regions, assets=assets, page_css=bg_css)
 
     # Send the merged HTML to the LLM for one more round of improvements
-    improved_html = llm.process_final_html(final_combined_html)
-
-    # Optionally apply custom formatting again
-    improved_html = algorithms.apply_custom_algorithms(improved_html, output_format)
-
-    # Correct HTML tag formats
-    improved_html = fix_html_tags(improved_html)
-
-    return improved_html
-
-def detect_objects_and_remove_background(image_path: str, output_dir: str):
+    with regions.timed("final_llm"):
+        stored_final = store.load_final(run_id) if store is not None and restored and not generated else None
+        if stored_final is not None:
+            # Nothing changed since the run that produced it
+            improved_html = stored_final
+        elif not config["final_refinement"]:
+            improved_html = final_combined_html
+        elif deadline is not None and not deadline.allows("final_llm"):
+            deadline.degrade("final_llm", "not enough time for the refinement pass")
+            improved_html = final_combined_html
+        else:
+            improved_html = llm.process_final_html(final_combined_html)
+            complete = not regions.stats["failed_regions"] and not abandoned
+            if store is not None and complete and improved_html != final_combined_html:
+                store.save_final(run_id, improved_html)
+    regions.stats["model_tiers"] = model_router.stats(since=tier_counts)
+    if deadline is not None:
+        regions.stats["degradations"] = deadline.summary()
+    if len(model_router.tiers) > 1:
+        print(f"Model tiers: { {name: counts['requests'] for name, counts in regions.stats['model_tiers'].items()} }")
+
+    with regions.timed("format"):
+        # A whole HTML document is kept as it is: its head content (links, meta tags) and
+        # scripts are not part of the page IR. Every other format, and HTML for a fragment,
+        # is emitted from the IR, which is built once
+        page = None
+        outputs = {}
+        for output_format in output_formats:
+            if output_format == "html" and is_document(improved_html):
+                outputs["html"] = improved_html
+                continue
+            if page is None:
+                page = build_page_ir(improved_html)
+            outputs[output_format] = emit(page, output_format)
+        if "html" in outputs:
+            # Correct HTML tag formats
+            outputs["html"] = fix_html_tags(outputs["html"])
+
+    stage_timings = regions.stage_timings()
+    total = time.perf_counter() - start
+    metrics.IMAGES.inc()
+    metrics.IMAGE_SECONDS.observe(total)
+    metrics.REGIONS.observe(len(regions))
+    for stage, seconds in stage_timings.items():
+        metrics.STAGE_SECONDS.labels(stage).observe(seconds)
+    if regions.stats["failed_regions"]:
+        metrics.FAILURES.labels("codegen").inc(regions.stats["failed_regions"])
+    if timings is not None:
+        timings.update(stage_timings)
+        timings["total"] = total
+    return outputs
+
+def detect_objects_and_remove_background(image_path: Union[str, np.ndarray], output_dir: str, save_backgrounds: bool = False,
+                                         asset_format: str = "png", compression: int = 3, quality: int = 90,
+                                         cache: Optional[ArtifactCache] = None, writer: Optional[AssetWriter] = None,
+                                         kernel_size: int = 50, padding: int = 50):
     """
-    Divides the image into broader regions that look similar to each other using OpenCV,
+    Divides the image into broader regions that look similar to each other using OpenCV
+    (dilating with a kernel_size square kernel, then padding each box by padding pixels),
     removes their backgrounds using rembg, saves the results, and records their relative positions.
+    With an ArtifactCache, rembg output for the same pixels is reused instead of recomputed.
+    Assets are encoded and written on a thread pool (see AssetWriter) together with a
+    manifest.json in output_dir; unchanged assets from a previous run are not rewritten.
+    The inverted background of each region is only written when save_backgrounds is set.
+    A writer passed in (e.g. an in-memory ``AssetWriter(None)``) is used and closed instead.
+    Returns the extracted regions as a RegionSet (None if the image cannot be read).
     """
     # Load the image
-    img = cv2.imread(image_path)
+    img = load_image(image_path)
     if img is None:
-        print(f"Error: Could not read image at {image_path}")
         return
 
     # Convert the image to grayscale
@@ -244,68 +620,175 @@ def detect_objects_and_remove_background(image_path: str, output_dir: str):
     thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
 
     # Dilate the thresholded image to merge nearby regions
-    kernel = np.ones((50, 50), np.uint8)  # Increased kernel size for broader regions
+    kernel = np.ones((kernel_size, kernel_size), np.uint8)  # Large kernel for broader regions
     dilated = cv2.dilate(thresh, kernel, iterations=1)
 
     # Find contours
     contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    # Create the output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-
     image_height, image_width, _ = img.shape
 
-    for i, contour in enumerate(contours):
-        # Get the bounding box for the contour
+    # Enlarge each bounding box slightly, then merge the padded boxes that overlap
+    padded_boxes = []
+    for contour in contours:
         x, y, w, h = cv2.boundingRect(contour)
-
-        # Enlarge and adjust the bounding box slightly
-        padding = 50  # Increased padding for broader regions
         x1 = max(0, x - padding)
         y1 = max(0, y - padding)
         x2 = min(img.shape[1], x + w + padding)
         y2 = min(img.shape[0], y + h + padding)
-
-        # Calculate relative positions
-        relative_x = x1 / image_width
-        relative_y = y1 / image_height
-        relative_width = (x2 - x1) / image_width
-        relative_height = (y2 - y1) / image_height
-
-        print(f"Region {i} Position: x={relative_x:.2f}, y={relative_y:.2f}, width={relative_width:.2f}, height={relative_height:.2f}")
-
-        # Crop the region from the image
-        region_roi = img[y1:y2, x1:x2]
-
-        # Save the region to a temporary file
-        temp_file = os.path.join(output_dir, f"temp_region_{i}.png")
-        cv2.imwrite(temp_file, region_roi)
-
-        # Use rembg CLI to remove the background
-        output_file = os.path.join(output_dir, f"region_{i}_no_bg.png")
+        padded_boxes.append((x1, y1, x2 - x1, y2 - y1))
+    regions = RegionSet(image=img)
+    for x, y, w, h in merge_overlapping_boxes(padded_boxes):
+        regions.add((x / image_width, y / image_height, w / image_width, h / image_height), type="background")
+
+    # Label all regions in one pass; blank ones are dropped and never sent to rembg
+    classify_regions(regions)
+
+    image_hash = run_id_for(img) if cache is not None else None
+
+    def remove_background(region) -> Optional[bytes]:
+        # The crop is a view into img; it is only encoded in memory for rembg
+        ok, encoded = cv2.imencode(".png", region.crop)
+        if not ok:
+            print(f"Error encoding region {region.index}")
+            return None
+        # Use rembg CLI to remove the background, piping the crop through stdin/stdout
         try:
-            subprocess.run(
-                ["rembg", "i", temp_file, output_file],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            print(f"Background removed for region {i} and saved to {output_file}")
+            # The rembg CLI sizes its own onnxruntime pool; it inherits the governor's core set
+            with governor.pinned("rembg"), metrics.REMBG_SECONDS.time():
+                result = subprocess.run(
+                    ["rembg", "i", "-", "-"],
+                    input=memoryview(encoded),
+                    check=True,
+                    capture_output=True,
+                )
+            print(f"Background removed for region {region.index}")
+            return result.stdout
         except subprocess.CalledProcessError as e:
-            print(f"Error removing background for region {i}: {e.stderr}")
-
-        # Save the background (inverted region)
-        background_roi = cv2.bitwise_not(region_roi)
-        background_file = os.path.join(output_dir, f"region_{i}_b.png")
-        cv2.imwrite(background_file, background_roi)
-
-        # After background removal, re-analyze the element
-        # For instance, checking the background_file or output_file
-        element_type = analyze_element_type(output_file)
-        # Possibly re-split or further process if needed
+            print(f"Error removing background for region {region.index}: {e.stderr.decode(errors='replace')}")
+        except OSError as e:
+            print(f"Error removing background for region {region.index}: {e}")
+        metrics.FAILURES.labels("rembg").inc()
+        return None
+
+    # Creates the output directory if it doesn't exist
+    with writer or AssetWriter(output_dir, format=asset_format, compression=compression, quality=quality) as writer:
+        for region in regions:
+            i = region.index
+            print(f"Region {i} Position: x={region.x:.2f}, y={region.y:.2f}, width={region.width:.2f}, height={region.height:.2f}")
+
+            # Background-removed crops of the same pixels are reused from the artifact cache
+            if cache is not None:
+                no_bg = cache.cached(cache.key(image_hash, "rembg", region.pixel_box(image_width, image_height)),
+                                     "bytes", lambda: remove_background(region))
+            else:
+                no_bg = remove_background(region)
+            if no_bg is not None:
+                writer.submit(f"region_{i}_no_bg", no_bg, region=region, role="no_bg")
+
+            if save_backgrounds:
+                # Save the background (inverted region); the inversion happens on the writer thread
+                writer.submit(f"region_{i}_b", region.crop, region=region, role="inverted", transform=cv2.bitwise_not)
+
+    return regions
+
+def convert_file(image_path: Union[str, np.ndarray], output_path: str, output_formats: list[str], save_backgrounds: bool = False,
+                 progress: Optional[ProgressiveDocument] = None, deadline: Optional[Deadline] = None,
+                 store: Optional[RunStore] = None) -> dict[str, str]:
+    """
+    Converts one image (a path or a decoded array) the way the CLI does: objects are extracted into
+    <output_path stem>_objects first, so the page can reference them, then every format is generated
+    from one pipeline run.
+    Returns {format: code}; writing the files is left to the caller (see convert_image_to_formats
+    for ``progress``, ``deadline`` and ``store``). Object extraction is skipped when "extract_objects"
+    is off in the config, or when the deadline leaves no room for it next to one round of LLM calls
+    and the final pass.
+    """
+    config = load_config()
+    output_dir = os.path.splitext(output_path)[0] + "_objects"
+    extract = config["extract_objects"]
+    if extract and deadline is not None and not deadline.allows(
+            "objects", reserve=deadline.estimates["llm"] + deadline.estimates["final_llm"]):
+        deadline.degrade("objects", "not enough time for background removal")
+        extract = False
+    if extract:
+        detect_objects_and_remove_background(
+            image_path,
+            output_dir,
+            save_backgrounds=save_backgrounds,
+            asset_format=config.get("asset_format", "png"),
+            compression=config.get("asset_compression", 3),
+            quality=config.get("asset_quality", 90),
+            cache=get_cache(config),
+            kernel_size=config["object_kernel"],
+            padding=config["object_padding"],
+        )
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    asset_base_url = os.path.relpath(output_dir, os.path.dirname(os.path.abspath(output_path)))
+
+    return convert_image_to_formats(
+        image_path,
+        output_formats,
+        asset_manifest=manifest_path if os.path.exists(manifest_path) else None,
+        asset_base_url=asset_base_url,
+        asset_dir=output_dir,
+        progress=progress,
+        deadline=deadline,
+        store=store,
+    )
+
+def convert_bytes(data: Union[bytes, bytearray, memoryview], output_formats: list[str],
+                  assets: Optional[dict] = None, save_backgrounds: bool = False) -> dict[str, str]:
+    """
+    Converts an encoded image held in memory and returns {format: code}; nothing is
+    written to disk. Picture regions are inlined as data URIs. If an assets dict is
+    passed, logos and backgrounds are extracted as in convert_file too, and it is filled
+    with {file name: encoded bytes} (plus "manifest.json"); the page refers to them by
+    those names.
+    """
+    img = decode_image(data)
+    if img is None:
+        return {}
+    manifest = None
+    if assets is not None:
+        config = load_config()
+        writer = AssetWriter(None, format=config.get("asset_format", "png"),
+                             compression=config.get("asset_compression", 3), quality=config.get("asset_quality", 90))
+        detect_objects_and_remove_background(img, None, save_backgrounds=save_backgrounds, cache=get_cache(config),
+                                             writer=writer, kernel_size=config["object_kernel"],
+                                             padding=config["object_padding"])
+        manifest = writer.manifest
+        assets.update(writer.files)
+        assets["manifest.json"] = json.dumps(manifest, indent=2).encode("utf-8")
+    return convert_image_to_formats(img, output_formats, asset_manifest=manifest)
+
+def stream_results(stream, outputs: dict[str, str], assets: Optional[dict] = None, mode: str = "") -> None:
+    """
+    Writes conversion results to a binary stream (e.g. stdout):
 
-        # Remove the temporary file
-        os.remove(temp_file)
+    - no mode: the code of a single format as is; several formats as JSON lines
+      ({"format", "code"})
+    - "jsonl": the code records, then one {"asset", "data" (base64)} line per asset
+    - "tar": an uncompressed tar stream with page.<format> files and the assets next to them
+    """
+    assets = assets or {}
+    if mode == "tar":
+        with tarfile.open(fileobj=stream, mode="w|") as tar:
+            files = [(f"page.{output_format}", code.encode("utf-8")) for output_format, code in outputs.items()]
+            for name, data in files + sorted(assets.items()):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(data))
+    elif mode == "jsonl" or len(outputs) > 1:
+        for output_format, code in outputs.items():
+            stream.write(json.dumps({"format": output_format, "code": code}).encode("utf-8") + b"\n")
+        for name, data in sorted(assets.items()):
+            stream.write(json.dumps({"asset": name, "data": base64.b64encode(data).decode("ascii")}).encode("utf-8") + b"\n")
+    else:
+        for code in outputs.values():
+            stream.write(code.encode("utf-8"))
+    stream.flush()
 
 def main():
     config = load_config()  # Load or create ~/.imagecoderx.json
@@ -313,12 +796,45 @@ def main():
     # Basic CLI parsing
     args = sys.argv[1:]
     if not args:
-        print("Usage: imagecoderx <image_path> [--path <output_path>] [--out <format>]")
+        print("Usage: imagecoderx <image_path|-> [--path <output_path>] [--out <format>[,<format>...]] [--save-backgrounds]"
+              " [--progressive [--events <path>]] [--deadline <seconds>]"
+              " [--run-store <path>] [--metrics-file <path>] [--stdout [--assets tar|jsonl]]")
         sys.exit(1)
 
     image_path = args[0]
     output_path = None
-    output_format = "html"
+    # --out may be repeated or list several formats separated by commas
+    output_formats = parse_output_formats([args[idx + 1] for idx, arg in enumerate(args)
+                                           if arg == "--out" and idx + 1 < len(args)])
+
+    # "-" reads the encoded image from stdin. With --stdout (the default for stdin without --path)
+    # the code is streamed to stdout instead of written to files and nothing touches the disk;
+    # --assets also extracts logos and backgrounds and streams them along (see stream_results)
+    if "--stdout" in args or (image_path == "-" and "--path" not in args):
+        mode = args[args.index("--assets") + 1] if "--assets" in args and args.index("--assets") + 1 < len(args) else ""
+        if mode not in ("", "tar", "jsonl"):
+            print(f"Error: --assets must be tar or jsonl, not {mode}", file=sys.stderr)
+            sys.exit(1)
+        if image_path == "-":
+            data = sys.stdin.buffer.read()
+        else:
+            with open(image_path, "rb") as f:
+                data = f.read()
+        assets = {} if mode else None
+        # Progress messages go to stderr, so stdout carries only the results
+        with contextlib.redirect_stdout(sys.stderr):
+            outputs = convert_bytes(data, output_formats, assets, save_backgrounds="--save-backgrounds" in args)
+        if not outputs:
+            sys.exit(1)
+        stream_results(sys.stdout.buffer, outputs, assets, mode)
+        return
+    image = image_path
+    if image_path == "-":
+        image = decode_image(sys.stdin.buffer.read())
+        if image is None:
+            sys.exit(1)
+        image_path = "stdin"
+
     # Look for optional flags
     if "--path" in args:
         idx = args.index("--path")
@@ -327,32 +843,64 @@ def main():
             # Check if output_path is a directory
             if os.path.isdir(output_path):
                 base_name = os.path.splitext(os.path.basename(image_path))[0]
-                output_path = os.path.join(output_path, f"{base_name}.{output_format}")
-    if "--out" in args:
-        idx = args.index("--out")
-        if idx + 1 < len(args):
-            out_arg = args[idx + 1].lower()
-            map_ext = {"html": "html", "typescript": "tsx", "javascript": "jsx", "flutter": "dart"}
-            output_format = map_ext.get(out_arg, "html")
+                output_path = os.path.join(output_path, f"{base_name}.{output_formats[0]}")
 
     # Derive output path if not specified
     if not output_path:
         base, _ = os.path.splitext(image_path)
-        output_path = base + f".{output_format}"
+        output_path = base + f".{output_formats[0]}"
+    # Every format is written next to the first one, with its own extension
+    output_paths = {output_formats[0]: output_path}
+    for output_format in output_formats[1:]:
+        output_paths[output_format] = os.path.splitext(output_path)[0] + f".{output_format}"
+
+    # --progressive writes a draft page (<stem>.html) right after OCR and refines it in place;
+    # --events appends one JSON line per update for live previews
+    progress = None
+    events = None
+    if "--progressive" in args:
+        if "--events" in args and args.index("--events") + 1 < len(args):
+            events = open(args[args.index("--events") + 1], "a", encoding="utf-8")
+        progress = ProgressiveDocument(output_paths.get("html", os.path.splitext(output_path)[0] + ".html"), events)
+
+    # --deadline bounds the run; stages that do not fit are degraded (see engine.deadline)
+    deadline = None
+    if "--deadline" in args and args.index("--deadline") + 1 < len(args):
+        deadline = Deadline(float(args[args.index("--deadline") + 1]), config.get("deadline_estimates"))
+
+    # --run-store checkpoints the run in a SQLite file; running again with it resumes the run
+    store = None
+    if "--run-store" in args and args.index("--run-store") + 1 < len(args):
+        store = RunStore(args[args.index("--run-store") + 1])
 
-    code = convert_image_to_code(image_path, output_format)
-    # Write the code to a single file
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(code)
-        print(f"File saved to {output_path}")
+        outputs = convert_file(image, output_path, output_formats, save_backgrounds="--save-backgrounds" in args,
+                               progress=progress, deadline=deadline, store=store)
+    finally:
+        if store is not None:
+            store.close()
+    if deadline is not None and deadline.degradations:
+        print(f"Degradations applied: {deadline.summary()}")
+    # Write one file per format
+    try:
+        for output_format, code in outputs.items():
+            if progress is not None and output_format == "html":
+                progress.finish(code)
+            else:
+                write_atomic(output_paths[output_format], code)
+            print(f"File saved to {output_paths[output_format]}")
+        if progress is not None and "html" not in outputs:
+            # The draft was only a preview; HTML is not one of the requested outputs
+            progress.discard()
     except Exception as e:
         print(f"Error writing output: {e}")
         sys.exit(1)
-
-    # Detect objects and remove background
-    output_dir = os.path.splitext(output_path)[0] + "_objects"
-    detect_objects_and_remove_background(image_path, output_dir)
+    finally:
+        if events is not None:
+            events.close()
+    # --metrics-file leaves the run's metrics for node_exporter's textfile collector
+    if "--metrics-file" in args and args.index("--metrics-file") + 1 < len(args):
+        metrics.REGISTRY.write_textfile(args[args.index("--metrics-file") + 1])
 
 # Example usage (optional):
 if __name__ == '__main__':
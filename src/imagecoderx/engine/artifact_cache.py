@@ -0,0 +1,174 @@
+"""
+Content-addressed cache for the outputs of deterministic CPU stages.
+
+Text region detection, background analysis, OCR and background removal always
+give the same result for the same pixels and parameters, so their outputs are
+stored on disk under a key made of the image's content hash, the stage, its
+parameters and the code version. A warm rerun of a screenshot then goes
+straight to code generation.
+
+Artifacts are plain files (``.npy`` arrays, ``.json`` documents, ``.bin`` bytes)
+in a two-level directory tree, written atomically. A hit refreshes the file's
+modification time; when the cache grows past ``max_bytes`` the least recently
+used files are removed.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+import imagecoderx
+from imagecoderx import metrics
+
+# Bump a stage's number when its output changes without a package version change
+STAGE_VERSIONS = {"regions": 1, "background": 1, "ocr": 1, "words": 1, "rembg": 1}
+
+KINDS = {"array": ".npy", "json": ".json", "bytes": ".bin"}
+
+
+class ArtifactCache:
+    """
+    Stage artifacts under ``path``, at most ``max_bytes`` in total. Counts hits,
+    misses and evictions (see ``stats``); safe to use from several threads.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    def __repr__(self) -> str:
+        return f"ArtifactCache({self.path!r}, size={self.size}, max_bytes={self.max_bytes})"
+
+    @staticmethod
+    def key(image_hash: str, stage: str, params=None) -> str:
+        """Key of a stage output for an image, the stage parameters and the code version."""
+        material = json.dumps([image_hash, stage, STAGE_VERSIONS.get(stage, 0), imagecoderx.__version__, params],
+                              sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _file(self, key: str, kind: str) -> str:
+        return os.path.join(self.path, key[:2], key + KINDS[kind])
+
+    def _entries(self):
+        for directory, _, names in os.walk(self.path):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key: str, kind: str):
+        """The stored artifact, or None."""
+        path = self._file(key, kind)
+        try:
+            if kind == "array":
+                value = np.load(path, allow_pickle=False)
+            elif kind == "json":
+                with open(path, encoding="utf-8") as f:
+                    value = json.load(f)
+            else:
+                with open(path, "rb") as f:
+                    value = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            metrics.CACHE_REQUESTS.labels("artifact", "miss").inc()
+            return None
+        with self._lock:
+            self.hits += 1
+        metrics.CACHE_REQUESTS.labels("artifact", "hit").inc()
+        return value
+
+    def put(self, key: str, kind: str, value) -> None:
+        """Stores an artifact, then evicts the least recently used ones beyond max_bytes."""
+        path = self._file(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                if kind == "array":
+                    np.save(f, np.asarray(value), allow_pickle=False)
+                elif kind == "json":
+                    f.write(json.dumps(value).encode("utf-8"))
+                else:
+                    f.write(value)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing artifact {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self.size += os.path.getsize(path) - old_size
+            over = self.size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self) -> int:
+        """Removes the least recently used artifacts until the cache fits max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            self.size = sum(size for _, size, _ in entries)
+            removed = 0
+            for path, size, _ in entries:
+                if self.size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self.size -= size
+                removed += 1
+            self.evictions += removed
+            return removed
+
+    def cached(self, key: str, kind: str, compute: Callable[[], object]):
+        """Returns the stored artifact, or computes, stores and returns it."""
+        value = self.get(key, kind)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, kind, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "bytes": self.size}
+
+
+_caches: dict[tuple, ArtifactCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(config: dict) -> Optional[ArtifactCache]:
+    """
+    The process-wide cache for the "artifact_cache" config section
+    (``{"path": ..., "max_bytes": ...}``, or just a path); None when it is not set.
+    """
+    options = config.get("artifact_cache")
+    if not options:
+        return None
+    if isinstance(options, str):
+        options = {"path": options}
+    path = os.path.expanduser(options["path"])
+    key = (path, options.get("max_bytes"))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ArtifactCache(path, **({"max_bytes": options["max_bytes"]} if "max_bytes" in options else {}))
+    return cache
@@ -0,0 +1,226 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Union
+
+import cv2
+import numpy as np
+
+from imagecoderx.engine.regions import Region, RegionSet
+
+MANIFEST_NAME = "manifest.json"
+
+# File extension and cv2.imencode parameters per output format
+ASSET_FORMATS = {
+    "png": (".png", lambda level, quality: [cv2.IMWRITE_PNG_COMPRESSION, level]),
+    "webp": (".webp", lambda level, quality: [cv2.IMWRITE_WEBP_QUALITY, quality]),
+    "avif": (".avif", lambda level, quality: [getattr(cv2, "IMWRITE_AVIF_QUALITY", 0), quality]),
+}
+
+
+def _hash_pixels(image: np.ndarray, params: str) -> str:
+    """Hashes the pixels of an image (or crop view) row by row, without making it contiguous."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.shape}{image.dtype}{params}".encode())
+    if image.flags["C_CONTIGUOUS"]:
+        digest.update(memoryview(image).cast("B"))
+    else:
+        for row in image:
+            digest.update(np.ascontiguousarray(row).data)
+    return digest.hexdigest()
+
+
+class AssetWriter:
+    """
+    Encodes and writes extracted image assets on a thread pool.
+
+    cv2.imencode releases the GIL, so regions are encoded in parallel. Every
+    asset is keyed by a hash of its pixels and encoding parameters; if the
+    manifest from a previous run already lists the same hash and the file is
+    still there, nothing is encoded or written. On close a manifest (by default
+    ``manifest.json``) describing all assets is written to ``output_dir``.
+    With ``output_dir`` None nothing touches the disk: the encoded assets are kept
+    in ``files`` ({file name: bytes}) and the manifest in ``manifest``.
+    """
+
+    def __init__(
+        self,
+        output_dir: Optional[str],
+        format: str = "png",
+        compression: int = 3,
+        quality: int = 90,
+        max_workers: Optional[int] = None,
+        manifest_name: str = MANIFEST_NAME,
+    ):
+        if format not in ASSET_FORMATS:
+            raise ValueError(f"Unsupported asset format: {format} (expected one of {', '.join(ASSET_FORMATS)})")
+        ext = ASSET_FORMATS[format][0]
+        if format != "png" and not cv2.haveImageWriter(ext):
+            print(f"Warning: OpenCV cannot write {format} images, falling back to png")
+            format = "png"
+        self.output_dir = output_dir
+        self.manifest_name = manifest_name
+        self.format = format
+        self.ext = ASSET_FORMATS[format][0]
+        self.params = ASSET_FORMATS[format][1](compression, quality)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+        self._futures: list[Future] = []
+        self._lock = threading.Lock()
+        self.entries: dict[str, tuple[dict, Optional[Region]]] = {}
+        self.written = 0
+        self.skipped = 0
+        self.files: dict[str, bytes] = {}
+        self.manifest: Optional[dict] = None
+
+        self._previous = {}
+        if output_dir is None:
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, manifest_name)
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r") as f:
+                    self._previous = {a["name"]: a for a in json.load(f).get("assets", [])}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable asset manifest {manifest_path}: {e}")
+
+    def __enter__(self) -> "AssetWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(
+        self,
+        name: str,
+        image: Union[np.ndarray, bytes],
+        region: Optional[Region] = None,
+        role: str = "asset",
+        transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ) -> Future:
+        """
+        Queues ``image`` (a pixel array or already encoded image bytes) to be written
+        as ``<name><ext>``. ``transform`` is applied to the pixels on the worker thread,
+        so derived images (e.g. inverted backgrounds) never exist on the caller's side.
+        Returns a future resolving to the manifest entry (type and box are filled in
+        from ``region`` when the manifest is written).
+        """
+        future = self._executor.submit(self._write, name, image, region, role, transform)
+        self._futures.append(future)
+        return future
+
+    def _write(self, name, image, region, role, transform) -> dict:
+        params = f"{self.format}{self.params}{getattr(transform, '__name__', '')}"
+        if isinstance(image, np.ndarray):
+            content_hash = _hash_pixels(image, params)
+        else:
+            content_hash = hashlib.blake2b(bytes(image) + params.encode(), digest_size=16).hexdigest()
+
+        filename = name + self.ext
+        path = os.path.join(self.output_dir, filename) if self.output_dir is not None else filename
+        previous = self._previous.get(name)
+        if previous and previous.get("hash") == content_hash and os.path.exists(path):
+            skipped = True
+        else:
+            skipped = False
+            if not isinstance(image, np.ndarray):
+                if self.format == "png" and transform is None:
+                    self._store(path, bytes(image))
+                    image = None
+                else:
+                    image = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_UNCHANGED)
+            if image is not None:
+                if transform is not None:
+                    image = transform(image)
+                ok, encoded = cv2.imencode(self.ext, image, self.params)
+                if not ok:
+                    raise ValueError(f"Could not encode asset {name} as {self.format}")
+                self._store(path, memoryview(encoded))
+
+        entry = {
+            "name": name,
+            "file": filename,
+            "role": role,
+            "hash": content_hash,
+            "bytes": os.path.getsize(path) if self.output_dir is not None else len(self.files[filename]),
+        }
+        with self._lock:
+            self.entries[name] = (entry, region)
+            if skipped:
+                self.skipped += 1
+            else:
+                self.written += 1
+        if region is not None and role == "no_bg":
+            region.filename = path
+        return entry
+
+    def _store(self, path: str, data) -> None:
+        if self.output_dir is None:
+            with self._lock:
+                self.files[path] = bytes(data)
+        else:
+            self._atomic_write(path, data)
+
+    @staticmethod
+    def _atomic_write(path: str, data) -> None:
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def close(self) -> dict:
+        """Waits for all pending writes, writes the manifest and returns it."""
+        errors = []
+        for future in self._futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+                print(f"Error writing asset: {e}")
+        self._futures.clear()
+        self._executor.shutdown(wait=True)
+
+        # Region type and box are read only now, after the caller finished classifying
+        assets = []
+        for name in sorted(self.entries):
+            entry, region = self.entries[name]
+            entry["type"] = region.type if region is not None else None
+            entry["box"] = list(region.box) if region is not None else None
+            assets.append(entry)
+        manifest = self.manifest = {"format": self.format, "assets": assets}
+        if self.output_dir is not None:
+            with open(os.path.join(self.output_dir, self.manifest_name), "w") as f:
+                json.dump(manifest, f, indent=2)
+        print(f"Assets: {self.written} written, {self.skipped} unchanged, {len(errors)} failed")
+        return manifest
+
+
+def data_uri(image: np.ndarray, format: str = "png") -> str:
+    """Encodes an image as a data: URI, for pages written without an asset directory."""
+    ext = ASSET_FORMATS[format][0]
+    ok, encoded = cv2.imencode(ext, image)
+    if not ok:
+        raise ValueError(f"Could not encode image as {format}")
+    return f"data:image/{format};base64,{base64.b64encode(encoded).decode('ascii')}"
+
+
+def load_asset_manifest(manifest: Union[str, dict], base_url: str = "") -> RegionSet:
+    """
+    Builds a RegionSet from an asset manifest (a path to ``manifest.json`` or the
+    dict returned by ``AssetWriter.close``) for ``combine_html_sections``.
+    Only background-removed assets classified as ``logo`` or ``background`` are
+    included; their filename becomes ``base_url`` joined with the asset file.
+    """
+    if isinstance(manifest, str):
+        with open(manifest, "r") as f:
+            manifest = json.load(f)
+    regions = RegionSet()
+    for asset in manifest.get("assets", []):
+        if asset.get("role") != "no_bg" or asset.get("type") not in ("logo", "background") or not asset.get("box"):
+            continue
+        region = regions.add(asset["box"], type=asset["type"])
+        region.filename = f"{base_url.rstrip('/')}/{asset['file']}" if base_url else asset["file"]
+    return regions
@@ -0,0 +1,74 @@
+"""
+Per-job deadlines and quality degradation.
+
+A Deadline is created when a conversion starts. The pipeline asks it before
+every expensive step whether the step still fits the remaining budget; steps
+that do not fit are degraded rather than run late. Text regions fall back to
+rule-generated or raw-OCR markup (most important regions keep the LLM longest),
+and optional stages (object extraction, the final refinement pass) are skipped.
+Every degradation is recorded on the Deadline so callers can report it.
+"""
+import threading
+import time
+from typing import Optional
+
+from imagecoderx.engine.regions import Region
+
+# Seconds a stage is assumed to take until it has been observed
+DEFAULT_ESTIMATES = {"llm": 2.0, "final_llm": 6.0, "objects": 4.0}
+
+
+def importance(region: Region) -> float:
+    """
+    Priority of a region: its area, weighted towards the top (and slightly the left)
+    of the page where headers and primary content sit.
+    """
+    return region.width * region.height * (1.0 - 0.5 * region.y) * (1.0 - 0.25 * region.x)
+
+
+class Deadline:
+    """
+    The time budget of one job. ``estimates`` are the expected seconds per stage
+    ("llm" per region call, "final_llm", "objects"), merged over DEFAULT_ESTIMATES.
+    """
+
+    def __init__(self, seconds: float, estimates: Optional[dict] = None):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+        self.estimates = {**DEFAULT_ESTIMATES, **(estimates or {})}
+        self.degradations: list[dict] = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"Deadline({self.seconds}s, remaining={self.remaining():.2f}s, degradations={len(self.degradations)})"
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def allows(self, stage: str, reserve: float = 0.0, count: float = 1.0) -> bool:
+        """Whether ``count`` runs of stage, plus ``reserve`` seconds, fit the remaining time."""
+        return self.remaining() - reserve >= self.estimates[stage] * count
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Replaces the estimate of a stage by a measured duration (kept if not positive)."""
+        if seconds > 0:
+            self.estimates[stage] = seconds
+
+    def degrade(self, stage: str, reason: str, region: Optional[int] = None) -> None:
+        """Records that ``stage`` was skipped or replaced by a cheaper path."""
+        entry = {"stage": stage, "reason": reason, "remaining": round(self.remaining(), 3)}
+        if region is not None:
+            entry["region"] = region
+        with self._lock:
+            self.degradations.append(entry)
+        print(f"Degraded {stage}{'' if region is None else f' for region {region}'}: {reason}")
+
+    def summary(self) -> dict:
+        """Number of degradations per stage."""
+        counts = {}
+        for entry in self.degradations:
+            counts[entry["stage"]] = counts.get(entry["stage"], 0) + 1
+        return counts
@@ -0,0 +1,473 @@
+"""
+Deterministic emitters turning a page IR (see ``page_ir.build_page_ir``) into source
+code. Every format is produced from the same Page, so generating several formats
+costs one pipeline run plus a few milliseconds per extra format.
+"""
+import html
+import re
+from typing import Callable, Optional, Union
+
+from imagecoderx.engine.page_ir import VOID_ELEMENTS, Node, Page
+
+INDENT = "  "
+
+# HTML attribute names that JSX spells differently
+JSX_ATTRIBUTES = {
+    "class": "className",
+    "for": "htmlFor",
+    "tabindex": "tabIndex",
+    "readonly": "readOnly",
+    "maxlength": "maxLength",
+    "minlength": "minLength",
+    "colspan": "colSpan",
+    "rowspan": "rowSpan",
+    "srcset": "srcSet",
+    "crossorigin": "crossOrigin",
+    "autocomplete": "autoComplete",
+    "autofocus": "autoFocus",
+    "contenteditable": "contentEditable",
+    "enctype": "encType",
+    "accept-charset": "acceptCharset",
+    "http-equiv": "httpEquiv",
+    "usemap": "useMap",
+    "frameborder": "frameBorder",
+    "allowfullscreen": "allowFullScreen",
+    "novalidate": "noValidate",
+    "spellcheck": "spellCheck",
+}
+
+# Default font sizes (px) and weights for Flutter text, by tag
+HEADING_SIZES = {"h1": 32, "h2": 24, "h3": 19, "h4": 16, "h5": 13, "h6": 11}
+BOLD_TAGS = frozenset(("h1", "h2", "h3", "h4", "h5", "h6", "b", "strong", "th", "button"))
+ITALIC_TAGS = frozenset(("i", "em"))
+INLINE_TAGS = frozenset(
+    ("a", "abbr", "b", "br", "code", "em", "i", "label", "small", "span", "strong", "sub", "sup", "u", "mark")
+)
+NAMED_COLORS = {
+    "white": "FFFFFF", "black": "000000", "red": "FF0000", "green": "008000", "blue": "0000FF",
+    "gray": "808080", "grey": "808080", "yellow": "FFFF00", "orange": "FFA500", "purple": "800080",
+}
+
+
+def _is_blank(child) -> bool:
+    return isinstance(child, str) and not child.strip()
+
+
+# HTML
+
+def _html_attrs(node: Node) -> str:
+    parts = []
+    for name, value in node.attrs.items():
+        parts.append(name if value in ("", None) else f'{name}="{html.escape(str(value))}"')
+    if node.style:
+        style = "; ".join(f"{k}: {v}" for k, v in node.style.items())
+        parts.append(f'style="{html.escape(style)}"')
+    return (" " + " ".join(parts)) if parts else ""
+
+
+def _html_node(node: Node, depth: int, out: list[str]) -> None:
+    pad = INDENT * depth
+    if node.tag in VOID_ELEMENTS:
+        out.append(f"{pad}<{node.tag}{_html_attrs(node)}>")
+        return
+    children = [c for c in node.children if not _is_blank(c)]
+    if all(isinstance(c, str) or c.tag in INLINE_TAGS for c in children):
+        # Inline content is kept on one line so whitespace is not altered
+        inner = "".join(_html_inline(c) for c in node.children)
+        out.append(f"{pad}<{node.tag}{_html_attrs(node)}>{inner.strip()}</{node.tag}>")
+        return
+    out.append(f"{pad}<{node.tag}{_html_attrs(node)}>")
+    for child in children:
+        if isinstance(child, str):
+            out.append(f"{pad}{INDENT}{html.escape(child.strip(), quote=False)}")
+        else:
+            _html_node(child, depth + 1, out)
+    out.append(f"{pad}</{node.tag}>")
+
+
+def _html_inline(child: Union[Node, str]) -> str:
+    if isinstance(child, str):
+        return html.escape(child, quote=False)
+    if child.tag in VOID_ELEMENTS:
+        return f"<{child.tag}{_html_attrs(child)}>"
+    return f"<{child.tag}{_html_attrs(child)}>{''.join(_html_inline(c) for c in child.children)}</{child.tag}>"
+
+
+def emit_html(page: Page) -> str:
+    """Serializes the page as an indented HTML document."""
+    out = [
+        "<!DOCTYPE html>",
+        '<html lang="en">',
+        "<head>",
+        f'{INDENT}<meta charset="UTF-8">',
+        f'{INDENT}<meta name="viewport" content="width=device-width, initial-scale=1.0">',
+        f"{INDENT}<title>{html.escape(page.title)}</title>",
+    ]
+    if page.css:
+        out.append(f"{INDENT}<style>\n{page.css}\n{INDENT}</style>")
+    out.append("</head>")
+    _html_node(page.body, 0, out)
+    out.append("</html>")
+    return "\n".join(out) + "\n"
+
+
+# JSX / TSX
+
+def _camel_case(name: str) -> str:
+    if name.startswith("--"):
+        return name
+    head, *rest = name.lstrip("-").split("-")
+    key = head + "".join(part.capitalize() for part in rest)
+    # Vendor prefixes are capitalized in React (WebkitTransform), except ms
+    return key[0].upper() + key[1:] if name.startswith("-") and not name.startswith("-ms-") else key
+
+
+def _js_string(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n") + "'"
+
+
+def _jsx_style(style: dict) -> str:
+    items = []
+    for name, value in style.items():
+        key = _camel_case(name)
+        key = key if re.fullmatch(r"[A-Za-z_$][\w$]*", key) else _js_string(key)
+        items.append(f"{key}: {_js_string(value)}")
+    return "{{ " + ", ".join(items) + " }}"
+
+
+def _jsx_text(text: str) -> str:
+    return html.escape(text, quote=False).replace("{", "&#123;").replace("}", "&#125;")
+
+
+def _jsx_attrs(node: Node) -> str:
+    parts = []
+    for name, value in node.attrs.items():
+        name = name.lower()
+        if name.startswith("on"):
+            # Inline event handler strings are not valid JSX props
+            continue
+        name = JSX_ATTRIBUTES.get(name, name)
+        parts.append(name if value in ("", None) else f"{name}={{{_js_string(str(value))}}}"
+                     if "\n" in str(value) else f'{name}="{html.escape(str(value))}"')
+    if node.style:
+        parts.append(f"style={_jsx_style(node.style)}")
+    return (" " + " ".join(parts)) if parts else ""
+
+
+def _jsx_node(node: Node, depth: int, out: list[str]) -> None:
+    pad = INDENT * depth
+    tag = "div" if node.tag == "body" else node.tag
+    if node.tag in VOID_ELEMENTS:
+        out.append(f"{pad}<{tag}{_jsx_attrs(node)} />")
+        return
+    children = [c for c in node.children if not _is_blank(c)]
+    if not children:
+        out.append(f"{pad}<{tag}{_jsx_attrs(node)} />")
+        return
+    if all(isinstance(c, str) or c.tag in INLINE_TAGS for c in children):
+        inner = "".join(_jsx_inline(c) for c in node.children).strip()
+        out.append(f"{pad}<{tag}{_jsx_attrs(node)}>{inner}</{tag}>")
+        return
+    out.append(f"{pad}<{tag}{_jsx_attrs(node)}>")
+    for child in children:
+        if isinstance(child, str):
+            out.append(f"{pad}{INDENT}{_jsx_text(child.strip())}")
+        else:
+            _jsx_node(child, depth + 1, out)
+    out.append(f"{pad}</{tag}>")
+
+
+def _jsx_inline(child: Union[Node, str]) -> str:
+    if isinstance(child, str):
+        # JSX collapses whitespace around newlines, so keep single spaces explicit
+        text = re.sub(r"\s+", " ", child)
+        return _jsx_text(text) if text.strip() else "{' '}"
+    if child.tag in VOID_ELEMENTS:
+        return f"<{child.tag}{_jsx_attrs(child)} />"
+    return f"<{child.tag}{_jsx_attrs(child)}>{''.join(_jsx_inline(c) for c in child.children)}</{child.tag}>"
+
+
+def emit_jsx(page: Page, typescript: bool = False) -> str:
+    """
+    Emits a React function component. HTML attributes are rewritten to their JSX
+    names (class → className, for → htmlFor, ...), inline styles become style
+    objects, void elements are self-closed and page CSS goes into a <style> tag.
+    """
+    out = []
+    _jsx_node(page.body, 2, out)
+    body = "\n".join(out)
+    if page.css:
+        css = page.css.replace("\\", "\\\\").replace("`", "\\`").replace("${", "\\${")
+        style = f"{INDENT * 3}<style>{{`\n{css}\n{INDENT * 3}`}}</style>\n"
+        # Put the stylesheet inside the root element
+        first, _, rest = body.partition("\n")
+        body = f"{first}\n{style}{rest}" if rest else body
+    signature = "const GeneratedComponent: React.FC = () => {" if typescript else "const GeneratedComponent = () => {"
+    return f"""import React from 'react';
+
+{signature}
+  return (
+{body}
+  );
+}};
+
+export default GeneratedComponent;
+"""
+
+
+def emit_tsx(page: Page) -> str:
+    """Emits a typed React function component (see emit_jsx)."""
+    return emit_jsx(page, typescript=True)
+
+
+# Flutter
+
+def _dart_string(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'").replace("$", "\\$").replace("\n", "\\n") + "'"
+
+
+def _dart_color(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip().lower()
+    match = re.fullmatch(r"#([0-9a-f]{3}|[0-9a-f]{6})", value)
+    if match:
+        digits = match.group(1)
+        if len(digits) == 3:
+            digits = "".join(c * 2 for c in digits)
+        return f"Color(0xFF{digits.upper()})"
+    match = re.fullmatch(r"rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*([\d.]+)\s*)?\)", value)
+    if match:
+        r, g, b = (min(int(v), 255) for v in match.groups()[:3])
+        alpha = int(round(float(match.group(4) or 1) * 255))
+        return f"Color(0x{alpha:02X}{r:02X}{g:02X}{b:02X})"
+    if value in NAMED_COLORS:
+        return f"Color(0xFF{NAMED_COLORS[value]})"
+    return None
+
+
+def _px(value: Optional[str]) -> Optional[float]:
+    match = re.fullmatch(r"\s*(-?[\d.]+)\s*(px)?\s*", value or "")
+    return float(match.group(1)) if match else None
+
+
+def _percent(value: Optional[str]) -> Optional[float]:
+    match = re.fullmatch(r"\s*(-?[\d.]+)\s*%\s*", value or "")
+    return float(match.group(1)) / 100 if match else None
+
+
+def _number(value: float) -> str:
+    return f"{value:.4f}".rstrip("0").rstrip(".")
+
+
+class _Call:
+    """A Dart constructor call; ``args`` are (name or None, value) pairs."""
+
+    __slots__ = ("name", "args")
+
+    def __init__(self, name: str, *positional, **named):
+        self.name = name
+        self.args = [(None, v) for v in positional] + list(named.items())
+
+
+def _format_dart(value, depth: int) -> str:
+    """Pretty-prints nested _Call objects, lists and literal strings with one argument per line."""
+    if isinstance(value, str):
+        return value
+    pad, inner = INDENT * depth, INDENT * (depth + 1)
+    if isinstance(value, list):
+        if not value:
+            return "[]"
+        return "[\n" + "".join(f"{inner}{_format_dart(v, depth + 1)},\n" for v in value) + f"{pad}]"
+    args = [(f"{name}: " if name else "") + _format_dart(v, depth + 1) for name, v in value.args]
+    flat = f"{value.name}({', '.join(args)})"
+    if not any(isinstance(v, list) and v for _, v in value.args) and len(flat) + len(pad) <= 100 and "\n" not in flat:
+        return flat
+    return f"{value.name}(\n" + "".join(f"{inner}{arg},\n" for arg in args) + f"{pad})"
+
+
+class _DartEmitter:
+    """Builds a Flutter widget tree from page IR nodes; positioned sections become a Stack."""
+
+    def __init__(self):
+        self.uses_base64 = False
+
+    def text_style(self, node: Node, inherited: dict) -> dict:
+        style = dict(inherited)
+        if node.tag in HEADING_SIZES:
+            style["fontSize"] = _number(HEADING_SIZES[node.tag])
+        if node.tag in BOLD_TAGS:
+            style["fontWeight"] = "FontWeight.bold"
+        if node.tag in ITALIC_TAGS:
+            style["fontStyle"] = "FontStyle.italic"
+        size = _px(node.style.get("font-size"))
+        if size is not None:
+            style["fontSize"] = _number(size)
+        weight = node.style.get("font-weight", "")
+        if weight == "bold" or (weight.isdigit() and int(weight) >= 600):
+            style["fontWeight"] = "FontWeight.bold"
+        elif weight == "normal":
+            style.pop("fontWeight", None)
+        if node.style.get("font-style") == "italic":
+            style["fontStyle"] = "FontStyle.italic"
+        color = _dart_color(node.style.get("color"))
+        if color:
+            style["color"] = color
+        return style
+
+    @staticmethod
+    def text(text: str, style: dict) -> _Call:
+        if style:
+            return _Call("Text", _dart_string(text), style=_Call("TextStyle", **style))
+        return _Call("Text", _dart_string(text))
+
+    def image(self, node: Node) -> _Call:
+        src = node.attrs.get("src", "")
+        if src.startswith("data:") and "," in src:
+            self.uses_base64 = True
+            return _Call("Image.memory", f"base64Decode({_dart_string(src.split(',', 1)[1])})")
+        if re.match(r"https?://", src):
+            return _Call("Image.network", _dart_string(src))
+        return _Call("Image.asset", _dart_string(src))
+
+    def has_block(self, node: Node) -> bool:
+        return any(isinstance(c, Node) and (c.tag not in INLINE_TAGS or self.has_block(c)) for c in node.children)
+
+    @staticmethod
+    def positioned(node: Node) -> bool:
+        return node.style.get("position") in ("absolute", "fixed") or (
+            _percent(node.style.get("left")) is not None and _percent(node.style.get("top")) is not None
+        )
+
+    def children(self, children: list, style: dict) -> list[_Call]:
+        """Widgets for a list of child nodes; runs of inline content become one Text."""
+        widgets, run = [], []
+
+        def flush():
+            text = "".join(c if isinstance(c, str) else ("\n" if c.tag == "br" else c.text()) for c in run)
+            text = re.sub(r"[ \t\r\f\v]+", " ", text).strip()
+            if text:
+                widgets.append(self.text(text, style))
+            run.clear()
+
+        for child in children:
+            if isinstance(child, str) or (child.tag in INLINE_TAGS and child.tag != "a" and not self.has_block(child)):
+                run.append(child)
+                continue
+            flush()
+            widget = self.widget(child, style)
+            if widget is not None:
+                widgets.append(widget)
+        flush()
+        return widgets
+
+    def widget(self, node: Node, inherited: dict) -> Optional[_Call]:
+        style = self.text_style(node, inherited)
+        if node.tag == "img":
+            widget = self.image(node)
+        elif node.tag == "hr":
+            return _Call("const Divider")
+        elif node.tag == "br":
+            return None
+        elif node.tag in ("input", "textarea"):
+            hint = _dart_string(node.attrs.get("placeholder", ""))
+            widget = _Call("TextField", decoration=_Call("InputDecoration", hintText=hint))
+        elif node.tag == "button" or (node.tag == "a" and not self.has_block(node)):
+            label = self.text(re.sub(r"\s+", " ", node.text()).strip(), style)
+            widget = _Call("ElevatedButton" if node.tag == "button" else "TextButton",
+                           onPressed="() {}", child=label)
+        elif any(isinstance(c, Node) and self.positioned(c) for c in node.children) or node.tag == "body":
+            widget = self.stack(node, style)
+        else:
+            widgets = self.children(node.children, style)
+            if not widgets:
+                return None
+            widget = widgets[0] if len(widgets) == 1 else _Call(
+                "Column", crossAxisAlignment="CrossAxisAlignment.start", children=widgets)
+
+        background = _dart_color(node.style.get("background-color") or node.style.get("background"))
+        if background and node.tag != "body":
+            widget = _Call("Container", color=background, child=widget)
+        return widget
+
+    def stack(self, node: Node, style: dict) -> _Call:
+        """Absolutely placed sections, sized relative to the available space."""
+        items = []
+        for child in node.children:
+            if isinstance(child, Node) and self.positioned(child):
+                items.append(self.position(child, style))
+            elif not _is_blank(child):
+                items.extend(self.children([child], style))
+        return _Call("LayoutBuilder", builder=_Call("(context, constraints) => Stack", children=items))
+
+    def position(self, node: Node, style: dict) -> _Call:
+        args = {}
+        for side, extent in (("left", "maxWidth"), ("top", "maxHeight"), ("width", "maxWidth"), ("height", "maxHeight")):
+            fraction, pixels = _percent(node.style.get(side)), _px(node.style.get(side))
+            if fraction is not None:
+                args[side] = f"constraints.{extent} * {_number(fraction)}"
+            elif pixels is not None:
+                args[side] = _number(pixels)
+        inner = Node(node.tag, node.attrs, {k: v for k, v in node.style.items()
+                                            if k not in ("position", "left", "top", "width", "height")}, node.children)
+        args["child"] = self.widget(inner, style) or _Call("const SizedBox.shrink")
+        return _Call("Positioned", **args)
+
+
+def emit_dart(page: Page) -> str:
+    """
+    Emits a Flutter StatelessWidget. Absolutely positioned sections become
+    Positioned children of a Stack (percentages scale with the layout constraints),
+    text runs become Text widgets with their inline font styles, and images,
+    buttons and inputs map to their Flutter counterparts.
+    """
+    emitter = _DartEmitter()
+    body = emitter.widget(page.body, {})
+    background = _dart_color(page.body.style.get("background-color") or page.body.style.get("background"))
+    scaffold = _Call("Scaffold", backgroundColor=background, body=body) if background else _Call("Scaffold", body=body)
+    imports = "import 'dart:convert';\n\n" if emitter.uses_base64 else ""
+    return f"""{imports}import 'package:flutter/material.dart';
+
+class GeneratedWidget extends StatelessWidget {{
+  const GeneratedWidget({{super.key}});
+
+  @override
+  Widget build(BuildContext context) {{
+    return {_format_dart(scaffold, 2)};
+  }}
+}}
+"""
+
+
+EMITTERS: dict[str, Callable[[Page], str]] = {
+    "html": emit_html,
+    "jsx": emit_jsx,
+    "tsx": emit_tsx,
+    "dart": emit_dart,
+}
+
+
+# Names accepted by the --out options of the command line tools, by output format
+FORMAT_ALIASES = {"html": "html", "typescript": "tsx", "javascript": "jsx", "flutter": "dart",
+                  "tsx": "tsx", "jsx": "jsx", "dart": "dart"}
+
+
+def parse_output_formats(values: Union[str, list[str]]) -> list[str]:
+    """
+    The output formats for --out values (each may list several, separated by commas),
+    in order and without duplicates; unknown names fall back to html, none gives ["html"].
+    """
+    output_formats = []
+    for value in [values] if isinstance(values, str) else values:
+        for name in value.lower().split(","):
+            output_format = FORMAT_ALIASES.get(name.strip(), "html")
+            if output_format not in output_formats:
+                output_formats.append(output_format)
+    return output_formats or ["html"]
+
+
+def emit(page: Page, output_format: str) -> str:
+    """Emits ``page`` in one of the formats in EMITTERS."""
+    if output_format not in EMITTERS:
+        raise ValueError(f"Unsupported output format: {output_format} (expected one of {', '.join(EMITTERS)})")
+    return EMITTERS[output_format](page)
@@ -0,0 +1,142 @@
+import html
+import re
+from typing import Optional
+
+import numpy as np
+
+from imagecoderx import ocr
+from imagecoderx.algorithms.color_analysis import rgb_to_hex
+from imagecoderx.engine.regions import Region
+
+# Characters that suggest code, markup or a table rather than plain UI text
+_CODE_LIKE = re.compile(r"[{}<>;=\[\]|\\]")
+
+
+def text_lines(region: Region) -> list[str]:
+    """
+    Rebuilds the region's text lines from its OCR boxes (words or characters, see
+    ocr.group_lines and ocr.line_text). Falls back to the raw OCR text when there are no boxes.
+    """
+    boxes = region.char_boxes or []
+    if not boxes:
+        return [line.strip() for line in (region.text or "").splitlines() if line.strip()]
+    lines = (ocr.line_text(line) for line in ocr.group_lines(boxes))
+    return [line for line in lines if line]
+
+
+def crop_colors(crop: Optional[np.ndarray]) -> tuple[str, str]:
+    """
+    Estimates (background, text) colors of a BGR crop as hex strings: the background is
+    the median of the border pixels, the text the mean of the pixels farthest from it.
+    """
+    if crop is None or crop.size == 0 or crop.ndim != 3:
+        return "#ffffff", "#000000"
+    border = np.concatenate((crop[0], crop[-1], crop[:, 0], crop[:, -1])).astype(np.int16)
+    background = np.median(border, axis=0)
+    distance = np.abs(crop.astype(np.int16) - background).sum(axis=2)
+    threshold = max(distance.max() * 0.5, 1)
+    ink = crop[distance >= threshold]
+    text = ink.mean(axis=0) if len(ink) else np.zeros(3)
+    return _bgr_to_hex(background), _bgr_to_hex(text)
+
+
+def _bgr_to_hex(bgr) -> str:
+    return rgb_to_hex((int(bgr[2]), int(bgr[1]), int(bgr[0])))
+
+
+def classify_text(lines: list[str], line_height: float, background: str, page_background: str) -> str:
+    """Picks the element kind for plain text: heading, button, label or paragraph."""
+    if len(lines) == 1:
+        words = len(lines[0].split())
+        if words <= 3 and _color_distance(background, page_background) > 60:
+            return "button"
+        if line_height >= 24:
+            return "heading"
+        return "label"
+    return "paragraph"
+
+
+def _color_distance(a: str, b: str) -> int:
+    return sum(abs(int(a[i:i + 2], 16) - int(b[i:i + 2], 16)) for i in (1, 3, 5))
+
+
+def confidence(region: Region, lines: list[str]) -> float:
+    """
+    Scores how safe it is to emit the region without the LLM, from 0 to 1.
+    Long, multi-line, symbol-heavy or low-confidence OCR text scores low.
+    """
+    text = " ".join(lines)
+    if not text:
+        return 0.0
+    score = 1.0
+    plain = sum(ch.isalnum() or ch.isspace() or ch in ".,:!?'&-()/%$#@+" for ch in text) / len(text)
+    score *= plain
+    if _CODE_LIKE.search(text):
+        score *= 0.4
+    if len(lines) > 6:
+        score *= 0.5
+    elif len(lines) > 3:
+        score *= 0.8
+    if len(text) > 400:
+        score *= 0.6
+    # Tesseract's word confidence from page OCR, or per-box confidences where the boxes carry them
+    ocr_confidence = region.ocr_confidence
+    if ocr_confidence is None:
+        confidences = [b.get("conf") for b in region.char_boxes or [] if b.get("conf") is not None]
+        ocr_confidence = float(np.mean(confidences)) if confidences else None
+    if ocr_confidence is not None:
+        score *= min(max(ocr_confidence / 100.0, 0.0), 1.0)
+    return round(score, 3)
+
+
+def _jsx_text(text: str) -> str:
+    return html.escape(text, quote=False).replace("{", "&#123;").replace("}", "&#125;")
+
+
+def _dart_string(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'").replace("$", "\\$") + "'"
+
+
+def render(kind: str, lines: list[str], font_px: int, color: str, background: str, output_format: str) -> str:
+    """Renders one element of ``kind`` in the requested output format."""
+    tag = {"heading": "h1", "button": "button", "label": "span", "paragraph": "p"}[kind]
+    weight = "bold" if kind in ("heading", "button") else "normal"
+    if output_format in ("tsx", "jsx"):
+        style = f"fontSize: '{font_px}px', color: '{color}', margin: 0, fontWeight: '{weight}'"
+        if kind == "button":
+            style += f", background: '{background}', border: 'none'"
+        body = "<br />".join(_jsx_text(line) for line in lines)
+        return f"<{tag} style={{{{ {style} }}}}>{body}</{tag}>"
+    if output_format == "dart":
+        text = _dart_string("\n".join(lines))
+        argb = "0xFF" + color[1:].upper()
+        text_widget = (f"Text({text}, style: TextStyle(fontSize: {font_px}, color: Color({argb}), "
+                       f"fontWeight: FontWeight.{'bold' if weight == 'bold' else 'normal'}))")
+        if kind == "button":
+            return ("ElevatedButton(onPressed: () {}, style: ElevatedButton.styleFrom(backgroundColor: "
+                    f"Color(0xFF{background[1:].upper()})), child: {text_widget})")
+        return text_widget
+    style = f"font-size:{font_px}px; color:{color}; margin:0; font-weight:{weight};"
+    if kind == "button":
+        style += f" background:{background}; border:none;"
+    body = "<br>".join(html.escape(line) for line in lines)
+    return f"<body><{tag} style=\"{style}\">{body}</{tag}></body>"
+
+
+def generate_snippet(region: Region, output_format: str, image_height: int,
+                     page_background: str = "#ffffff") -> tuple[str, float]:
+    """
+    Deterministic counterpart of llm.process_text_with_llm for simple regions: turns the
+    region's OCR lines, box geometry and colors into a snippet in output_format.
+    Returns (code, confidence); callers escalate to the LLM when confidence is low.
+    """
+    lines = text_lines(region)
+    score = confidence(region, lines)
+    if not lines:
+        return "", score
+    background, color = crop_colors(region.crop)
+    line_height = region.height * image_height / len(lines)
+    # Cap height is roughly 70% of the line box
+    font_px = max(int(round(line_height * 0.7)), 8)
+    kind = classify_text(lines, line_height, background, page_background)
+    return render(kind, lines, font_px, color, background, output_format), score
@@ -1,10 +1,8 @@
+from itertools import chain
 from bs4 import BeautifulSoup
+from imagecoderx.engine.regions import RegionSet
 
-def combine_html_sections(section_html_list, element_positions):
-    """
-    Merges multiple partial HTML sections into a final HTML document.
-    """
-    soup = BeautifulSoup("""
+PAGE_TEMPLATE = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -21,51 +19,80 @@ def combine_html_sections(section_html_list, element_positions):
     </head>
     <body></body>
     </html>
-    """, "html.parser")
+    """
 
-    body_tag = soup.find("body")
-    style_tag = soup.find("style")
+def combine_html_sections(regions, element_positions=None, assets=None, page_css=""):
+    """
+    Merges multiple partial HTML sections into a final HTML document.
+    Takes a RegionSet (or any iterable of Region); the legacy form with a list of
+    snippets plus a list of position dicts is still accepted.
+    ``assets`` are extra logo/background regions (see ``load_asset_manifest``),
+    placed before the code sections so they render underneath them.
+    ``page_css`` (declarations such as the detected background) is added to the body rule.
+    """
+    if element_positions is not None:
+        regions = RegionSet.from_positions(regions, element_positions)
+    return assemble_page([render_section(region) for region in chain(assets or (), regions)], page_css)
 
-    for pos_info, raw_html in zip(element_positions, section_html_list):
-        # Create a div for the section
-        section_div = soup.new_tag("div", attrs={
-            "class": "element-section",
-            "style": (
-                f"left:{pos_info['relative_x']*100}%; "
-                f"top:{pos_info['relative_y']*100}%; "
-                f"width:{pos_info['width']*100}%; "
-                f"height:{pos_info['height']*100}%;"
-            )
-        })
 
-        if pos_info.get("type") == "code":
-            # Parse the HTML snippet
-            sub_soup = BeautifulSoup(raw_html, "html.parser")
+def render_section(region) -> tuple[str, str]:
+    """
+    One region as (the CSS its snippet brings, its positioned <div> markup), so a
+    page can be assembled again without re-parsing the sections that did not change.
+    """
+    soup = BeautifulSoup("", "html.parser")
+    raw_html = region.code or ""
+    css = ""
+    # Create a div for the section
+    section_div = soup.new_tag("div", attrs={
+        "class": "element-section",
+        "style": (
+            f"left:{region.x*100}%; "
+            f"top:{region.y*100}%; "
+            f"width:{region.width*100}%; "
+            f"height:{region.height*100}%;"
+        )
+    })
 
-            # Extract and merge styles
-            snippet_style = sub_soup.find("style")
-            if snippet_style:
-                style_tag.append(snippet_style.string)
+    if region.type == "code":
+        # Parse the HTML snippet
+        sub_soup = BeautifulSoup(raw_html, "html.parser")
 
-            # Extract and append body content
-            snippet_body = sub_soup.find("body")
-            if snippet_body:
-                for child in snippet_body.contents:
-                    section_div.append(child)
-            else:
-                section_div.string = raw_html  # If no body, treat as plain text
+        # Extract the styles, merged into the page's <style> by assemble_page
+        snippet_style = sub_soup.find("style")
+        if snippet_style:
+            css = snippet_style.string or ""
+            snippet_style.decompose()
+
+        # Extract and append body content (appending moves a child, so iterate over a copy)
+        snippet_body = sub_soup.find("body")
+        if snippet_body:
+            for child in list(snippet_body.contents):
+                section_div.append(child)
+        else:
+            section_div.string = raw_html  # If no body, treat as plain text
 
-        elif pos_info.get("type") == "logo":
-            # Place the image
-            img_tag = soup.new_tag("img", src=pos_info["filename"])
+    elif region.type == "logo":
+        # Place the image
+        img_tag = soup.new_tag("img", src=region.filename)
+        section_div.append(img_tag)
+
+    else:
+        # Background or shape
+        if region.filename:
+            img_tag = soup.new_tag("img", src=region.filename)
             section_div.append(img_tag)
 
-        else:
-            # Background or shape
-            if pos_info.get("filename"):
-                img_tag = soup.new_tag("img", src=pos_info["filename"])
-                section_div.append(img_tag)
+    return css, str(section_div)
 
-        body_tag.append(section_div)
 
-    return str(soup)
+def assemble_page(sections, page_css=""):
+    """The final HTML document for (css, div markup) pairs from render_section, in order."""
+    soup = BeautifulSoup(PAGE_TEMPLATE, "html.parser")
+    style_tag = soup.find("style")
+    if page_css:
+        style_tag.append(f"body {{ {page_css} }}\n")
+    for css, _ in sections:
+        if css:
+            style_tag.append(css)
+    return str(soup).replace("<body></body>", "<body>" + "".join(div for _, div in sections) + "</body>", 1)
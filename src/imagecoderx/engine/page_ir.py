@@ -0,0 +1,109 @@
+import re
+from typing import Optional, Union
+
+from bs4 import BeautifulSoup, Comment, Declaration, Doctype, NavigableString, Tag
+
+# Elements that never have children or a closing tag
+VOID_ELEMENTS = frozenset(
+    ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr")
+)
+
+
+def parse_style(style: str) -> dict[str, str]:
+    """Splits an inline CSS declaration list into an ordered {property: value} dict."""
+    declarations = {}
+    for declaration in (style or "").split(";"):
+        name, sep, value = declaration.partition(":")
+        if sep and name.strip() and value.strip():
+            declarations[name.strip().lower()] = value.strip()
+    return declarations
+
+
+class Node:
+    """
+    One element of the page IR: a tag name, its attributes (without ``style``),
+    its inline style as a dict and its children, which are Nodes or text strings.
+    """
+
+    __slots__ = ("tag", "attrs", "style", "children")
+
+    def __init__(self, tag: str, attrs: Optional[dict] = None, style: Optional[dict] = None,
+                 children: Optional[list] = None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.style = style or {}
+        self.children: list[Union["Node", str]] = children or []
+
+    def __repr__(self) -> str:
+        return f"Node({self.tag!r}, children={len(self.children)})"
+
+    def text(self) -> str:
+        """Concatenated text of the node and its descendants (``<br>`` becomes a newline)."""
+        parts = []
+        for child in self.children:
+            if isinstance(child, str):
+                parts.append(child)
+            elif child.tag == "br":
+                parts.append("\n")
+            else:
+                parts.append(child.text())
+        return "".join(parts)
+
+
+class Page:
+    """
+    Intermediate representation of a generated page: title, page-level CSS and the
+    body as a Node tree. Built once per run; every output format is emitted from it.
+    """
+
+    __slots__ = ("title", "css", "body")
+
+    def __init__(self, body: Node, title: str = "Generated Code", css: str = ""):
+        self.body = body
+        self.title = title
+        self.css = css
+
+
+def _convert(element: Tag) -> Node:
+    attrs = {}
+    for name, value in element.attrs.items():
+        if name == "style":
+            continue
+        attrs[name] = " ".join(value) if isinstance(value, list) else value
+    node = Node((element.name or "body").lower(), attrs, parse_style(element.get("style", "")))
+    if node.tag in VOID_ELEMENTS:
+        return node
+    for child in element.children:
+        if isinstance(child, (Comment, Declaration, Doctype)):
+            continue
+        if isinstance(child, Tag):
+            if child.name.lower() not in ("script", "style"):
+                node.children.append(_convert(child))
+        elif isinstance(child, NavigableString) and str(child):
+            node.children.append(str(child))
+    return node
+
+
+def is_document(html_code: str) -> bool:
+    """Whether html_code is a whole document (``<html>`` with a ``<body>``) rather than a fragment."""
+    return bool(re.search(r"<html[\s>]", html_code, re.IGNORECASE) and re.search(r"<body[\s>]", html_code, re.IGNORECASE))
+
+
+def build_page_ir(html_code: str) -> Page:
+    """
+    Parses a generated HTML document into a Page. ``<style>`` blocks anywhere in the
+    document are gathered into ``Page.css``; scripts and comments are dropped.
+    """
+    soup = BeautifulSoup(html_code, "html.parser")
+    css = "\n".join(style.get_text().strip() for style in soup.find_all("style") if style.get_text().strip())
+    title_tag = soup.find("title")
+    title = title_tag.get_text().strip() if title_tag and title_tag.get_text().strip() else "Generated Code"
+    body_tag = soup.find("body")
+    if body_tag is None:
+        # A fragment: everything outside <head> becomes the body
+        for tag in soup.find_all(("head", "title", "meta", "link")):
+            tag.decompose()
+        body_tag = soup.find("html") or soup
+    body = _convert(body_tag)
+    body.tag = "body"
+    return Page(body, title, css)
@@ -0,0 +1,128 @@
+"""
+Progressive output: a draft page written as soon as the regions have their OCR
+text, then rewritten as the generated snippets arrive.
+
+Every write goes to a temporary file that replaces the document in one rename,
+so a reader (a browser preview with auto-reload, a file watcher) never sees a
+half-written page. Each section is rendered once and again only when its region
+changes, so an update does not re-parse the whole page. Each step can also be
+reported as one JSON line on an event stream for previews that update in place
+instead of reloading.
+"""
+import html
+import json
+import os
+import threading
+import time
+from typing import Callable, TextIO, Union
+
+from imagecoderx.engine.html_orchestrator import assemble_page, render_section
+from imagecoderx.engine.regions import Region
+
+
+def draft_snippet(region: Region) -> str:
+    """The OCR text of a region, one line per paragraph, in the <body> form of a snippet."""
+    lines = [line.strip() for line in (region.text or "").splitlines() if line.strip()]
+    return "<body>" + "".join(f"<p>{html.escape(line)}</p>" for line in lines) + "</body>"
+
+
+def write_atomic(path: str, text: str) -> None:
+    """Writes text to a temporary file next to path and renames it over path."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ProgressiveDocument:
+    """
+    A live HTML document at ``path`` for one conversion. The pipeline calls
+    ``draft`` once the regions are known, ``update`` whenever a region gets its code
+    and ``finish`` with the final page, or ``discard`` when no HTML output is wanted.
+    Regions without code yet are shown with their OCR text. ``events`` is a writable
+    text stream or a callable that receives each event dict:
+    ``{"event": "draft"|"region"|"final", "elapsed": seconds, ...}``.
+    """
+
+    def __init__(self, path: str, events: Union[TextIO, Callable[[dict], None], None] = None):
+        self.path = path
+        self.events = events
+        self.regions = None
+        self.page_css = ""
+        self.assets = None
+        # Rendered (css, div) of the assets, then of each region by index
+        self._asset_sections = []
+        self._sections = {}
+        self.writes = 0
+        self._early = []
+        self.first_write = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"ProgressiveDocument({self.path!r}, writes={self.writes})"
+
+    def _emit(self, event: dict) -> None:
+        event["elapsed"] = round(time.perf_counter() - self._start, 4)
+        if self.events is None:
+            return
+        if callable(self.events):
+            self.events(event)
+        else:
+            self.events.write(json.dumps(event) + "\n")
+            self.events.flush()
+
+    def _write(self, text: str) -> None:
+        write_atomic(self.path, text)
+        self.writes += 1
+        if self.first_write is None:
+            self.first_write = time.perf_counter() - self._start
+
+    def _render_region(self, region: Region) -> None:
+        if region.code is None and region.type == "code":
+            region = Region(region.box, region.type, region.index, text=region.text, filename=region.filename,
+                            code=draft_snippet(region))
+        self._sections[region.index] = render_section(region)
+
+    def render(self) -> str:
+        """The current page: generated code where it exists, OCR text elsewhere."""
+        return assemble_page(self._asset_sections + [self._sections[region.index] for region in self.regions],
+                             self.page_css)
+
+    def draft(self, regions, page_css: str = "", assets=None) -> None:
+        """Writes the first version of the page (call once OCR is done)."""
+        with self._lock:
+            self.regions, self.page_css, self.assets = regions, page_css, assets
+            self._asset_sections = [render_section(asset) for asset in assets or ()]
+            for region in regions:
+                self._render_region(region)
+            self._write(self.render())
+            self._emit({"event": "draft", "path": self.path, "regions": len(regions)})
+            # Regions that finished before the draft are already in it; still report them
+            for region in self._early:
+                self._emit({"event": "region", "region": region.index, "code": region.code or ""})
+            self._early = []
+
+    def update(self, region: Region) -> None:
+        """Replaces one region's draft with its generated code."""
+        with self._lock:
+            if self.regions is None:
+                # Arrived before the draft; the draft will include it
+                self._early.append(region)
+                return
+            self._render_region(region)
+            self._write(self.render())
+            self._emit({"event": "region", "region": region.index, "code": region.code or ""})
+
+    def finish(self, code: str) -> None:
+        """Replaces the draft with the final page."""
+        with self._lock:
+            self._write(code)
+            self._emit({"event": "final", "path": self.path, "writes": self.writes})
+
+    def discard(self) -> None:
+        """Removes the draft, for runs whose requested formats do not include HTML."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._emit({"event": "final", "path": None, "writes": self.writes})
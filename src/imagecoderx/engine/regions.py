@@ -0,0 +1,202 @@
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+Box = Tuple[float, float, float, float]
+
+
+class Region:
+    """
+    One detected region of the screenshot as it moves through the pipeline.
+
+    ``box`` is the relative (x, y, width, height) returned by ``detect_text_regions``,
+    ``crop`` is a zero-copy view into the decoded image, and the OCR result (with
+    the mean word confidence when page OCR provides one), generated code, asset
+    filename, per-stage timings and cache key are attached to the same object
+    instead of being copied into parallel lists and dicts.
+    """
+
+    __slots__ = (
+        "index",
+        "box",
+        "type",
+        "crop",
+        "text",
+        "char_boxes",
+        "ocr_confidence",
+        "code",
+        "filename",
+        "timings",
+        "cache_key",
+    )
+
+    def __init__(
+        self,
+        box: Box,
+        type: str = "code",
+        index: int = 0,
+        crop: Optional[np.ndarray] = None,
+        text: Optional[str] = None,
+        char_boxes: Optional[list[dict]] = None,
+        code: Optional[str] = None,
+        filename: Optional[str] = None,
+    ):
+        self.index = index
+        self.box = tuple(float(v) for v in box)
+        self.type = type
+        self.crop = crop
+        self.text = text
+        self.char_boxes = char_boxes
+        self.ocr_confidence = None
+        self.code = code
+        self.filename = filename
+        self.timings = {}
+        self.cache_key = None
+
+    def __repr__(self) -> str:
+        x, y, w, h = self.box
+        return f"Region(index={self.index}, type={self.type!r}, box=({x:.3f}, {y:.3f}, {w:.3f}, {h:.3f}))"
+
+    @property
+    def x(self) -> float:
+        return self.box[0]
+
+    @property
+    def y(self) -> float:
+        return self.box[1]
+
+    @property
+    def width(self) -> float:
+        return self.box[2]
+
+    @property
+    def height(self) -> float:
+        return self.box[3]
+
+    def pixel_box(self, image_width: int, image_height: int) -> tuple[int, int, int, int]:
+        """Returns the absolute (x1, y1, x2, y2) pixel corners of the region."""
+        x, y, w, h = self.box
+        return (
+            int(round(x * image_width)),
+            int(round(y * image_height)),
+            int(round((x + w) * image_width)),
+            int(round((y + h) * image_height)),
+        )
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Records the wall time spent in ``stage`` for this region."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+    def to_position(self) -> dict:
+        """Returns the legacy ``element_positions`` dict for this region."""
+        x, y, w, h = self.box
+        return {
+            "type": self.type,
+            "relative_x": x,
+            "relative_y": y,
+            "width": w,
+            "height": h,
+            "filename": self.filename,
+        }
+
+
+class RegionSet:
+    """
+    Ordered collection of ``Region`` objects sharing one decoded image.
+    """
+
+    __slots__ = ("image", "regions", "timings", "stats")
+
+    def __init__(self, regions: Iterable[Region] = (), image: Optional[np.ndarray] = None):
+        self.image = image
+        self.regions = list(regions)
+        self.timings = {}
+        self.stats = {}
+
+    @classmethod
+    def from_boxes(cls, boxes: Iterable[Box], image: Optional[np.ndarray] = None, type: str = "code") -> "RegionSet":
+        """
+        Builds regions from relative boxes. When ``image`` is given, every region
+        gets its crop as a view into it (no pixel data is copied).
+        """
+        regions = cls(image=image)
+        for box in boxes:
+            regions.add(box, type=type)
+        return regions
+
+    @classmethod
+    def from_positions(cls, section_html_list: Iterable[str], element_positions: Iterable[dict]) -> "RegionSet":
+        """Builds regions from the legacy parallel lists of snippets and position dicts."""
+        regions = cls()
+        for code, pos in zip(section_html_list, element_positions):
+            region = regions.add(
+                (pos["relative_x"], pos["relative_y"], pos["width"], pos["height"]),
+                type=pos.get("type", "code"),
+            )
+            region.code = code
+            region.filename = pos.get("filename")
+        return regions
+
+    def add(self, box: Box, type: str = "code") -> Region:
+        """Appends a new region for ``box`` and returns it."""
+        region = Region(box, type=type, index=len(self.regions))
+        if self.image is not None:
+            height, width = self.image.shape[:2]
+            x1, y1, x2, y2 = region.pixel_box(width, height)
+            region.crop = self.image[y1:y2, x1:x2]
+        self.regions.append(region)
+        return region
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def __iter__(self) -> Iterator[Region]:
+        return iter(self.regions)
+
+    def __getitem__(self, index: int) -> Region:
+        return self.regions[index]
+
+    @property
+    def boxes(self) -> np.ndarray:
+        """Returns the relative boxes of all regions as an (n, 4) float array."""
+        return np.array([r.box for r in self.regions], dtype=np.float64).reshape(-1, 4)
+
+    def of_type(self, type: str) -> list[Region]:
+        return [r for r in self.regions if r.type == type]
+
+    def discard_type(self, type: str) -> int:
+        """Removes all regions of ``type``, renumbers the rest and returns how many were removed."""
+        kept = [r for r in self.regions if r.type != type]
+        removed = len(self.regions) - len(kept)
+        for index, region in enumerate(kept):
+            region.index = index
+        self.regions = kept
+        return removed
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Records the wall time spent in a whole-image ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+    def stage_timings(self) -> dict:
+        """Returns whole-image stage timings plus per-region stage timings summed over all regions."""
+        totals = dict(self.timings)
+        for region in self.regions:
+            for stage, seconds in region.timings.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def positions(self) -> list[dict]:
+        """Returns the legacy ``element_positions`` list."""
+        return [r.to_position() for r in self.regions]
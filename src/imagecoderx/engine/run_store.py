@@ -0,0 +1,146 @@
+"""
+Checkpoints of conversion runs, so an interrupted or partly failed run can be
+resumed instead of starting over.
+
+A run is identified by the content of the decoded image. The store keeps, per
+run, the classified regions with their asset filenames, each region's OCR result
+as soon as it exists, each generated snippet and finally the refined page, all
+in one SQLite database (WAL mode, one row per region updated in place). On a
+rerun the pipeline restores the regions and only repeats the work that is
+missing or failed.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+# Region states, in pipeline order
+DETECTED, OCR_DONE, DONE, FAILED = "detected", "ocr", "done", "failed"
+
+
+def run_id_for(img: np.ndarray) -> str:
+    """Content hash of a decoded image (pixels and shape)."""
+    digest = hashlib.sha256(str(img.shape).encode())
+    digest.update(np.ascontiguousarray(img).data)
+    return digest.hexdigest()[:24]
+
+
+class RunStore:
+    """
+    SQLite-backed checkpoints; safe to share between the pipeline's threads.
+    Use as a context manager or call ``close``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id TEXT PRIMARY KEY,
+                image TEXT,
+                final_html TEXT,
+                created_at REAL,
+                updated_at REAL
+            )""")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS regions (
+                run_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                box TEXT NOT NULL,
+                filename TEXT,
+                text TEXT,
+                char_boxes TEXT,
+                code TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                PRIMARY KEY (run_id, idx)
+            )""")
+
+    def __repr__(self) -> str:
+        return f"RunStore({self.path!r})"
+
+    def __enter__(self) -> "RunStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql: str, params=()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def load_regions(self, run_id: str) -> list[dict]:
+        """The stored regions of a run in index order (empty if the run is new)."""
+        rows = self._execute("SELECT * FROM regions WHERE run_id = ? ORDER BY idx", (run_id,))
+        return [
+            {
+                "index": row["idx"],
+                "type": row["type"],
+                "box": tuple(json.loads(row["box"])),
+                "filename": row["filename"],
+                "text": row["text"],
+                "char_boxes": json.loads(row["char_boxes"]) if row["char_boxes"] is not None else None,
+                "code": row["code"] if row["state"] == DONE else None,
+                "state": row["state"],
+                "attempts": row["attempts"],
+                "error": row["error"],
+            }
+            for row in rows
+        ]
+
+    def save_regions(self, run_id: str, regions, image: Optional[str] = None) -> None:
+        """Starts (or restarts) a run with the classified regions; earlier checkpoints are dropped."""
+        now = time.time()
+        rows = [(run_id, region.index, region.type, json.dumps(region.box), region.filename, DETECTED)
+                for region in regions]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM regions WHERE run_id = ?", (run_id,))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO runs (id, image, final_html, created_at, updated_at) VALUES (?, ?, NULL, ?, ?)",
+                    (run_id, image, now, now))
+                self._db.executemany(
+                    "INSERT INTO regions (run_id, idx, type, box, filename, state) VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def save_ocr(self, run_id: str, region) -> None:
+        self._execute("UPDATE regions SET text = ?, char_boxes = ?, state = ? WHERE run_id = ? AND idx = ? AND state = ?",
+                      (region.text, json.dumps(region.char_boxes), OCR_DONE, run_id, region.index, DETECTED))
+
+    def save_code(self, run_id: str, region) -> None:
+        self._execute("UPDATE regions SET code = ?, state = ?, error = NULL, attempts = attempts + 1 "
+                      "WHERE run_id = ? AND idx = ?", (region.code, DONE, run_id, region.index))
+
+    def mark_failed(self, run_id: str, region, error: str) -> None:
+        """Records a region whose code generation failed; a rerun tries it again."""
+        self._execute("UPDATE regions SET state = ?, error = ?, attempts = attempts + 1 WHERE run_id = ? AND idx = ?",
+                      (FAILED, error, run_id, region.index))
+
+    def save_final(self, run_id: str, html: str) -> None:
+        self._execute("UPDATE runs SET final_html = ?, updated_at = ? WHERE id = ?", (html, time.time(), run_id))
+
+    def load_final(self, run_id: str) -> Optional[str]:
+        rows = self._execute("SELECT final_html FROM runs WHERE id = ?", (run_id,))
+        return rows[0]["final_html"] if rows else None
+
+    def stats(self, run_id: str) -> dict:
+        """Number of regions per state."""
+        rows = self._execute("SELECT state, COUNT(*) AS n FROM regions WHERE run_id = ? GROUP BY state", (run_id,))
+        return {row["state"]: row["n"] for row in rows}
@@ -0,0 +1,93 @@
+"""
+Shared-memory transport of the decoded image to worker processes.
+
+The image is copied once into a ``multiprocessing.shared_memory`` segment;
+tasks then carry only a small handle (segment name, shape, dtype) and a pixel
+box, and workers build zero-copy NumPy views of their crop instead of
+unpickling tens of megabytes per task.
+
+Lifecycle: the creating process owns the segment. ``SharedImage`` unlinks it
+when closed (use it as a context manager, so that happens on errors too), when it
+is garbage-collected and at interpreter exit; the multiprocessing resource
+tracker removes it if the process is killed. Workers keep at most one segment
+attached and release it when a task for another image arrives.
+"""
+import weakref
+from multiprocessing import shared_memory
+from typing import Callable
+
+import numpy as np
+
+Handle = tuple[str, tuple[int, ...], str]
+
+
+def _release(segment: shared_memory.SharedMemory) -> None:
+    try:
+        segment.close()
+    except BufferError:
+        # Views into the segment are still alive; they keep the mapping until collected
+        pass
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedImage:
+    """An image copied into a shared memory segment; ``handle`` is what tasks carry."""
+
+    def __init__(self, image: np.ndarray):
+        self._segment = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        self.array = np.ndarray(image.shape, dtype=image.dtype, buffer=self._segment.buf)
+        self.array[...] = image
+        self.handle: Handle = (self._segment.name, tuple(image.shape), image.dtype.str)
+        self._finalizer = weakref.finalize(self, _release, self._segment)
+
+    def __repr__(self) -> str:
+        return f"SharedImage({self.handle[0]!r}, shape={self.handle[1]})"
+
+    def __enter__(self) -> "SharedImage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        """Unmaps and removes the segment; safe to call twice."""
+        # Views into the buffer must be gone before the mapping can be closed
+        self.array = None
+        self._finalizer()
+
+
+# Worker side: the segment currently attached in this process
+_attached: dict[str, shared_memory.SharedMemory] = {}
+
+
+def attach(handle: Handle) -> np.ndarray:
+    """Returns a view of the shared image in a worker (attaching on first use)."""
+    name, shape, dtype = handle
+    segment = _attached.get(name)
+    if segment is None:
+        for old in _attached.values():
+            try:
+                old.close()
+            except BufferError:
+                # A result still references the old image; the mapping goes with it
+                pass
+        _attached.clear()
+        segment = _attached[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+
+def run_on_crop(func: Callable, handle: Handle, pixel_box: tuple[int, int, int, int], *args):
+    """
+    Task body for a worker process: calls ``func(crop, *args)`` on the zero-copy
+    crop ``pixel_box`` (x1, y1, x2, y2) of the shared image.
+    """
+    x1, y1, x2, y2 = pixel_box
+    return func(attach(handle)[y1:y2, x1:x2], *args)
+
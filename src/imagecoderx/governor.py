@@ -0,0 +1,177 @@
+"""
+Central control of the thread pools of OpenCV and Tesseract (OpenMP) and of the
+cores the pipeline runs on, so parallel modes do not oversubscribe the machine.
+
+Each library sizes its pool to every core by default; with several workers per
+machine that multiplies. The governor gives each process a thread budget per
+library and, optionally, a set of cores per stage:
+
+- OpenCV: ``cv2.setNumThreads`` in the process
+- Tesseract: ``OMP_THREAD_LIMIT`` (and ``OMP_NUM_THREADS``) in the environment that
+  its subprocesses inherit
+- rembg: runs as a CLI subprocess whose onnxruntime sizes its own thread pool and
+  does not read the OpenMP variables; only the core set below bounds it
+- cores: the worker's share of the CPUs the process may use (``worker_index`` of
+  ``workers``), narrowed per stage by ``stage_cores``. ``apply()`` pins every thread
+  of the process; a stage runs pinned inside ``pinned(stage)``, which only sets the
+  calling thread's affinity (other threads keep theirs) so that subprocesses started
+  there inherit it
+
+Presets: "latency" lets one conversion use the whole machine; "throughput" runs
+single-threaded libraries in as many CPU worker processes as the worker has cores,
+each pinned to its own share. Configured with the
+"resources" config section, e.g. ``{"preset": "throughput", "workers": 4, "worker_index": 0}``.
+"""
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import cv2
+
+# Stages that run in subprocesses, which inherit the affinity set by pinned()
+STAGES = ("ocr", "rembg")
+
+# None means "every core available to this worker"
+PRESETS = {
+    "latency": {"cv2_threads": None, "omp_threads": None, "cpu_workers": 0, "pin": False},
+    "throughput": {"cv2_threads": 1, "omp_threads": 1, "cpu_workers": None, "pin": True},
+}
+
+
+def available_cores() -> list[int]:
+    """The CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _set_affinity(cores) -> None:
+    if hasattr(os, "sched_setaffinity") and cores:
+        # On Linux pid 0 is the calling thread; new threads and subprocesses inherit its mask
+        os.sched_setaffinity(0, cores)
+
+
+def _set_process_affinity(cores) -> None:
+    """Pins every thread of the process, including pool threads started before the call."""
+    if not hasattr(os, "sched_setaffinity") or not cores:
+        return
+    try:
+        threads = [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        threads = [0]
+    for tid in threads:
+        try:
+            os.sched_setaffinity(tid, cores)
+        except OSError:
+            # The thread exited in the meantime
+            pass
+
+
+class ResourceGovernor:
+    """
+    Thread budgets and core assignment for one worker process. ``options`` override
+    the preset (cv2_threads, omp_threads, cpu_workers, pin)
+    and may include ``stage_cores``: {stage: [positions within the worker's cores]}.
+    """
+
+    def __init__(self, preset: str = "latency", workers: int = 1, worker_index: int = 0,
+                 cores: Optional[list[int]] = None, **options):
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown resource preset {preset!r} (expected one of {', '.join(PRESETS)})")
+        self.preset = preset
+        cores = cores or available_cores()
+        workers = max(1, workers)
+        # Split the cores evenly between workers; with more workers than cores they share
+        share = max(1, len(cores) // workers)
+        start = (worker_index * share) % len(cores)
+        self.cores = cores[start:start + share]
+        settings = {**PRESETS[preset], **options}
+        self.stage_cores = {
+            stage: [self.cores[i % len(self.cores)] for i in settings.get("stage_cores", {}).get(stage, ())]
+            or self.cores
+            for stage in STAGES
+        }
+        self.cv2_threads = settings["cv2_threads"] or len(self.cores)
+        self.omp_threads = settings["omp_threads"] or len(self.cores)
+        self.cpu_workers = len(self.cores) if settings["cpu_workers"] is None else settings["cpu_workers"]
+        self.pin = settings["pin"]
+
+    def __repr__(self) -> str:
+        return f"ResourceGovernor({self.preset!r}, cores={self.cores})"
+
+    def apply(self) -> None:
+        """Applies the budgets (and the core set, if pinning) to the current process."""
+        cv2.setNumThreads(self.cv2_threads)
+        os.environ["OMP_THREAD_LIMIT"] = str(self.omp_threads)
+        os.environ["OMP_NUM_THREADS"] = str(self.omp_threads)
+        if self.pin:
+            _set_process_affinity(self.cores)
+
+    @contextmanager
+    def pinned(self, stage: str) -> Iterator[None]:
+        """
+        Runs the block (and subprocesses it starts) on the stage's cores when pinning.
+        Only the calling thread is pinned; other threads of the process are left alone.
+        """
+        if not self.pin or not hasattr(os, "sched_setaffinity"):
+            yield
+            return
+        previous = os.sched_getaffinity(0)
+        _set_affinity(self.stage_cores[stage])
+        try:
+            yield
+        finally:
+            _set_affinity(previous)
+
+
+_current: Optional[ResourceGovernor] = None
+_options: Optional[dict] = None
+_lock = threading.Lock()
+
+
+def configure(config: dict) -> Optional[ResourceGovernor]:
+    """
+    Creates and applies the governor for the "resources" config section; it is only
+    rebuilt when the section changes. Returns None, changing nothing, if there is none.
+    """
+    global _current, _options
+    options = config.get("resources")
+    if not options:
+        return None
+    with _lock:
+        if _current is None or options != _options:
+            _current = ResourceGovernor(**options)
+            _current.apply()
+            _options = options
+        return _current
+
+
+def current() -> Optional[ResourceGovernor]:
+    return _current
+
+
+@contextmanager
+def pinned(stage: str) -> Iterator[None]:
+    """``current().pinned(stage)``, or nothing if no governor is configured."""
+    if _current is None:
+        yield
+    else:
+        with _current.pinned(stage):
+            yield
+
+
+def init_worker(options: dict, workers: int) -> None:
+    """
+    ProcessPoolExecutor initializer for the pipeline's CPU worker processes: each gets
+    the "throughput" budget (single-threaded libraries) and its own share of the parent's
+    cores, by the order in which the pool started it.
+    """
+    global _current
+    identity = multiprocessing.current_process()._identity
+    worker_index = (identity[0] - 1) % workers if identity else 0
+    cores = options.get("cores") or available_cores()
+    options = {**options, "preset": "throughput", "workers": workers, "worker_index": worker_index, "cores": cores}
+    _current = ResourceGovernor(**options)
+    _current.apply()
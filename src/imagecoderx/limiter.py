@@ -0,0 +1,109 @@
+"""
+Adaptive concurrency limit for calls to the LLM server.
+
+The limit follows a gradient rule: the ratio of the long-term latency average to
+the recent one tells whether requests started queuing on the server. While latency
+stays flat the limit grows additively (by about its square root per adjustment);
+when recent latency rises beyond ``tolerance`` times the long-term average, or a
+call fails, it shrinks multiplicatively.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class AdaptiveLimiter:
+    """
+    Gates concurrent calls: ``with limiter.slot(): ...`` waits while ``limit`` calls
+    are in flight, and adjusts the limit from the latency and outcome of each call.
+    ``limit``, ``inflight`` and ``queue_depth`` can be read at any time for monitoring.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        tolerance: float = 1.5,
+        backoff: float = 0.75,
+        smoothing: float = 0.2,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._long_latency = 0.0
+        self._short_latency = 0.0
+        self.inflight = 0
+        self.queue_depth = 0
+        self.completed = 0
+        self.errors = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(int(self._limit), self.min_limit)
+
+    def __repr__(self) -> str:
+        return f"AdaptiveLimiter(limit={self.limit}, inflight={self.inflight}, queue_depth={self.queue_depth})"
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Holds one unit of concurrency for the duration of the block."""
+        with self._condition:
+            self.queue_depth += 1
+            while self.inflight >= self.limit:
+                self._condition.wait()
+            self.queue_depth -= 1
+            self.inflight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self._update(time.perf_counter() - start, ok=False)
+            raise
+        else:
+            self._update(time.perf_counter() - start, ok=True)
+
+    def _update(self, latency: float, ok: bool) -> None:
+        with self._condition:
+            # Only a call that ran with every slot taken says anything about a higher limit
+            saturated = self.inflight >= self.limit
+            self.inflight -= 1
+            self.completed += 1
+            if not ok:
+                self.errors += 1
+                self._limit = max(self._limit * self.backoff, self.min_limit)
+            else:
+                if not self._long_latency:
+                    self._long_latency = self._short_latency = latency
+                self._short_latency += 0.5 * (latency - self._short_latency)
+                if self._short_latency > self.tolerance * self._long_latency and self._limit > self.min_limit:
+                    # Requests are queuing: shrink in proportion to the latency gradient. The
+                    # long-term average is left alone so overload does not become the baseline.
+                    gradient = max(0.5, self.tolerance * self._long_latency / self._short_latency)
+                    self._limit += self.smoothing * (self._limit * gradient - self._limit)
+                    self._limit = max(self._limit, self.min_limit)
+                else:
+                    self._long_latency += 0.05 * (latency - self._long_latency)
+                    if saturated:
+                        # Latency is flat and every slot was in use: probe for more
+                        self._limit = min(self._limit + self.smoothing * math.sqrt(self._limit), self.max_limit)
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """Current limit, in-flight and queued calls, completions, errors and latency averages."""
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "inflight": self.inflight,
+                "queue_depth": self.queue_depth,
+                "completed": self.completed,
+                "errors": self.errors,
+                "latency_short": round(self._short_latency, 6),
+                "latency_long": round(self._long_latency, 6),
+            }
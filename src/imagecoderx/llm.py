@@ -1,85 +1,164 @@
-from ollama import chat
+import threading
+from typing import Optional
+from ollama import Client
 from ollama import ChatResponse
 from imagecoderx.config import load_config
+from imagecoderx.limiter import AdaptiveLimiter
+from imagecoderx.llm_pool import get_pool
+from imagecoderx import metrics
+from imagecoderx import prompts, structured_output
+from imagecoderx.router import get_router, reply_confidence
 import re
 
-def process_text_with_llm(image_path: str, text: str, boxes: list[dict], output_format: str, text_regions: list[tuple[float, float, float, float]] = None) -> str:
-    """Processes text with an LLM (Ollama), incorporating structural information."""
-    config = load_config()
-    ollama_model = config.get("ollama_model", "llama3.2")
-    image_interpretation_prompt = config.get("image_interpretation_prompt", "Refine the following code/text...")
+_clients: dict[Optional[str], Client] = {}
+_clients_lock = threading.Lock()
 
-    # Prepare structural information
-    structural_info = ""
-    if boxes:
-        # Normalize coordinates (crude approximation)
-        max_x = max(box['x2'] for box in boxes)
-        max_y = max(box['y2'] for box in boxes)
-        structural_info = "Text structure:\n"
-        for box in boxes[:10]:  # Limit to first 10 for brevity
-            norm_x = box['x1'] / max_x if max_x else 0
-            norm_y = box['y1'] / max_y if max_y else 0
-            structural_info += f"Char '{box['char']}': x={norm_x:.2f}, y={norm_y:.2f}\n"
+def get_client(host: Optional[str] = None) -> Client:
+    """
+    Returns a (cached) Ollama client for host; None uses OLLAMA_HOST or the local default.
+    """
+    with _clients_lock:
+        client = _clients.get(host)
+        if client is None:
+            client = _clients[host] = Client(host=host)
+    return client
 
-    # Add text region information
-    if text_regions:
-        structural_info += "Text Regions:\n"
-        for i, (x, y, w, h) in enumerate(text_regions):
-            structural_info += f"Region {i}: x={x:.2f}, y={y:.2f}, width={w:.2f}, height={h:.2f}\n"
+_limiters: dict[tuple, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
 
-    # Append the output format to the prompt
-    prompt = f"{image_interpretation_prompt} {output_format}. {structural_info}"
+def get_limiter(config: dict) -> AdaptiveLimiter:
+    """
+    Returns the process-wide adaptive concurrency limiter for LLM calls, configured by
+    the "llm_concurrency" config section (initial_limit, min_limit, max_limit, ...).
+    """
+    options = config.get("llm_concurrency", {})
+    key = tuple(sorted(options.items()))
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveLimiter(**options)
+    return limiter
 
-    try:
-        response: ChatResponse = chat(model=ollama_model, messages=[
-            {
-                'role': 'user',
-                'content': f'{prompt}: {text}',
-            },
-        ])
-        content = response.message.content
+def chat(config: dict, **kwargs) -> ChatResponse:
+    """
+    Sends a chat request to the pool of "ollama_hosts" from the config if there is one
+    (see llm_pool.EndpointPool), otherwise to the single "ollama_host".
+    Calls wait for a slot of the adaptive limiter (see get_limiter); the request itself
+    is timed per model, failures are counted under the "llm" stage.
+    """
+    hosts = config.get("ollama_hosts")
+    with get_limiter(config).slot():
+        try:
+            with metrics.LLM_SECONDS.labels(kwargs.get("model", "")).time():
+                if hosts:
+                    return get_pool(hosts, **config.get("ollama_pool", {})).chat(**kwargs)
+                return get_client(config.get("ollama_host")).chat(**kwargs)
+        except Exception:
+            metrics.FAILURES.labels("llm").inc()
+            raise
+
+def extract_code(content: str) -> str:
+    """
+    Returns the first triple-backtick block of a reply without its language label,
+    or the whole reply if it has no code block.
+    """
+    code_blocks = re.findall(r"```(.*?)```", content, re.DOTALL)
+    if code_blocks:
+        code = code_blocks[0].strip()
+        # Remove language label if present
+        code_lines = code.split('\n')
+        if len(code_lines) > 0 and len(code_lines[0].split()) == 1:
+            code = '\n'.join(code_lines[1:]).strip()
+        return code
+    return content  # Return the whole content if no code block is found
 
-        # Extract code block
-        code_blocks = re.findall(r"```(.*?)```", content, re.DOTALL)
-        if code_blocks:
-            code = code_blocks[0].strip()
-            # Remove language label if present
-            code_lines = code.split('\n')
-            if len(code_lines) > 0 and len(code_lines[0].split()) == 1:
-                code = '\n'.join(code_lines[1:]).strip()
-            return code
-        else:
-            return content  # Return the whole content if no code block is found
+def _send(config: dict, model: str):
+    """Returns a send(messages, schema) function for structured_output.request."""
+    def send(messages: list[dict], schema: dict) -> str:
+        return chat(config, model=model, messages=messages, format=schema).message.content
+    return send
 
-    except Exception as e:
-        print(f"Error during Ollama processing: {e}")
-        return f"Ollama processing failed: {str(e)}"
+def process_text_with_llm(image_path: str, text: str, boxes: list[dict], output_format: str, text_regions: list[tuple[float, float, float, float]] = None,
+                          region_id: Optional[int] = None, complexity: float = 0.0, raise_errors: bool = False) -> str:
+    """
+    Processes text with an LLM (Ollama), incorporating structural information
+    (see prompts.build_messages for the message layout and token budget).
+    With "structured_output" in the config the model answers with a JSON object
+    (markup, css, region id) that is validated and, if needed, repaired or re-requested
+    (see structured_output); the fenced-block extraction is the fallback.
+    The model comes from the router (see router.get_router): the request starts at the
+    tier for ``complexity`` and moves to the next tier when the reply fails validation,
+    scores below "router_min_confidence" or the call fails. Only the last tier gets the
+    structured retries. If the last tier fails, the error is raised with ``raise_errors``
+    and returned as an "Ollama processing failed" message otherwise.
+    """
+    config = load_config()
+    router = get_router(config)
+    min_confidence = config.get("router_min_confidence", 0.5)
+    structured = config.get("structured_output", False)
+    region = region_id if region_id is not None or not structured else 0
+    # Fixed system prompt and instructions first (reused from the KV cache), compact region message last
+    messages = prompts.build_messages(config, output_format, text, boxes,
+                                      text_regions[0] if text_regions else None, region, structured)
+
+    tier = router.pick(complexity)
+    while True:
+        model = router.model(tier)
+        last = not router.can_escalate(tier)
+        try:
+            if structured:
+                data, content = structured_output.request(
+                    _send(config, model), messages, structured_output.SNIPPET_SCHEMA,
+                    region_id=region, retries=config.get("structured_retries", 2) if last else 0)
+                router.record(tier, accepted=data is not None or last)
+                if data or last:
+                    return structured_output.snippet_html(data) if data else extract_code(content)
+            else:
+                response: ChatResponse = chat(config, model=model, messages=messages)
+                content = response.message.content
+                accepted = last or reply_confidence(content) >= min_confidence
+                router.record(tier, accepted=accepted)
+                if accepted:
+                    return extract_code(content)
+        except Exception as e:
+            router.record(tier, accepted=False)
+            print(f"Error during Ollama processing: {e}")
+            if last:
+                if raise_errors:
+                    raise
+                return f"Ollama processing failed: {str(e)}"
+        print(f"Escalating region {region_id} from {model} to {router.model(tier + 1)}")
+        tier += 1
 
 def process_final_html(html_code: str) -> str:
     """
     Sends the final HTML code to the LLM with a finetuner prompt, extracts the improved code block,
-    and returns the improved code only.
+    and returns the improved code only. Uses a JSON reply (markup, css) with "structured_output".
+    The model is "final_model" from the config, or the router's largest tier.
     """
     finetuner_prompt = "improve this code and make it better, accurate, error free and return the improved code and nothing else"
+    config = load_config()
+    router = get_router(config)
+    messages = [{
+        "role": "user",
+        "content": f"{finetuner_prompt}: {html_code}"
+    }]
     try:
+        if config.get("structured_output", False):
+            data, content = structured_output.request(
+                _send(config, router.final_model), messages, structured_output.PAGE_SCHEMA,
+                retries=config.get("structured_retries", 2))
+            router.record(None, accepted=data is not None)
+            return structured_output.page_html(data) if data else extract_code(content)
+
         response = chat(
-            model="llama3.2",
-            messages=[{
-                "role": "user",
-                "content": f"{finetuner_prompt}: {html_code}"
-            }]
+            config,
+            model=router.final_model,
+            messages=messages,
         )
-        content = response.message.content
-        code_blocks = re.findall(r"```(.*?)```", content, re.DOTALL)
-        if code_blocks:
-            code = code_blocks[0].strip()
-            # Remove any language label if present
-            code_lines = code.split('\n')
-            if len(code_lines) > 0 and len(code_lines[0].split()) == 1:
-                code = '\n'.join(code_lines[1:]).strip()
-            return code
-        else:
-            return content
+        router.record(None, accepted=True)
+        return extract_code(response.message.content)
     except Exception as e:
+        router.record(None, accepted=False)
         print(f"Error during final LLM refinement: {e}")
         return html_code
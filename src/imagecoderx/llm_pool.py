@@ -0,0 +1,276 @@
+"""
+Client-side load balancing over several Ollama servers.
+
+``EndpointPool.chat`` sends each request to the healthy endpoint with the fewest
+outstanding requests, opens a circuit breaker on endpoints that keep failing,
+probes them again after a cool-down and, when a request is still running past
+the pool's recent p95 latency, sends a hedged duplicate to another endpoint and
+returns whichever answer arrives first.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Optional, Sequence
+
+import numpy as np
+from ollama import Client
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class Endpoint:
+    """One Ollama server with its client, breaker state and a window of recent latencies."""
+
+    def __init__(self, host: str, timeout: Optional[float] = None, window: int = 200):
+        self.host = host
+        self.client = Client(host=host, timeout=timeout)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.consecutive_failures = 0
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.host!r}, state={self.state!r}, outstanding={self.outstanding})"
+
+    def mean_latency(self) -> float:
+        return float(np.mean(self.latencies)) if self.latencies else 0.0
+
+    def stats(self) -> dict:
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "host": self.host,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "hedges": self.hedges,
+            "latency_mean": round(float(latencies.mean()), 6),
+            "latency_p50": round(float(np.percentile(latencies, 50)), 6),
+            "latency_p95": round(float(np.percentile(latencies, 95)), 6),
+        }
+
+
+class EndpointPool:
+    """
+    Balances chat requests over ``hosts``.
+
+    An endpoint's circuit opens after ``failure_threshold`` consecutive errors; it
+    gets one trial request (half-open) once ``reset_timeout`` seconds have passed,
+    or is closed again by a successful health check. Requests still unanswered
+    the pool's p95 latency after they started (once ``hedge_min_samples`` latencies
+    are known; waiting for a free pool thread does not count) are duplicated to a second endpoint, at most for ``max_hedge_ratio`` of all
+    requests.
+    """
+
+    def __init__(
+        self,
+        hosts: Sequence[str],
+        timeout: Optional[float] = None,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        hedge_quantile: float = 95.0,
+        hedge_min_samples: int = 20,
+        max_hedge_ratio: float = 0.1,
+        health_interval: float = 10.0,
+    ):
+        if not hosts:
+            raise ValueError("EndpointPool needs at least one host")
+        self.endpoints = [Endpoint(host, timeout) for host in hosts]
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.health_interval = health_interval
+        self.requests = 0
+        self.hedges = 0
+        self._latencies: deque[float] = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(self.endpoints)),
+                                            thread_name_prefix="ollama-pool")
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "EndpointPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=False)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a request is hedged, or None while too few latencies are known."""
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            return float(np.percentile(self._latencies, self.hedge_quantile))
+
+    def pick(self, exclude: Sequence[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Reserves the available endpoint with the fewest outstanding requests (ties go
+        to the lower mean latency) and returns it, or None if every circuit is open.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for endpoint in self.endpoints:
+                if endpoint in exclude:
+                    continue
+                if endpoint.state == OPEN and now - endpoint.opened_at >= self.reset_timeout:
+                    endpoint.state = HALF_OPEN
+                if endpoint.state == CLOSED or (endpoint.state == HALF_OPEN and endpoint.outstanding == 0):
+                    candidates.append(endpoint)
+            if not candidates:
+                return None
+            endpoint = min(candidates, key=lambda e: (e.outstanding, e.mean_latency()))
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def record(self, endpoint: Endpoint, latency: Optional[float], ok: bool) -> None:
+        """Updates an endpoint's statistics and breaker state after a request."""
+        with self._lock:
+            if ok:
+                endpoint.latencies.append(latency)
+                self._latencies.append(latency)
+                endpoint.consecutive_failures = 0
+                endpoint.state = CLOSED
+            else:
+                endpoint.errors += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.state == HALF_OPEN or endpoint.consecutive_failures >= self.failure_threshold:
+                    if endpoint.state != OPEN:
+                        print(f"Ollama endpoint {endpoint.host} unavailable, opening circuit")
+                    endpoint.state = OPEN
+                    endpoint.opened_at = time.monotonic()
+
+    def _call(self, endpoint: Endpoint, kwargs: dict, started: threading.Event):
+        started.set()
+        start = time.perf_counter()
+        try:
+            response = endpoint.client.chat(**kwargs)
+        except Exception:
+            self.record(endpoint, None, False)
+            raise
+        else:
+            self.record(endpoint, time.perf_counter() - start, True)
+            return response
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return self.hedges < self.max_hedge_ratio * self.requests + 1
+
+    def chat(self, **kwargs):
+        """
+        Same arguments and return value as ``ollama.Client.chat``. Failed requests are
+        retried on the next endpoint; the last error is raised if none succeeds.
+        """
+        with self._lock:
+            self.requests += 1
+        tried: list[Endpoint] = []
+        # Future of each call in flight -> set once the call leaves the executor queue
+        pending: dict[Future, threading.Event] = {}
+        last_error: Optional[Exception] = None
+        while True:
+            if not pending:
+                endpoint = self.pick(exclude=tried)
+                if endpoint is None:
+                    raise last_error or ConnectionError("No Ollama endpoint available")
+                tried.append(endpoint)
+                started = threading.Event()
+                pending[self._executor.submit(self._call, endpoint, kwargs, started)] = started
+
+            delay = self.hedge_delay() if len(pending) == 1 else None
+            if delay is not None:
+                # The delay counts from when the call starts: time spent queued behind other
+                # calls is local load, and hedging it would only add more
+                next(iter(pending.values())).wait()
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # Still running past the p95: duplicate it on another endpoint
+                endpoint = self.pick(exclude=tried) if self._may_hedge() else None
+                if endpoint is None:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                else:
+                    with self._lock:
+                        self.hedges += 1
+                        endpoint.hedges += 1
+                    tried.append(endpoint)
+                    started = threading.Event()
+                    pending[self._executor.submit(self._call, endpoint, kwargs, started)] = started
+                    continue
+            for future in done:
+                del pending[future]
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+
+    def check_health(self) -> dict[str, bool]:
+        """Probes every endpoint (``/api/tags``); closes or opens circuits accordingly."""
+        results = {}
+        for endpoint in self.endpoints:
+            try:
+                endpoint.client.list()
+            except Exception:
+                results[endpoint.host] = False
+                with self._lock:
+                    if endpoint.state != OPEN:
+                        print(f"Ollama endpoint {endpoint.host} failed health check, opening circuit")
+                    endpoint.state = OPEN
+                    endpoint.opened_at = time.monotonic()
+            else:
+                results[endpoint.host] = True
+                with self._lock:
+                    endpoint.state = CLOSED
+                    endpoint.consecutive_failures = 0
+        return results
+
+    def start_health_checks(self) -> None:
+        """Runs check_health every ``health_interval`` seconds on a daemon thread until close()."""
+        if self._health_thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(self.health_interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, daemon=True, name="ollama-health")
+        self._health_thread.start()
+
+    def stats(self) -> dict:
+        """Pool totals plus per-endpoint state, request/error/hedge counts and latency percentiles."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_delay": None if len(self._latencies) < self.hedge_min_samples
+                else round(float(np.percentile(self._latencies, self.hedge_quantile)), 6),
+                "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+            }
+
+
+_pools: dict[tuple, EndpointPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(hosts: Sequence[str], **options) -> EndpointPool:
+    """Returns a (cached) pool for hosts, starting its background health checks."""
+    key = (tuple(hosts), tuple(sorted(options.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = EndpointPool(hosts, **options)
+            pool.start_health_checks()
+    return pool
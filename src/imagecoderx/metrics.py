@@ -0,0 +1,304 @@
+"""
+Process-wide operational metrics: counters and histograms with labels,
+exported in the Prometheus / OpenMetrics text format.
+
+Hot paths only touch a cell owned by the calling thread (a float for counters,
+a pre-bucketed count list for histograms), so recording takes no lock and never
+contends. Cells are summed when the registry is rendered; cells of finished
+threads are folded into a base value then.
+
+Export either over HTTP for long-running processes (``start_http_server``,
+serving ``/metrics``) or by writing a textfile for node_exporter's textfile
+collector after batch runs (``write_textfile``).
+"""
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional, Sequence
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class _Cells:
+    """Per-thread accumulators; ``make`` builds a fresh cell, ``fold`` merges one into another."""
+
+    def __init__(self, make, fold):
+        self._make = make
+        self._fold = fold
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cells: list[tuple[weakref.ref, list]] = []
+        self._base = make()
+
+    def cell(self) -> list:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = self._make()
+            with self._lock:
+                self._cells.append((weakref.ref(threading.current_thread()), cell))
+            return cell
+
+    def collect(self) -> list:
+        """The total over all threads (the result is a new cell)."""
+        with self._lock:
+            alive = []
+            for thread, cell in self._cells:
+                if thread() is None or not thread().is_alive():
+                    # Nobody writes this cell any more
+                    self._fold(self._base, cell)
+                else:
+                    alive.append((thread, cell))
+            self._cells = alive
+            total = self._make()
+            self._fold(total, self._base)
+            for _, cell in alive:
+                self._fold(total, cell)
+            return total
+
+
+def _fold_value(into: list, cell: list) -> None:
+    into[0] += cell[0]
+
+
+class _CounterChild:
+    def __init__(self):
+        self._cells = _Cells(lambda: [0.0], _fold_value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cells.cell()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.collect()[0]
+
+
+class _HistogramChild:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        size = len(self.bounds) + 1
+
+        def make():
+            return [[0] * size, 0.0]
+
+        def fold(into, cell):
+            counts = into[0]
+            for i, n in enumerate(cell[0]):
+                counts[i] += n
+            into[1] += cell[1]
+
+        self._cells = _Cells(make, fold)
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.cell()
+        cell[0][bisect_left(self.bounds, value)] += 1
+        cell[1] += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observes the wall time of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        """Per-bucket (not cumulative) counts, the last one for +Inf, and the sum."""
+        counts, total = self._cells.collect()
+        return counts, total
+
+    def count(self) -> int:
+        return sum(self.snapshot()[0])
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r}, labels={self.labelnames})"
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """The child for one combination of label values (created on first use)."""
+        key = tuple(str(v) for v in values) or tuple(str(kwargs[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _label_text(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing count. Without labels, ``inc`` can be called directly."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def value(self, *labels) -> float:
+        return self.labels(*labels).value()
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}_total{self._label_text(key)} {_number(child.value())}"
+                for key, child in sorted(self._children.items())]
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets (upper bounds), plus their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, child in sorted(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(total)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    """A set of metrics that are rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, openmetrics: bool = False) -> str:
+        """
+        The text exposition of every metric: Prometheus 0.0.4 format, or OpenMetrics 1.0
+        (counter families named without ``_total`` and a closing ``# EOF``).
+        """
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        for metric in metrics:
+            family = metric.name if openmetrics or metric.kind != "counter" else f"{metric.name}_total"
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+            lines.extend(metric.samples())
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Writes the Prometheus text to path atomically (for node_exporter's textfile collector)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+IMAGES = REGISTRY.counter("imagecoderx_images", "Images converted")
+IMAGE_SECONDS = REGISTRY.histogram("imagecoderx_image_seconds", "Wall time per converted image")
+REGIONS = REGISTRY.histogram("imagecoderx_regions_per_image", "Regions detected per image", buckets=COUNT_BUCKETS)
+STAGE_SECONDS = REGISTRY.histogram("imagecoderx_stage_seconds", "Time per image spent in each stage", ("stage",))
+LLM_SECONDS = REGISTRY.histogram("imagecoderx_llm_request_seconds", "LLM request latency", ("model",))
+OCR_SECONDS = REGISTRY.histogram("imagecoderx_ocr_seconds", "Latency of one Tesseract run")
+REMBG_SECONDS = REGISTRY.histogram("imagecoderx_rembg_seconds", "Latency of one rembg background removal")
+CACHE_REQUESTS = REGISTRY.counter("imagecoderx_cache_requests", "Cache lookups by cache and result", ("cache", "result"))
+FAILURES = REGISTRY.counter("imagecoderx_failures", "Failures by stage", ("stage",))
+
+
+def start_http_server(port: int, addr: str = "", registry: Optional[Registry] = None) -> ThreadingHTTPServer:
+    """
+    Serves ``/metrics`` on a daemon thread (OpenMetrics when the scraper asks for it
+    in its Accept header). Returns the server; call ``shutdown()`` to stop it.
+    """
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            data = registry.render(openmetrics).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8"
+                             if openmetrics else "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True,
+                     name="metrics-http").start()
+    return server
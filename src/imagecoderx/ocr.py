@@ -1,23 +1,62 @@
 import subprocess
 import re
+import time
+from typing import Optional, Sequence, Union
 
-def extract_text_from_image(image_path: str) -> tuple[str, list[dict]]:
+import cv2
+import numpy as np
+
+from imagecoderx import governor, metrics
+from imagecoderx.algorithms.spatial_index import SpatialIndex
+
+# One row per recognized word: pixel box in page coordinates, confidence,
+# a page-wide line id and the word itself.
+WORD_DTYPE = np.dtype([
+    ("x1", np.int32), ("y1", np.int32), ("x2", np.int32), ("y2", np.int32),
+    ("conf", np.float32), ("line", np.int32), ("text", object),
+])
+
+def encode_for_ocr(image: np.ndarray) -> memoryview:
+    """
+    Encodes an image (or a crop view of one) as uncompressed PNM for Tesseract's stdin.
+    PNM is a header plus the raw pixels, so this is much cheaper than PNG.
+    """
+    ext = ".pgm" if image.ndim == 2 or image.shape[2] == 1 else ".ppm"
+    ok, buf = cv2.imencode(ext, image)
+    if not ok:
+        raise ValueError("Could not encode image for OCR")
+    return memoryview(buf)
+
+def extract_text_from_image(image: Union[str, np.ndarray], options: Sequence[str] = ()) -> tuple[str, list[dict]]:
     """
     Extracts text and bounding box information from an image using the Tesseract CLI directly.
+    Accepts an image path or a decoded image array; arrays are streamed to Tesseract over
+    stdin instead of being written to a temporary file. options are passed on to Tesseract.
     Returns a tuple containing the extracted text and a list of bounding box dictionaries.
     """
     try:
-        # Run tesseract to get the text and bounding box information
-        process = subprocess.Popen(
-            ["tesseract", image_path, "stdout", "-c", "hocr_char_boxes=1"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        output, error = process.communicate()
+        if isinstance(image, str):
+            source, data = image, None
+        else:
+            source, data = "stdin", encode_for_ocr(image)
+
+        # Run tesseract to get the text and bounding box information (on the OCR cores, if assigned)
+        start = time.perf_counter()
+        with governor.pinned("ocr"):
+            process = subprocess.Popen(
+                ["tesseract", source, "stdout", *options, "-c", "hocr_char_boxes=1"],
+                stdin=subprocess.PIPE if data is not None else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        output, error = process.communicate(data)
+        metrics.OCR_SECONDS.observe(time.perf_counter() - start)
+        output = output.decode("utf-8", errors="replace")
+        error = error.decode("utf-8", errors="replace")
 
         if process.returncode != 0:
             print(f"Tesseract Error: {error}")
+            metrics.FAILURES.labels("ocr").inc()
             return None, None
 
         # Parse the hOCR output to extract text and bounding boxes
@@ -36,4 +75,167 @@ def extract_text_from_image(image_path: str) -> tuple[str, list[dict]]:
 
     except Exception as e:
         print(f"Error during OCR: {e}")
+        metrics.FAILURES.labels("ocr").inc()
         return None, None
+
+def group_lines(boxes: list[dict]) -> list[list[dict]]:
+    """
+    Groups OCR boxes (words or characters) into text lines: a box joins the first line
+    whose vertical extent contains its center. Lines are top to bottom, boxes left to right.
+    """
+    lines = []
+    for box in sorted(boxes, key=lambda b: (b["y1"], b["x1"])):
+        center = (box["y1"] + box["y2"]) / 2
+        for line in lines:
+            if line[0] <= center <= line[1]:
+                line[2].append(box)
+                break
+        else:
+            lines.append((box["y1"], box["y2"], [box]))
+    return [sorted(line[2], key=lambda b: b["x1"]) for line in lines]
+
+def line_text(line: list[dict]) -> str:
+    """
+    The text of one line from group_lines. Word boxes are joined by spaces; between two
+    single-character boxes a space is only inserted where the gap is wider than a third
+    of the line height, so character boxes read "Sign in", not "S i g n i n".
+    """
+    boxes = [box for box in line if box["char"].strip()]
+    if not boxes:
+        return ""
+    height = max(box["y2"] - box["y1"] for box in boxes)
+    parts = [boxes[0]["char"]]
+    for previous, box in zip(boxes, boxes[1:]):
+        if len(previous["char"]) > 1 or len(box["char"]) > 1 or box["x1"] - previous["x2"] > height / 3:
+            parts.append(" ")
+        parts.append(box["char"])
+    return "".join(parts)
+
+def _run_tesseract(image: np.ndarray, *options: str) -> Optional[str]:
+    """Streams an image to the Tesseract CLI and returns its stdout, or None on failure."""
+    start = time.perf_counter()
+    with governor.pinned("ocr"):
+        process = subprocess.Popen(
+            ["tesseract", "stdin", "stdout", *options],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    output, error = process.communicate(encode_for_ocr(image))
+    metrics.OCR_SECONDS.observe(time.perf_counter() - start)
+    if process.returncode != 0:
+        print(f"Tesseract Error: {error.decode('utf-8', errors='replace')}")
+        metrics.FAILURES.labels("ocr").inc()
+        return None
+    return output.decode("utf-8", errors="replace")
+
+def parse_tsv(output: str, dx: int = 0, dy: int = 0, line_base: int = 0) -> np.ndarray:
+    """
+    Parses Tesseract TSV output into a WORD_DTYPE table, shifting boxes by (dx, dy)
+    and numbering lines from line_base.
+    """
+    rows = []
+    line_ids = {}
+    for row in output.splitlines()[1:]:
+        cols = row.split("\t")
+        # level 5 rows are words; skip empty detections
+        if len(cols) < 12 or cols[0] != "5" or not cols[11].strip():
+            continue
+        left, top, width, height = (int(v) for v in cols[6:10])
+        line_key = (cols[1], cols[2], cols[3], cols[4])
+        line = line_ids.setdefault(line_key, line_base + len(line_ids))
+        rows.append((left + dx, top + dy, left + width + dx, top + height + dy, float(cols[10]), line, cols[11]))
+    return np.array(rows, dtype=WORD_DTYPE)
+
+def extract_words(image: np.ndarray, tile_size: int = 0, overlap: int = 64, options: Sequence[str] = ()) -> np.ndarray:
+    """
+    Runs a single word-level OCR pass over the whole decoded image and returns a
+    WORD_DTYPE table in page coordinates; options are passed on to Tesseract.
+    With tile_size > 0, images larger than a tile are split into overlapping tiles;
+    a word found in an overlap is kept only by the tile whose core contains its center.
+    """
+    height, width = image.shape[:2]
+    if tile_size <= 0 or (width <= tile_size and height <= tile_size):
+        output = _run_tesseract(image, *options, "tsv")
+        return parse_tsv(output) if output is not None else np.zeros(0, dtype=WORD_DTYPE)
+
+    step = max(tile_size - overlap, 1)
+    tables = []
+    next_line = 0
+    ys, xs = _tile_starts(height, tile_size, step), _tile_starts(width, tile_size, step)
+    for y in ys:
+        for x in xs:
+            output = _run_tesseract(image[y:y + tile_size, x:x + tile_size], *options, "tsv")
+            if output is None:
+                continue
+            words = parse_tsv(output, dx=x, dy=y, line_base=next_line)
+            if len(words):
+                next_line = int(words["line"].max()) + 1
+                # Core of the tile: half of each shared overlap belongs to each neighbour
+                core_x1 = x + overlap // 2 if x != xs[0] else -np.inf
+                core_y1 = y + overlap // 2 if y != ys[0] else -np.inf
+                core_x2 = x + step + overlap // 2 if x != xs[-1] else np.inf
+                core_y2 = y + step + overlap // 2 if y != ys[-1] else np.inf
+                cx = (words["x1"] + words["x2"]) / 2
+                cy = (words["y1"] + words["y2"]) / 2
+                words = words[(cx >= core_x1) & (cx < core_x2) & (cy >= core_y1) & (cy < core_y2)]
+            tables.append(words)
+    return np.concatenate(tables) if tables else np.zeros(0, dtype=WORD_DTYPE)
+
+def _tile_starts(length: int, tile_size: int, step: int) -> list[int]:
+    """Start offsets of tiles of tile_size every step pixels, stopping once a tile reaches the end."""
+    starts = [0]
+    while starts[-1] + tile_size < length:
+        starts.append(starts[-1] + step)
+    return starts
+
+class PageText:
+    """
+    Words from one page-level OCR pass, joined to region boxes.
+
+    Each word goes to the smallest region containing its center (a vectorized
+    lookup through SpatialIndex), so overlapping regions never share words.
+    Words are then grouped by region, making each region lookup a slice.
+    """
+
+    def __init__(self, words: np.ndarray, boxes):
+        """boxes are the regions' pixel (x1, y1, x2, y2) corners."""
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        centers = np.stack(((words["x1"] + words["x2"]) / 2, (words["y1"] + words["y2"]) / 2), axis=1)
+        xywh = self.boxes.copy()
+        xywh[:, 2:] -= xywh[:, :2]
+        self.assignment = SpatialIndex(xywh).locate(centers) if len(words) else np.zeros(0, dtype=np.int64)
+
+        # Group words by region, keeping reading order (line, then x) inside each group
+        order = np.lexsort((words["x1"], words["line"], self.assignment))
+        self.words = words[order]
+        self.assignment = self.assignment[order]
+        self._offsets = np.searchsorted(self.assignment, np.arange(len(self.boxes) + 1))
+
+    def region_words(self, index: int) -> np.ndarray:
+        """Returns the word rows assigned to region ``index``."""
+        return self.words[self._offsets[index]:self._offsets[index + 1]]
+
+    def region_text(self, index: int) -> tuple[str, list[dict], Optional[float]]:
+        """
+        Returns (text, boxes, confidence) for a region: text and boxes in the same shape as
+        extract_text_from_image (words joined by spaces and lines by newlines, boxes relative
+        to the region crop), and the mean Tesseract confidence (0-100) of its words, None without words.
+        """
+        words = self.region_words(index)
+        x0, y0 = int(self.boxes[index, 0]), int(self.boxes[index, 1])
+        lines = []
+        boxes = []
+        previous_line = None
+        for word in words:
+            if word["line"] != previous_line:
+                lines.append([])
+                previous_line = word["line"]
+            lines[-1].append(word["text"])
+            boxes.append({
+                "char": word["text"],
+                "x1": int(word["x1"]) - x0, "y1": int(word["y1"]) - y0,
+                "x2": int(word["x2"]) - x0, "y2": int(word["y2"]) - y0,
+            })
+        confidence = float(words["conf"].mean()) if len(words) else None
+        return "\n".join(" ".join(line) for line in lines), boxes, confidence
@@ -0,0 +1,114 @@
+"""
+Prompt construction for region code generation.
+
+Messages are laid out so the expensive part is shared between calls: a fixed
+system prompt followed by the run's instructions (the same for every region)
+come first, and only the short region-specific message varies, so Ollama can
+reuse the evaluated prefix from its KV cache. The region message describes the
+layout compactly, one line of text per OCR line with coordinates quantized to a
+small grid, and is trimmed to a token budget.
+"""
+import re
+from typing import Optional, Sequence
+
+from imagecoderx import ocr
+
+SYSTEM_PROMPT = (
+    "You convert the OCR text of one region of a user interface screenshot into code. "
+    "Each request gives the region's position on the page in percent and its text lines, "
+    "each prefixed with its [x,y] position inside the region on a coarse grid. "
+    "Reproduce the text exactly, choose fitting elements (headings, paragraphs, labels, "
+    "buttons, inputs, lists) and keep the layout implied by the positions."
+)
+
+# Rough BPE granularity: words split into pieces of up to four characters, plus punctuation
+_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximates the token count of text without a tokenizer (pieces of up to four
+    word characters, each punctuation mark counted separately). Meant for budgets,
+    where it errs on the high side for English UI text.
+    """
+    return len(_TOKEN.findall(text))
+
+
+def instructions(config: dict, output_format: str, structured: bool = False) -> str:
+    """The per-run instruction prefix: identical for every region of a run."""
+    prompt = config.get("image_interpretation_prompt", "Refine the following code/text...")
+    if structured:
+        reply = ("Reply with a JSON object: region_id as given, the region's HTML markup in markup "
+                 "and its CSS in css.")
+    else:
+        reply = "Reply with the code in one fenced code block and nothing else."
+    return f"{prompt} Output format: {output_format}. {reply}"
+
+
+def _quantize(value: float, extent: float, grid: int) -> int:
+    return min(int(value / extent * grid), grid - 1) if extent else 0
+
+
+def layout_lines(boxes: Sequence[dict], grid: int = 16) -> list[str]:
+    """
+    One entry per OCR line: ``[x,y] text`` with the line's top-left corner quantized
+    to a grid x grid raster over the extent of the boxes.
+    """
+    if not boxes:
+        return []
+    max_x = max(box["x2"] for box in boxes)
+    max_y = max(box["y2"] for box in boxes)
+    lines = []
+    for line in ocr.group_lines(boxes):
+        text = ocr.line_text(line)
+        if text:
+            x = _quantize(min(box["x1"] for box in line), max_x, grid)
+            y = _quantize(min(box["y1"] for box in line), max_y, grid)
+            lines.append(f"[{x},{y}] {text}")
+    return lines
+
+
+def region_message(text: Optional[str], boxes: Optional[Sequence[dict]], region_box=None,
+                   region_id: Optional[int] = None, grid: int = 16, budget: Optional[int] = None) -> str:
+    """
+    The variable part of a request. Layout lines are dropped from the end, then the
+    remaining text is cut, until the message fits ``budget`` tokens.
+    """
+    header = []
+    if region_id is not None:
+        header.append(f"region_id {region_id}")
+    if region_box is not None:
+        x, y, w, h = (int(round(v * 100)) for v in region_box)
+        header.append(f"at {x},{y} size {w}x{h}")
+    head = " ".join(header)
+    lines = layout_lines(boxes or [], grid) or [line for line in (text or "").splitlines() if line.strip()]
+
+    def render(lines):
+        return (f"{head}\n" if head else "") + "Lines: " + "\n".join(lines)
+
+    message = render(lines)
+    if budget is None or count_tokens(message) <= budget:
+        return message
+    while len(lines) > 1 and count_tokens(render(lines)) > budget:
+        lines = lines[:-1]
+    message = render(lines)
+    while count_tokens(message) > budget and len(message) > len(head) + 8:
+        message = message[: int(len(message) * 0.9)]
+    return message
+
+
+def build_messages(config: dict, output_format: str, text: Optional[str], boxes: Optional[Sequence[dict]],
+                   region_box=None, region_id: Optional[int] = None, structured: bool = False) -> list[dict]:
+    """
+    Chat messages for one region: the fixed system prompt plus the run's instructions,
+    then the compact region message limited to the "prompt_token_budget" config
+    (tokens for the whole request, default 512).
+    """
+    system = f"{SYSTEM_PROMPT}\n{instructions(config, output_format, structured)}"
+    budget = config.get("prompt_token_budget", 512)
+    message = region_message(text, boxes, region_box, region_id, config.get("prompt_layout_grid", 16),
+                             max(budget - count_tokens(system), 16) if budget else None)
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": message},
+    ]
@@ -0,0 +1,131 @@
+"""
+Model routing for LLM requests.
+
+Models are arranged in tiers from small to large ("model_tiers" in the config,
+each ``{"name": ..., "model": ..., "max_complexity": ...}``). A request starts at
+the smallest tier whose ``max_complexity`` covers the region's complexity score
+(see region_complexity) and moves up one tier at a time only when the reply fails
+validation or looks unreliable (see reply_confidence). Without "model_tiers"
+there is a single tier using "ollama_model", so every request goes to that model.
+"""
+import re
+import threading
+from typing import Optional, Sequence
+
+from imagecoderx import ocr
+
+_TAG = re.compile(r"<[A-Za-z!][^>]*>")
+_FENCE = re.compile(r"```.*?```", re.DOTALL)
+
+
+def region_complexity(text: Optional[str], boxes: Optional[Sequence[dict]] = None, nested: int = 0,
+                      rule_confidence: Optional[float] = None) -> float:
+    """
+    Scores how hard a region is to convert, from 0 (a short single line) to 1.
+    Combines text length, OCR line count, the number of detected boxes nested in
+    the region and, if the fast path classified it, how unsure its rules were.
+    """
+    text = text or ""
+    lines = len(ocr.group_lines(boxes)) if boxes else len([line for line in text.splitlines() if line.strip()])
+    score = 0.35 * min(len(text) / 400, 1.0) + 0.3 * min(lines / 12, 1.0) + 0.2 * min(nested / 4, 1.0)
+    if rule_confidence is not None:
+        score += 0.15 * (1.0 - min(max(rule_confidence, 0.0), 1.0))
+    else:
+        score += 0.075
+    return round(min(score, 1.0), 4)
+
+
+def reply_confidence(content: str) -> float:
+    """
+    A cheap estimate of whether an unstructured reply holds usable code: 1.0 for a
+    fenced block with markup, 0.6 for bare markup, 0.3 for a fenced block without
+    tags and 0.0 for prose.
+    """
+    fenced = _FENCE.search(content)
+    tagged = _TAG.search(fenced.group(0) if fenced else content)
+    if fenced:
+        return 1.0 if tagged else 0.3
+    return 0.6 if tagged else 0.0
+
+
+class ModelRouter:
+    """
+    Picks a tier per request and counts, per tier, the requests it served, the
+    replies it had accepted and the ones escalated to the next tier.
+    """
+
+    def __init__(self, tiers: Sequence[dict], final_model: Optional[str] = None):
+        if not tiers:
+            raise ValueError("ModelRouter needs at least one tier")
+        self.tiers = [dict(tier, name=tier.get("name", tier["model"])) for tier in tiers]
+        self.final_model = final_model or self.tiers[-1]["model"]
+        self._counts = {tier["name"]: {"requests": 0, "accepted": 0, "escalated": 0} for tier in self.tiers}
+        self._counts.setdefault("final", {"requests": 0, "accepted": 0, "escalated": 0})
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"ModelRouter({[tier['name'] for tier in self.tiers]})"
+
+    def pick(self, complexity: float) -> int:
+        """Index of the smallest tier whose max_complexity is at least ``complexity``."""
+        for index, tier in enumerate(self.tiers):
+            if complexity <= tier.get("max_complexity", 1.0):
+                return index
+        return len(self.tiers) - 1
+
+    def model(self, index: int) -> str:
+        return self.tiers[index]["model"]
+
+    def can_escalate(self, index: int) -> bool:
+        return index + 1 < len(self.tiers)
+
+    def record(self, index: Optional[int], accepted: bool) -> None:
+        """Counts one request to tier ``index`` (None for the final pass)."""
+        name = "final" if index is None else self.tiers[index]["name"]
+        with self._lock:
+            counts = self._counts[name]
+            counts["requests"] += 1
+            if accepted:
+                counts["accepted"] += 1
+            elif index is not None and self.can_escalate(index):
+                counts["escalated"] += 1
+
+    def counts(self) -> dict:
+        """A copy of the per-tier counts, to pass to ``stats`` later as ``since``."""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+    def stats(self, since: Optional[dict] = None) -> dict:
+        """
+        Per-tier request, accepted and escalated counts, with each tier's share of requests;
+        with ``since`` (from ``counts``), only what was counted after it.
+        """
+        current = self.counts()
+        if since is not None:
+            current = {name: {key: value - since.get(name, {}).get(key, 0) for key, value in counts.items()}
+                       for name, counts in current.items()}
+        total = sum(counts["requests"] for name, counts in current.items() if name != "final")
+        return {
+            name: dict(counts, share=round(counts["requests"] / total, 4) if total and name != "final" else None)
+            for name, counts in current.items()
+        }
+
+
+_routers: dict[tuple, ModelRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(config: dict) -> ModelRouter:
+    """
+    Returns the process-wide router for the "model_tiers" of the config (a single
+    tier with "ollama_model" if there are none). The final page pass uses
+    "final_model", or the largest tier's model.
+    """
+    tiers = config.get("model_tiers") or [{"name": "default", "model": config.get("ollama_model", "llama3.2")}]
+    final_model = config.get("final_model")
+    key = (tuple(tuple(sorted(tier.items())) for tier in tiers), final_model)
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None:
+            router = _routers[key] = ModelRouter(tiers, final_model)
+    return router
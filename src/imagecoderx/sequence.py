@@ -0,0 +1,212 @@
+"""
+Conversion of frame sequences: screen recordings or directories of sequential screenshots.
+
+Frames are decoded one at a time (``cv2.VideoCapture`` for a video, one ``imread``
+per file for a directory), so a long recording is never held in memory. Each frame
+is compared with the last frame that was converted:
+
+- a perceptual hash (dHash) far from it, a different size or changes over most of
+  the screen start a new screen: a key frame, converted in full
+- changes confined to some areas (found by differencing downscaled copies) make a
+  diff frame: it is converted with the region results of the previous conversion,
+  so only text regions overlapping a changed area are OCRed and sent to the LLM again
+- no change: a duplicate, which points at the earlier output instead of producing one
+
+The outputs of every converted frame and a ``sequence.json`` manifest describing all
+frames are written to the output directory.
+
+Command line::
+
+    imagecoderx-sequence <video-or-directory> [--output-dir <dir>] [--out <format>[,<format>...]]
+                         [--step <n>] [--hash-distance <bits>] [--key-fraction <0..1>]
+"""
+import json
+import os
+import re
+import sys
+import time
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+from imagecoderx import core
+from imagecoderx.algorithms.spatial_index import SpatialIndex
+from imagecoderx.engine.emitters import parse_output_formats
+from imagecoderx.engine.progressive import write_atomic
+
+KEY, DIFF, DUPLICATE, FAILED = "key", "diff", "duplicate", "failed"
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+
+
+def _natural_key(name: str) -> list:
+    # frame2.png sorts before frame10.png
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def iter_frames(source: str, step: int = 1) -> Iterator[tuple[int, str, np.ndarray]]:
+    """
+    Yields (index, name, frame) for every step-th frame of a video file or of the images
+    in a directory (in natural order), decoding each frame only when it is reached.
+    """
+    step = max(1, step)
+    if os.path.isdir(source):
+        names = sorted((n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS)), key=_natural_key)
+        for index, name in enumerate(names):
+            if index % step:
+                continue
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is None:
+                print(f"Error: Could not read frame {name}")
+                continue
+            yield index, os.path.splitext(name)[0], frame
+        return
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        print(f"Error: Could not open video {source}")
+        return
+    try:
+        index = 0
+        while True:
+            if index % step:
+                # Skipped frames are only grabbed, not decoded
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield index, f"frame{index:06d}", frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def _gray(frame: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def dhash(frame: np.ndarray, size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pair of a (size + 1) x size thumbnail."""
+    thumb = cv2.resize(_gray(frame), (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def changed_boxes(previous: np.ndarray, frame: np.ndarray, width: int = 640, threshold: int = 16,
+                  min_area: float = 0.0002) -> tuple[list[tuple[float, float, float, float]], float]:
+    """
+    Relative (x, y, width, height) boxes around the areas where frame differs from
+    previous, and the changed fraction of the frame. Both are compared as grayscale
+    copies downscaled to ``width`` pixels; differences below ``threshold`` (compression
+    noise) and areas smaller than ``min_area`` of the frame are ignored.
+    """
+    height, frame_width = frame.shape[:2]
+    scale = min(1.0, width / frame_width)
+    size = (max(1, round(frame_width * scale)), max(1, round(height * scale)))
+    a = cv2.resize(_gray(previous), size, interpolation=cv2.INTER_AREA)
+    b = cv2.resize(_gray(frame), size, interpolation=cv2.INTER_AREA)
+    _, mask = cv2.threshold(cv2.absdiff(a, b), threshold, 255, cv2.THRESH_BINARY)
+    # Join the changed pixels of a word or a widget into one area
+    mask = cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=2)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h >= min_area * size[0] * size[1]:
+            boxes.append((x / size[0], y / size[1], w / size[0], h / size[1]))
+    return boxes, cv2.countNonZero(mask) / mask.size
+
+
+def convert_sequence(source: str, output_dir: str, output_formats: list[str] = ("html",), step: int = 1,
+                     hash_distance: int = 12, key_fraction: float = 0.5) -> list[dict]:
+    """
+    Converts the distinct screens of a video or image directory (see the module docstring).
+    A frame is a key frame when its dHash is more than ``hash_distance`` bits from the last
+    converted frame or more than ``key_fraction`` of it changed. Returns the manifest: one
+    entry per frame with its kind, changed areas, carried-over regions and output paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_formats = list(output_formats)
+    manifest = []
+    # The last converted frame, its hash and manifest entry
+    base = base_hash = base_entry = None
+    # {pixel box: (text, char boxes, code)} of the last conversion (see core.convert_image_to_formats)
+    region_results = {}
+    for index, name, frame in iter_frames(source, step):
+        start = time.perf_counter()
+        frame_hash = dhash(frame)
+        entry = {"index": index, "name": name}
+        boxes = []
+        if base is None or frame.shape != base.shape or hamming(frame_hash, base_hash) > hash_distance:
+            kind = KEY
+        else:
+            boxes, fraction = changed_boxes(base, frame)
+            kind = KEY if fraction > key_fraction else DIFF if boxes else DUPLICATE
+        if kind == DUPLICATE:
+            entry.update(kind=kind, same_as=base_entry["index"], outputs=base_entry["outputs"])
+            manifest.append(entry)
+            continue
+
+        height, width = frame.shape[:2]
+        if kind == KEY:
+            region_results.clear()
+        else:
+            # Regions touching a changed area are redone; the rest carry over
+            changed = SpatialIndex(boxes)
+            for x1, y1, x2, y2 in list(region_results):
+                if len(changed.intersects((x1 / width, y1 / height, (x2 - x1) / width, (y2 - y1) / height))):
+                    del region_results[x1, y1, x2, y2]
+        entry.update(kind=kind, changed=[[round(v, 4) for v in box] for box in boxes],
+                     carried_regions=len(region_results))
+        outputs = core.convert_image_to_formats(frame, output_formats, region_results=region_results)
+        if not outputs:
+            print(f"Error: Could not convert frame {name}")
+            entry["kind"] = FAILED
+            manifest.append(entry)
+            continue
+        paths = {}
+        for output_format, code in outputs.items():
+            paths[output_format] = os.path.join(output_dir, f"{name}.{output_format}")
+            write_atomic(paths[output_format], code)
+        entry.update(outputs=paths, seconds=round(time.perf_counter() - start, 3))
+        print(f"Frame {index} ({kind}): {entry['carried_regions']} regions carried over, "
+              f"saved to {', '.join(paths.values())}")
+        manifest.append(entry)
+        base, base_hash, base_entry = frame, frame_hash, entry
+
+    write_atomic(os.path.join(output_dir, "sequence.json"), json.dumps(manifest, indent=2))
+    return manifest
+
+
+def _option(args: list[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args):
+            return args[idx + 1]
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: imagecoderx-sequence <video-or-directory> [--output-dir <dir>] [--out <format>[,<format>...]]"
+              " [--step <n>] [--hash-distance <bits>] [--key-fraction <0..1>]")
+        sys.exit(1)
+    manifest = convert_sequence(
+        args[0], _option(args, "--output-dir", "sequence_output"),
+        parse_output_formats(_option(args, "--out", "html")),
+        step=int(_option(args, "--step", "1")),
+        hash_distance=int(_option(args, "--hash-distance", "12")),
+        key_fraction=float(_option(args, "--key-fraction", "0.5")),
+    )
+    kinds = {}
+    for entry in manifest:
+        kinds[entry["kind"]] = kinds.get(entry["kind"], 0) + 1
+    print(f"Frames: {kinds}")
@@ -0,0 +1,119 @@
+"""
+Structured LLM replies: JSON-schema constrained output (Ollama's ``format``
+parameter), a cheap validator, and a bounded repair/retry policy.
+
+A snippet reply is ``{"region_id": int, "markup": str, "css": str}``; the final
+page reply is ``{"markup": str, "css": str}``. Replies that fail validation are
+first repaired locally (code fences and surrounding prose stripped, the first
+JSON object extracted); if that is not enough, the model is asked again with the
+validation error, at most ``retries`` times.
+"""
+import json
+import re
+from typing import Callable, Optional
+
+SNIPPET_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "region_id": {"type": "integer"},
+        "markup": {"type": "string"},
+        "css": {"type": "string"},
+    },
+    "required": ["region_id", "markup", "css"],
+}
+
+PAGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "markup": {"type": "string"},
+        "css": {"type": "string"},
+    },
+    "required": ["markup", "css"],
+}
+
+_TAG = re.compile(r"<[A-Za-z!][^>]*>")
+_FENCE = re.compile(r"```[A-Za-z]*\s*(.*?)```", re.DOTALL)
+
+
+def validate(data, schema: dict, region_id: Optional[int] = None) -> Optional[str]:
+    """
+    Returns None if ``data`` is a valid reply for ``schema``, otherwise a short
+    description of the first problem. Markup must contain at least one tag.
+    """
+    if not isinstance(data, dict):
+        return "reply is not a JSON object"
+    for name in schema["required"]:
+        if name not in data:
+            return f"missing field {name!r}"
+        expected = int if schema["properties"][name]["type"] == "integer" else str
+        if not isinstance(data[name], expected) or isinstance(data[name], bool):
+            return f"field {name!r} must be a {schema['properties'][name]['type']}"
+    if region_id is not None and "region_id" in schema["properties"] and data["region_id"] != region_id:
+        return f"region_id must be {region_id}"
+    if not _TAG.search(data["markup"]):
+        return "markup contains no HTML tags"
+    return None
+
+
+def parse(content: str):
+    """
+    Decodes a reply, repairing common deviations: a fenced JSON block or prose
+    around the object. Returns the decoded value, or None if no JSON object is found.
+    """
+    try:
+        return json.loads(content)
+    except ValueError:
+        pass
+    fenced = _FENCE.search(content)
+    candidates = [fenced.group(1)] if fenced else []
+    candidates.append(content)
+    decoder = json.JSONDecoder()
+    for candidate in candidates:
+        start = candidate.find("{")
+        while start != -1:
+            try:
+                return decoder.raw_decode(candidate, start)[0]
+            except ValueError:
+                start = candidate.find("{", start + 1)
+    return None
+
+
+def request(send: Callable[[list[dict], dict], str], messages: list[dict], schema: dict,
+            region_id: Optional[int] = None, retries: int = 2) -> tuple[Optional[dict], str]:
+    """
+    Calls ``send(messages, schema)`` (which returns the reply text) until the reply
+    validates, asking for a correction at most ``retries`` times. Returns the
+    validated dict (None if every attempt failed) and the last raw reply.
+    """
+    messages = list(messages)
+    content = ""
+    for attempt in range(retries + 1):
+        content = send(messages, schema)
+        data = parse(content)
+        error = validate(data, schema, region_id)
+        if error is None:
+            return data, content
+        print(f"Invalid structured LLM reply (attempt {attempt + 1}): {error}")
+        messages += [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": f"That reply was invalid: {error}. "
+                                        "Answer again with only a JSON object matching the schema."},
+        ]
+    return None, content
+
+
+def snippet_html(data: dict) -> str:
+    """Joins a snippet reply into the <body> form that combine_html_sections expects."""
+    style = f"<style>{data['css']}</style>" if data.get("css", "").strip() else ""
+    return f"<body>{style}{data['markup']}</body>"
+
+
+def page_html(data: dict) -> str:
+    """Joins a page reply into one document, with the CSS in the head."""
+    markup, css = data["markup"], data.get("css", "").strip()
+    if not css:
+        return markup
+    style = f"<style>{css}</style>"
+    if "</head>" in markup:
+        return markup.replace("</head>", f"{style}</head>", 1)
+    return style + markup
@@ -0,0 +1,451 @@
+"""
+Deterministic stand-ins for the external services used by the pipeline, for tests
+and benchmarks: a synthetic screenshot generator, a local HTTP server speaking
+enough of the Ollama API for ``ollama.Client``, and fake ``tesseract`` and ``rembg``
+executables.
+"""
+import hashlib
+import html
+import bisect
+import json
+import os
+import re
+import socketserver
+import stat
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+WORDS = (
+    "Sign in Email Password Submit Home About Pricing Contact Dashboard Settings Profile "
+    "Search Cancel Continue Learn more Get started Welcome back Total Orders Revenue Users "
+    "Download Upload Notifications Help Logout Account Save Delete Edit Share"
+).split()
+
+
+def synthetic_screenshot(width: int = 1280, height: int = 800, regions: int = 20,
+                         words_per_region: int = 6, seed: int = 0) -> np.ndarray:
+    """
+    Draws a deterministic UI-like screenshot: a gradient background with ``regions``
+    light panels laid out on a grid, each holding ``words_per_region`` words of text.
+    """
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    top = np.array([250, 246, 240], np.float32)
+    bottom = np.array([225, 232, 244], np.float32)
+    img = np.broadcast_to(top + (bottom - top) * ramp, (height, width, 3)).astype(np.uint8, order="C")
+
+    cols = max(1, int(np.ceil(np.sqrt(regions * width / height))))
+    rows = max(1, int(np.ceil(regions / cols)))
+    cell_w, cell_h = width // cols, height // rows
+    scale = max(0.4, min(cell_h / 120, 1.2))
+    for i in range(regions):
+        cx, cy = (i % cols) * cell_w, (i // cols) * cell_h
+        x1, y1 = cx + cell_w // 12, cy + cell_h // 10
+        x2, y2 = cx + cell_w - cell_w // 12, cy + cell_h - cell_h // 10
+        color = tuple(int(c) for c in rng.integers(200, 256, size=3))
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, thickness=-1)
+
+        words = [WORDS[j] for j in rng.integers(0, len(WORDS), size=words_per_region)]
+        line_h = int(30 * scale)
+        y = y1 + line_h
+        line = ""
+        for word in words:
+            candidate = f"{line} {word}".strip()
+            (text_w, _), _ = cv2.getTextSize(candidate, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+            if line and x1 + 10 + text_w > x2:
+                cv2.putText(img, line, (x1 + 10, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (40, 40, 40), 1, cv2.LINE_AA)
+                y += line_h
+                line = word
+            else:
+                line = candidate
+            if y > y2:
+                break
+        if line and y <= y2:
+            cv2.putText(img, line, (x1 + 10, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (40, 40, 40), 1, cv2.LINE_AA)
+    return img
+
+
+def default_responder(request: dict) -> str:
+    """
+    Deterministic reply for a chat request: echoes the text after the last ': ' of the
+    last message as an HTML paragraph in a fenced code block. The final refinement
+    prompt gets its HTML back unchanged. Requests with a JSON schema get
+    structured_responder's reply.
+    """
+    if isinstance(request.get("format"), dict):
+        return structured_responder(request)
+    content = request["messages"][-1]["content"]
+    head, _, tail = content.rpartition(": ")
+    if head.startswith("improve this code"):
+        return f"```html\n{tail}\n```"
+    return f"```html\n<body><p>{html.escape(tail.strip())}</p></body>\n```"
+
+
+def structured_responder(request: dict) -> str:
+    """
+    JSON reply for requests with a ``format`` schema: the page comes back unchanged,
+    a region's text as a paragraph with the region id named in the prompt.
+    """
+    content = next(m["content"] for m in request["messages"] if m["role"] == "user")
+    head, _, tail = content.rpartition(": ")
+    if head.startswith("improve this code"):
+        return json.dumps({"markup": tail, "css": ""})
+    match = re.search(r"region_id (\d+)", head)
+    return json.dumps({
+        "region_id": int(match.group(1)) if match else 0,
+        "markup": f"<p>{html.escape(tail.strip())}</p>",
+        "css": "p { margin: 0; }",
+    })
+
+
+class FakeOllamaServer:
+    """
+    Local HTTP server that answers ``/api/chat`` like Ollama, for ``ollama.Client(host=server.url)``.
+
+    ``latency`` is added to every chat request and ``per_char_latency`` per character
+    of prompt, standing in for prompt evaluation time. With ``prefix_cache`` only the
+    characters after the prefix shared with the previous prompt are charged (and
+    counted in ``prompt_eval_count``), like Ollama reusing its KV cache. ``capacity`` limits how many
+    requests are served at once (like OLLAMA_NUM_PARALLEL); the rest queue. Requests
+    are recorded in ``requests``. Use as a context manager or call ``start``/``stop``.
+    """
+
+    def __init__(self, latency: float = 0.0, per_char_latency: float = 0.0,
+                 responder: Callable[[dict], str] = default_responder, port: int = 0,
+                 capacity: Optional[int] = None, prefix_cache: bool = False):
+        self.latency = latency
+        self.prefix_cache = prefix_cache
+        self._last_prompt = ""
+        self.per_char_latency = per_char_latency
+        self._slots = threading.Semaphore(capacity) if capacity else None
+        self.responder = responder
+        self.requests: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving; further requests fail with a connection error. Safe to call twice."""
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def chat(self, request: dict) -> dict:
+        """Builds the JSON body for one chat request."""
+        prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+        with self._lock:
+            cached = len(os.path.commonprefix([self._last_prompt, prompt])) if self.prefix_cache else 0
+            self._last_prompt = prompt
+        prompt_chars = len(prompt) - cached
+        delay = self.latency + self.per_char_latency * prompt_chars
+        if self._slots is not None:
+            with self._slots:
+                time.sleep(delay)
+        elif delay:
+            time.sleep(delay)
+        with self._lock:
+            self.requests.append(request)
+        content = self.responder(request)
+        return {
+            "model": request.get("model", ""),
+            "created_at": "1970-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(delay * 1e9),
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": len(content) // 4,
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: dict) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._reply(200, {"models": []})
+                elif self.path == "/api/version":
+                    self._reply(200, {"version": "0.0.0-fake"})
+                else:
+                    self._reply(200, {"status": "Ollama is running"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/chat":
+                    try:
+                        body = server.chat(request)
+                    except Exception as e:
+                        # A responder that raises stands in for a server-side model error
+                        self._reply(500, {"error": str(e)})
+                        return
+                    self._reply(200, body)
+                else:
+                    self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+        return Handler
+
+
+class FakeRedisServer:
+    """
+    In-memory server speaking the subset of the Redis protocol used by
+    ``batch.RedisQueue`` (hashes, lists, sorted sets), for tests and local runs
+    without Redis. ``url`` gives a ``redis://`` queue URL for a key prefix.
+    """
+
+    def __init__(self, port: int = 0):
+        self.data: dict[str, object] = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        command = server._read_command(self.rfile)
+                    except (ConnectionError, ValueError):
+                        return
+                    if command is None:
+                        return
+                    with server._lock:
+                        try:
+                            reply = server.execute(*command)
+                        except Exception as e:
+                            reply = RuntimeError(f"ERR {e}")
+                    self.wfile.write(server._encode(reply))
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def url(self, prefix: str = "imagecoderx") -> str:
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/{prefix}"
+
+    def __enter__(self) -> "FakeRedisServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> "FakeRedisServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    @staticmethod
+    def _read_command(rfile) -> Optional[list[str]]:
+        line = rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            raise ValueError("expected an array")
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(rfile.readline()[1:])
+            args.append(rfile.read(length + 2)[:-2].decode())
+        return args
+
+    @classmethod
+    def _encode(cls, value) -> bytes:
+        if isinstance(value, RuntimeError):
+            return f"-{value}\r\n".encode()
+        if value is True:
+            return b"+OK\r\n"
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(cls._encode(v) for v in value)
+        data = str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def execute(self, name: str, *args: str):
+        """Runs one command against the in-memory data (callers hold the lock)."""
+        name = name.upper()
+        if name == "PING":
+            return "PONG"
+        if name in ("FLUSHALL", "FLUSHDB"):
+            self.data.clear()
+            return True
+        if name == "DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        key, rest = args[0], args[1:]
+        if name in ("HSET", "HSETNX", "HGET", "HGETALL", "HINCRBY"):
+            table = self.data.setdefault(key, {})
+            if name == "HSET":
+                added = sum(field not in table for field in rest[::2])
+                table.update(zip(rest[::2], rest[1::2]))
+                return added
+            if name == "HSETNX":
+                if rest[0] in table:
+                    return 0
+                table[rest[0]] = rest[1]
+                return 1
+            if name == "HGET":
+                return table.get(rest[0])
+            if name == "HGETALL":
+                return [item for pair in table.items() for item in pair]
+            table[rest[0]] = str(int(table.get(rest[0], 0)) + int(rest[1]))
+            return int(table[rest[0]])
+        if name == "LMOVE":
+            source, target = self.data.setdefault(key, []), self.data.setdefault(rest[0], [])
+            if not source:
+                return None
+            item = source.pop(0 if rest[1].upper() == "LEFT" else -1)
+            target.insert(0 if rest[2].upper() == "LEFT" else len(target), item)
+            return item
+        if name in ("RPUSH", "LPOP", "LRANGE", "LLEN", "LREM"):
+            items = self.data.setdefault(key, [])
+            if name == "LREM":
+                # Only the count > 0 form (first occurrences from the head)
+                count, removed = int(rest[0]), 0
+                while rest[1] in items and removed < count:
+                    items.remove(rest[1])
+                    removed += 1
+                return removed
+            if name == "RPUSH":
+                items.extend(rest)
+                return len(items)
+            if name == "LPOP":
+                return items.pop(0) if items else None
+            if name == "LLEN":
+                return len(items)
+            start, stop = int(rest[0]), int(rest[1])
+            return items[start:None if stop == -1 else stop + 1]
+        if name in ("ZADD", "ZREM", "ZSCORE", "ZRANGEBYSCORE"):
+            # Sorted set as {member: score}; ranges are answered by sorting
+            members = self.data.setdefault(key, {})
+            if name == "ZADD":
+                only_new = rest[:1] == ("NX",)
+                rest = rest[1:] if only_new else rest
+                added = 0
+                for score, member in zip(rest[::2], rest[1::2]):
+                    if only_new and member in members:
+                        continue
+                    added += member not in members
+                    members[member] = float(score)
+                return added
+            if name == "ZSCORE":
+                return repr(members[rest[0]]) if rest[0] in members else None
+            if name == "ZREM":
+                return sum(members.pop(member, None) is not None for member in rest)
+            low, high = (float(v.replace("inf", "Infinity")) for v in rest[:2])
+            ordered = sorted(members.items(), key=lambda item: (item[1], item[0]))
+            scores = [score for _, score in ordered]
+            return [member for member, _ in ordered[bisect.bisect_left(scores, low):bisect.bisect_right(scores, high)]]
+        raise ValueError(f"unknown command '{name}'")
+
+
+FAKE_TESSERACT = r'''#!{python}
+"""Deterministic tesseract stand-in: emits words derived from a hash of the input image."""
+import os, sys, time, zlib
+WORDS = {words!r}
+args = sys.argv[1:]
+data = sys.stdin.buffer.read() if args[0] in ("stdin", "-") else open(args[0], "rb").read()
+delay = float(os.environ.get("FAKE_TESSERACT_DELAY", "0"))
+if delay:
+    time.sleep(delay)
+width, height = 100, 30
+if data[:2] in (b"P5", b"P6"):
+    width, height = map(int, data.split(None, 3)[1:3])
+elif data[:8] == b"\x89PNG\r\n\x1a\n":
+    width, height = int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+seed = zlib.crc32(data)
+line_h = 30
+lines = max(1, height // line_h)
+per_line = max(1, width // 90)
+tsv = "tsv" in args
+out = ["level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"] if tsv else []
+for line in range(lines):
+    x = 0
+    for i in range(per_line):
+        word = WORDS[(seed + line * 31 + i * 7) % len(WORDS)]
+        w = 12 * len(word)
+        if tsv:
+            out.append("5\t1\t1\t1\t%d\t%d\t%d\t%d\t%d\t20\t95\t%s" % (line + 1, i + 1, x, line * line_h, w, word))
+        else:
+            out.append("<span class='ocrx_word' title='bbox %d %d %d %d; x_wconf 95'>%s</span>"
+                       % (x, line * line_h, x + w, line * line_h + 20, word))
+        x += w + 12
+sys.stdout.write("\n".join(out) + "\n")
+'''
+
+
+def install_fake_tesseract(directory: str) -> str:
+    """
+    Writes an executable ``tesseract`` stand-in into ``directory`` and returns its path.
+    Prepend ``directory`` to PATH to use it; FAKE_TESSERACT_DELAY adds a per-call delay.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "tesseract")
+    with open(path, "w") as f:
+        f.write(FAKE_TESSERACT.replace("{python}", sys.executable).replace("{words!r}", repr(WORDS)))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+FAKE_REMBG = r'''#!{python}
+"""rembg stand-in for "rembg i - -": returns the input image unchanged."""
+import sys
+sys.stdout.buffer.write(sys.stdin.buffer.read())
+'''
+
+
+def install_fake_rembg(directory: str) -> str:
+    """Writes an executable ``rembg`` stand-in into ``directory`` and returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "rembg")
+    with open(path, "w") as f:
+        f.write(FAKE_REMBG.replace("{python}", sys.executable))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def content_digest(text: str) -> str:
+    """Short stable digest of generated output, for comparing runs."""
+    return hashlib.sha1(re.sub(r"\s+", " ", text).encode()).hexdigest()[:12]
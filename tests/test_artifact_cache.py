@@ -0,0 +1,73 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from imagecoderx import core, ocr
+from imagecoderx.engine.artifact_cache import ArtifactCache
+from imagecoderx.testing import FakeOllamaServer, install_fake_tesseract, synthetic_screenshot
+
+
+def test_round_trip_and_keys(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    key = cache.key("abc", "regions")
+    assert key != cache.key("abc", "regions", {"tile": 512}) != cache.key("abd", "regions")
+    cache.put(key, "array", np.arange(8.0).reshape(2, 4))
+    cache.put(cache.key("abc", "background"), "json", {"type": "solid", "color": "#FFFFFF"})
+    cache.put(cache.key("abc", "rembg", [0, 0, 4, 4]), "bytes", b"\x89PNG")
+    assert cache.get(key, "array").tolist() == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert cache.get(cache.key("abc", "background"), "json")["color"] == "#FFFFFF"
+    assert cache.get(cache.key("abc", "rembg", [0, 0, 4, 4]), "bytes") == b"\x89PNG"
+    assert cache.get(cache.key("abc", "ocr"), "json") is None
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=3500)
+    keys = [cache.key("img", "rembg", i) for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, "bytes", b"x" * 1000)
+        os.utime(cache._file(key, "bytes"), (1000 + age, 1000 + age))
+    assert cache.get(keys[0], "bytes")  # now the most recently used
+    cache.put(cache.key("img", "rembg", 3), "bytes", b"x" * 1000)
+    assert cache.evictions == 1 and cache.size <= 3500
+    assert cache.get(keys[0], "bytes") and cache.get(keys[1], "bytes") is None
+
+
+def test_warm_rerun_skips_cpu_stages(tmp_path, monkeypatch):
+    install_fake_tesseract(str(tmp_path / "bin"))
+    monkeypatch.setenv("PATH", str(tmp_path / "bin") + os.pathsep + os.environ["PATH"])
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    calls = []
+    detect, extract = core.detect_text_regions, ocr.extract_text_from_image
+    monkeypatch.setattr(core, "detect_text_regions", lambda img, *args: calls.append("detect") or detect(img, *args))
+    monkeypatch.setattr(ocr, "extract_text_from_image", lambda crop, *args: calls.append("ocr") or extract(crop, *args))
+    with FakeOllamaServer() as server:
+        (tmp_path / ".imagecoderx.json").write_text(json.dumps(
+            {"ollama_model": "fake", "ollama_host": server.url, "artifact_cache": str(tmp_path / "cache")}))
+        monkeypatch.setenv("HOME", str(tmp_path))
+        cold = core.convert_image_to_code(path, "html")
+        assert "detect" in calls and "ocr" in calls
+        calls.clear()
+        assert core.convert_image_to_code(path, "html") == cold
+        assert calls == []
+
+
+def test_get_cache_builds_one_cache_under_concurrent_first_calls(tmp_path, monkeypatch):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from imagecoderx.engine import artifact_cache
+
+    class SlowCache(ArtifactCache):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(artifact_cache, "ArtifactCache", SlowCache)
+    monkeypatch.setattr(artifact_cache, "_caches", {})
+    config = {"artifact_cache": {"path": str(tmp_path / "cache"), "max_bytes": 1 << 20}}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        caches = list(executor.map(lambda _: artifact_cache.get_cache(config), range(4)))
+    assert all(cache is caches[0] for cache in caches)
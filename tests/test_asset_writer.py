@@ -0,0 +1,71 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from imagecoderx.engine.asset_writer import AssetWriter, load_asset_manifest
+from imagecoderx.engine.html_orchestrator import combine_html_sections
+from imagecoderx.engine.regions import RegionSet
+
+
+def make_regions():
+    img = np.random.default_rng(0).integers(0, 255, size=(120, 200, 3), dtype=np.uint8)
+    regions = RegionSet.from_boxes([(0, 0, 0.5, 0.5), (0.5, 0.5, 0.5, 0.5)], image=img, type="logo")
+    return img, regions
+
+
+def test_writes_assets_and_manifest(tmp_path):
+    _, regions = make_regions()
+    with AssetWriter(str(tmp_path), compression=1) as writer:
+        for region in regions:
+            writer.submit(f"region_{region.index}_no_bg", region.crop, region=region, role="no_bg")
+            writer.submit(f"region_{region.index}_b", region.crop, region=region, role="inverted",
+                          transform=cv2.bitwise_not)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert [a["name"] for a in manifest["assets"]] == ["region_0_b", "region_0_no_bg", "region_1_b", "region_1_no_bg"]
+    inverted = cv2.imread(str(tmp_path / "region_0_b.png"))
+    assert np.array_equal(inverted, cv2.bitwise_not(regions[0].crop))
+    assert regions[0].filename == os.path.join(str(tmp_path), "region_0_no_bg.png")
+
+
+def test_in_memory_writer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _, regions = make_regions()
+    with AssetWriter(None) as writer:
+        for region in regions:
+            writer.submit(f"region_{region.index}_no_bg", region.crop, region=region, role="no_bg")
+    assert os.listdir(tmp_path) == []
+    assert sorted(writer.files) == ["region_0_no_bg.png", "region_1_no_bg.png"]
+    decoded = cv2.imdecode(np.frombuffer(writer.files["region_0_no_bg.png"], np.uint8), cv2.IMREAD_COLOR)
+    assert np.array_equal(decoded, regions[0].crop)
+    assert [a["bytes"] for a in writer.manifest["assets"]] == [len(writer.files[a["file"]]) for a in writer.manifest["assets"]]
+    assert regions[0].filename == "region_0_no_bg.png"
+
+
+def test_unchanged_assets_are_skipped(tmp_path):
+    _, regions = make_regions()
+    for expected_written in (2, 0):
+        writer = AssetWriter(str(tmp_path))
+        for region in regions:
+            writer.submit(f"region_{region.index}_no_bg", region.crop, region=region, role="no_bg")
+        writer.close()
+        assert writer.written == expected_written
+        assert writer.skipped == 2 - expected_written
+
+
+def test_webp_output(tmp_path):
+    img, _ = make_regions()
+    with AssetWriter(str(tmp_path), format="webp", quality=80) as writer:
+        writer.submit("page", img)
+    assert (tmp_path / "page.webp").exists()
+
+
+def test_manifest_feeds_combine_html_sections(tmp_path):
+    _, regions = make_regions()
+    with AssetWriter(str(tmp_path)) as writer:
+        writer.submit("region_0_no_bg", regions[0].crop, region=regions[0], role="no_bg")
+    assets = load_asset_manifest(str(tmp_path / "manifest.json"), base_url="page_objects")
+    assert [r.filename for r in assets] == ["page_objects/region_0_no_bg.png"]
+    html = combine_html_sections(RegionSet(), assets=assets)
+    assert 'src="page_objects/region_0_no_bg.png"' in html
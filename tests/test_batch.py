@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+from imagecoderx import batch, core
+from imagecoderx.testing import FakeRedisServer
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue_url(request, tmp_path):
+    if request.param == "sqlite":
+        yield f"sqlite:///{tmp_path / 'queue.db'}"
+    else:
+        with FakeRedisServer() as server:
+            yield server.url("test")
+
+
+def test_put_lease_complete(queue_url):
+    queue = batch.open_queue(queue_url)
+    assert queue.put("a", {"n": 1}) and not queue.put("a", {"n": 2})
+    lease = queue.lease("w1", 60)
+    assert (lease.job_id, lease.payload, lease.attempts) == ("a", {"n": 1}, 1)
+    assert queue.lease("w2", 60) is None
+    assert queue.extend(lease, 60)
+    assert queue.complete(lease, {"ok": True})
+    [job] = queue.jobs()
+    assert (job["state"], job["worker"], job["result"]) == ("done", "w1", {"ok": True})
+    queue.close()
+
+
+def test_failed_jobs_are_retried_then_given_up(queue_url):
+    queue = batch.open_queue(queue_url, max_attempts=2, retry_delay=0)
+    queue.put("a", {})
+    assert queue.fail(queue.lease("w", 60), "boom")
+    lease = queue.lease("w", 60)
+    assert lease.attempts == 2
+    queue.fail(lease, "boom again")
+    assert queue.lease("w", 60) is None
+    [job] = queue.jobs()
+    assert (job["state"], job["error"]) == ("failed", "boom again")
+
+
+def test_expired_lease_is_taken_over(queue_url):
+    queue = batch.open_queue(queue_url)
+    queue.put("a", {})
+    stale = queue.lease("w1", 0.01)
+    time.sleep(0.03)
+    fresh = queue.lease("w2", 60)
+    assert fresh.job_id == "a" and fresh.attempts == 2
+    assert not queue.complete(stale, {}) and not queue.extend(stale, 60)
+    assert queue.complete(fresh, {})
+
+
+def test_worker_dying_mid_claim_does_not_lose_the_job():
+    with FakeRedisServer() as server:
+        queue = batch.open_queue(server.url("test"), claim_grace=0.05)
+        queue.put("a", {})
+        execute = queue._conn.execute
+
+        def die_after_claim(*args):
+            if args[0] == "HINCRBY":
+                # The id was moved to processing; the worker dies before recording its lease
+                raise ConnectionError("worker killed")
+            return execute(*args)
+
+        queue._conn.execute = die_after_claim
+        with pytest.raises(ConnectionError):
+            queue.lease("w1", 60)
+        queue._conn.execute = execute
+        # Another worker gives the orphaned claim its grace lease, then takes the job over
+        assert queue.lease("w2", 60) is None
+        time.sleep(0.1)
+        lease = queue.lease("w2", 60)
+        assert lease.job_id == "a" and lease.attempts == 1
+        assert queue.complete(lease, {})
+        assert server.data["test:processing"] == [] and queue.lease("w3", 60) is None
+        queue.close()
+
+
+def test_workers_drain_queue_and_report(queue_url, tmp_path, monkeypatch):
+    # The deadline reads the config; keep it away from the developer's ~/.imagecoderx.json
+    monkeypatch.setenv("HOME", str(tmp_path))
+    calls = []
+
+    def convert_file(image_path, output_path, output_formats, save_backgrounds=False, deadline=None, store=None):
+        calls.append(image_path)
+        deadline.degrade("final_llm", "test")
+        return {fmt: f"{fmt} for {image_path}" for fmt in output_formats}
+
+    monkeypatch.setattr(core, "convert_file", convert_file)
+    images = []
+    for i in range(4):
+        path = tmp_path / f"shot{i}.png"
+        path.write_bytes(b"image %d" % i)
+        images.append(str(path))
+    queue = batch.open_queue(queue_url)
+    assert batch.enqueue(queue, images + images[:1], str(tmp_path / "out"), ["html", "dart"], deadline=30) == 4
+    assert batch.run_worker(queue, "w1", max_jobs=2) == 2
+    assert batch.run_worker(batch.open_queue(queue_url), "w2") == 2
+    assert len(calls) == 4
+
+    job = next(queue.jobs())
+    paths = job["result"]["outputs"]
+    assert [d["stage"] for d in job["result"]["degradations"]] == ["final_llm"]
+    with open(paths["dart"]) as f:
+        assert f.read().startswith("dart for")
+    # Outputs already on disk are reused instead of converted again
+    assert batch.process_job({"image": images[0], "formats": ["html", "dart"],
+                              "output_dir": str(tmp_path / "out" / job["id"])})["reused"]
+
+    report = batch.throughput_report(queue)
+    assert report["jobs"] == 4 and report["states"] == {"done": 4}
+    assert report["workers"] == {"w1": 2, "w2": 2} and report["retries"] == 0
+
+
+def test_incomplete_backend_fails_on_construction():
+    class NoJobs(batch.JobQueue):
+        def put(self, job_id, payload):
+            return True
+
+    with pytest.raises(TypeError):
+        NoJobs()
+
+
+def test_enqueue_cli_accepts_format_aliases(tmp_path, monkeypatch):
+    image = tmp_path / "shot.png"
+    image.write_bytes(b"not decoded at enqueue time")
+    url = f"sqlite:///{tmp_path / 'queue.db'}"
+    monkeypatch.setattr("sys.argv", ["imagecoderx-batch", "enqueue", url, str(image), "--out", "typescript,flutter"])
+    batch.main()
+    queue = batch.open_queue(url)
+    lease = queue.lease("w", 60)
+    assert lease.payload["formats"] == ["tsx", "dart"]
+    queue.close()
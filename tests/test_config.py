@@ -0,0 +1,34 @@
+import json
+
+from imagecoderx.config import DEFAULTS, PRESETS, load_config, validate_config
+
+
+def test_preset_file_values_and_validation(tmp_path, capsys):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"preset": "fast", "region_kernel": 9, "kmeans_attempts": "many", "shiny": 1}))
+    config = load_config(str(path))
+    assert config["preset"] == "fast" and config["final_refinement"] is False
+    # The file beats the preset; invalid values fall back to it; unknown keys are kept
+    assert config["region_kernel"] == 9
+    assert config["kmeans_attempts"] == PRESETS["fast"]["kmeans_attempts"]
+    assert config["shiny"] == 1
+    out = capsys.readouterr().out
+    assert "kmeans_attempts" in out and "'shiny'" in out
+    errors = validate_config({"preset": "fastest", "region_kernel": True, "fastpath_min_confidence": 2,
+                              "ocr_mode": "page", "artifact_cache": {"path": "x"}})
+    assert set(errors) == {"preset", "region_kernel", "fastpath_min_confidence"}
+    assert validate_config(PRESETS["quality"]) == {}
+    bad = tmp_path / "bad.json"
+    bad.write_text("[1, 2]")
+    assert load_config(str(bad))["preset"] == "balanced"
+
+
+def test_config_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    first = load_config()
+    assert json.loads((tmp_path / ".imagecoderx.json").read_text())["preset"] == "balanced"
+    assert first == {**DEFAULTS, **PRESETS["balanced"], "preset": "balanced"}
+    assert load_config() is first
+    (tmp_path / ".imagecoderx.json").write_text(json.dumps({"preset": "quality", "ollama_model": "other"}))
+    second = load_config()
+    assert second is not first and second["ollama_model"] == "other" and second["fastpath"] is False
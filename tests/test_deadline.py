@@ -0,0 +1,48 @@
+import json
+import os
+import time
+
+import cv2
+
+from imagecoderx import core
+from imagecoderx.engine.deadline import Deadline, importance
+from imagecoderx.engine.regions import Region
+from imagecoderx.testing import FakeOllamaServer, install_fake_tesseract, synthetic_screenshot
+
+
+def test_importance_prefers_large_regions_near_the_top():
+    header = Region((0.0, 0.0, 1.0, 0.1))
+    footer = Region((0.0, 0.9, 1.0, 0.1))
+    button = Region((0.0, 0.0, 0.1, 0.05))
+    assert importance(header) > importance(footer) > importance(button)
+
+
+def test_deadline_budget_and_record():
+    deadline = Deadline(10, {"llm": 4.0})
+    assert deadline.allows("llm", count=2) and not deadline.allows("llm", count=3)
+    assert not deadline.allows("final_llm", reserve=5)
+    deadline.observe("llm", 0.5)
+    assert deadline.allows("llm", count=19)
+    deadline.degrade("region_llm", "late", region=3)
+    deadline.degrade("final_llm", "late")
+    assert deadline.summary() == {"region_llm": 1, "final_llm": 1}
+    assert deadline.degradations[0]["region"] == 3
+
+
+def test_pipeline_meets_deadline_by_degrading(tmp_path, monkeypatch):
+    install_fake_tesseract(str(tmp_path / "bin"))
+    monkeypatch.setenv("PATH", str(tmp_path / "bin") + os.pathsep + os.environ["PATH"])
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    with FakeOllamaServer(latency=2.0) as server:
+        (tmp_path / ".imagecoderx.json").write_text(json.dumps(
+            {"ollama_model": "fake", "ollama_host": server.url, "fastpath": False,
+             "llm_concurrency": {"initial_limit": 2, "max_limit": 2}}))
+        monkeypatch.setenv("HOME", str(tmp_path))
+        deadline = Deadline(1.0, {"llm": 0.4})
+        start = time.perf_counter()
+        code = core.convert_image_to_formats(path, ["html"], deadline=deadline)["html"]
+        assert time.perf_counter() - start < 1.8
+    summary = deadline.summary()
+    assert summary["final_llm"] == 1 and summary["region_llm"] >= 1
+    assert "element-section" in code
@@ -0,0 +1,56 @@
+from imagecoderx.engine.emitters import emit, emit_dart, emit_html, emit_jsx, emit_tsx
+from imagecoderx.engine.html_orchestrator import combine_html_sections
+from imagecoderx.engine.page_ir import build_page_ir, parse_style
+from imagecoderx.engine.regions import RegionSet
+
+import pytest
+
+
+@pytest.fixture
+def page():
+    regions = RegionSet.from_boxes([(0.1, 0.1, 0.3, 0.1), (0.5, 0.5, 0.2, 0.2)])
+    regions[0].code = '<body><h1 style="font-size:28px; color:#222">Hi {name}</h1><p class="lead">A <b>b</b><br>c</p></body>'
+    regions[1].code = ('<body><style>.lead{color:red}</style><label for="e">Email</label>'
+                       '<input placeholder="you" onclick="x()"><img src="logo.png"></body>')
+    return build_page_ir(combine_html_sections(regions))
+
+
+def test_parse_style():
+    assert parse_style("left: 10%; color:#fff;;bad") == {"left": "10%", "color": "#fff"}
+
+
+def test_page_ir_keeps_every_snippet_child(page):
+    sections = [c for c in page.body.children if not isinstance(c, str)]
+    assert [child.tag for child in sections[0].children if not isinstance(child, str)] == ["h1", "p"]
+    assert ".lead{color:red}" in page.css
+
+
+def test_html_round_trip(page):
+    code = emit_html(page)
+    assert code.startswith("<!DOCTYPE html>")
+    assert "".join(build_page_ir(code).body.text().split()) == "".join(page.body.text().split())
+
+
+def test_jsx_rewrites_attributes(page):
+    code = emit_jsx(page)
+    assert 'className="lead"' in code and 'htmlFor="e"' in code
+    assert "style={{ fontSize: '28px', color: '#222' }}" in code
+    assert '<img src="logo.png" />' in code and "<br />" in code
+    assert "onclick" not in code
+    assert "Hi &#123;name&#125;" in code
+    assert "React.FC" in emit_tsx(page) and "React.FC" not in code
+
+
+def test_dart_widget_tree(page):
+    code = emit_dart(page)
+    assert code.count("Positioned(") == 2
+    assert "left: constraints.maxWidth * 0.1" in code
+    assert "TextStyle(fontSize: 28, fontWeight: FontWeight.bold, color: Color(0xFF222222))" in code
+    assert "Image.asset('logo.png')" in code
+    assert "InputDecoration(hintText: 'you')" in code
+    assert code.count("(") == code.count(")") and code.count("[") == code.count("]")
+
+
+def test_emit_rejects_unknown_format(page):
+    with pytest.raises(ValueError):
+        emit(page, "svelte")
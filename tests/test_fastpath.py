@@ -0,0 +1,56 @@
+import numpy as np
+
+from imagecoderx.engine import fastpath
+from imagecoderx.engine.regions import RegionSet
+
+
+def make_region(words, box=(0.1, 0.1, 0.3, 0.05), crop_color=(255, 255, 255)):
+    image = np.full((400, 600, 3), 255, np.uint8)
+    regions = RegionSet(image=image)
+    region = regions.add(box)
+    region.crop[:] = crop_color
+    region.crop[5:10, 5:20] = (30, 30, 30)
+    region.char_boxes = [dict(char=w, x1=x1, y1=y1, x2=x1 + 40, y2=y1 + 12, conf=95) for w, x1, y1 in words]
+    region.text = "".join(w for w, _, _ in words)
+    return region
+
+
+def test_text_lines_groups_boxes_by_row():
+    region = make_region([("world", 50, 0), ("Hello", 0, 1), ("again", 0, 20)])
+    assert fastpath.text_lines(region) == ["Hello world", "again"]
+
+
+def test_character_boxes_keep_words_together():
+    region = make_region([])
+    region.char_boxes = [dict(char=c, x1=x, y1=0, x2=x + 8, y2=12) for c, x in zip("Signin", (0, 9, 18, 27, 45, 54))]
+    assert fastpath.text_lines(region) == ["Sign in"]
+    assert ">Sign in</" in fastpath.generate_snippet(region, "html", 400)[0]
+
+
+def test_crop_colors_separates_background_and_ink():
+    region = make_region([("Save", 0, 0)], crop_color=(200, 100, 0))
+    background, text = fastpath.crop_colors(region.crop)
+    assert background == "#0064c8"
+    assert text == "#1e1e1e"
+
+
+def test_button_snippet_in_every_format():
+    region = make_region([("Save", 0, 0)], crop_color=(200, 100, 0))
+    code, confidence = fastpath.generate_snippet(region, "html", 400)
+    assert code.startswith("<body><button") and ">Save</button>" in code
+    assert confidence > 0.9
+    assert fastpath.generate_snippet(region, "tsx", 400)[0].startswith("<button style={{ fontSize:")
+    assert fastpath.generate_snippet(region, "dart", 400)[0].startswith("ElevatedButton(")
+
+
+def test_code_like_text_has_low_confidence():
+    region = make_region([("if", 0, 0), ("(x)", 40, 0), ("{", 80, 0), ("y=1;", 120, 0), ("}", 160, 0)])
+    _, confidence = fastpath.generate_snippet(region, "html", 400)
+    assert confidence < 0.75
+
+
+def test_low_ocr_confidence_lowers_score():
+    region = make_region([("Save", 0, 0)], crop_color=(200, 100, 0))
+    sure = fastpath.generate_snippet(region, "html", 400)[1]
+    region.ocr_confidence = 40.0
+    assert fastpath.generate_snippet(region, "html", 400)[1] < sure / 2
@@ -0,0 +1,62 @@
+import os
+import threading
+
+import cv2
+import pytest
+
+from imagecoderx import governor
+from imagecoderx.governor import ResourceGovernor
+
+
+@pytest.fixture
+def restore_threads(monkeypatch):
+    monkeypatch.setenv("OMP_THREAD_LIMIT", "")
+    monkeypatch.setenv("OMP_NUM_THREADS", "")
+    threads = cv2.getNumThreads()
+    affinity = os.sched_getaffinity(0)
+    yield
+    cv2.setNumThreads(threads)
+    governor._set_process_affinity(affinity)
+    governor._current = governor._options = None
+
+
+def test_presets_split_cores_between_workers():
+    cores = list(range(8))
+    latency = ResourceGovernor("latency", cores=cores)
+    assert latency.cores == cores and latency.cv2_threads == 8 and latency.cpu_workers == 0
+    third = ResourceGovernor("throughput", workers=4, worker_index=2, cores=cores)
+    assert third.cores == [4, 5] and third.cv2_threads == third.omp_threads == 1 and third.cpu_workers == 2
+    staged = ResourceGovernor("throughput", cores=cores, stage_cores={"ocr": [0, 1], "rembg": [7]})
+    assert staged.stage_cores == {"ocr": [0, 1], "rembg": [7]}
+    with pytest.raises(ValueError):
+        ResourceGovernor("fastest")
+
+
+def test_configure_applies_budgets_once(restore_threads):
+    assert governor.configure({}) is None
+    resources = governor.configure({"resources": {"preset": "throughput", "cv2_threads": 1}})
+    assert governor.configure({"resources": {"preset": "throughput", "cv2_threads": 1}}) is resources
+    assert cv2.getNumThreads() == 1 and os.environ["OMP_THREAD_LIMIT"] == "1"
+    assert governor.current() is resources
+
+
+def test_pinned_restores_affinity(restore_threads):
+    cores = sorted(os.sched_getaffinity(0))
+    resources = ResourceGovernor("throughput", cores=cores, stage_cores={"ocr": [0]})
+    with resources.pinned("ocr"):
+        assert os.sched_getaffinity(0) == {cores[0]}
+    assert sorted(os.sched_getaffinity(0)) == cores
+
+
+def test_apply_pins_existing_threads(restore_threads):
+    cores = sorted(os.sched_getaffinity(0))
+    started, done = threading.Event(), threading.Event()
+    thread = threading.Thread(target=lambda: (started.set(), done.wait()))
+    thread.start()
+    started.wait()
+    try:
+        ResourceGovernor("throughput", cores=cores[:1]).apply()
+        assert os.sched_getaffinity(thread.native_id) == {cores[0]}
+    finally:
+        done.set()
+        thread.join()
@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from imagecoderx.limiter import AdaptiveLimiter
+
+
+def run_calls(limiter, calls, work, threads=16):
+    def call(_):
+        with limiter.slot():
+            work()
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(call, range(calls)))
+
+
+def test_limit_grows_while_latency_is_flat():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=12)
+    run_calls(limiter, 150, lambda: time.sleep(0.01))
+    assert limiter.limit > 6
+    assert limiter.stats()["inflight"] == 0 and limiter.stats()["completed"] == 150
+
+
+def test_limit_backs_off_when_server_queues():
+    server_slots = threading.Semaphore(2)
+
+    def server():
+        with server_slots:
+            time.sleep(0.01)
+
+    limiter = AdaptiveLimiter(initial_limit=12, max_limit=16)
+    run_calls(limiter, 150, server)
+    assert limiter.limit <= 4
+
+
+def test_errors_shrink_limit():
+    limiter = AdaptiveLimiter(initial_limit=8, backoff=0.5)
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            raise RuntimeError("server error")
+    assert limiter.limit == 4 and limiter.errors == 1
+
+
+def test_queue_depth_is_exposed():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    release = threading.Event()
+
+    def hold():
+        with limiter.slot():
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while limiter.queue_depth < 2 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert (limiter.inflight, limiter.queue_depth) == (1, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert (limiter.inflight, limiter.queue_depth) == (0, 0)
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from imagecoderx.llm_pool import CLOSED, OPEN, EndpointPool
+from imagecoderx.testing import FakeOllamaServer
+
+MESSAGES = [{"role": "user", "content": "convert: Hello"}]
+
+
+@pytest.fixture
+def servers():
+    with FakeOllamaServer() as a, FakeOllamaServer() as b, FakeOllamaServer() as c:
+        yield [a, b, c]
+
+
+def test_least_outstanding_spreads_concurrent_requests(servers):
+    for server in servers:
+        server.latency = 0.05
+    with EndpointPool([s.url for s in servers]) as pool:
+        with ThreadPoolExecutor(6) as executor:
+            list(executor.map(lambda _: pool.chat(model="fake", messages=MESSAGES), range(6)))
+        assert [len(s.requests) for s in servers] == [2, 2, 2]
+        assert all(e["outstanding"] == 0 for e in pool.stats()["endpoints"])
+
+
+def test_circuit_opens_on_failures_and_fails_over(servers):
+    servers[0].stop()
+    with EndpointPool([s.url for s in servers[:2]], failure_threshold=1, reset_timeout=60) as pool:
+        for _ in range(3):
+            assert pool.chat(model="fake", messages=MESSAGES).message.content
+        down, up = pool.endpoints
+        assert down.state == OPEN and down.errors == 1 and down.requests == 1
+        assert up.state == CLOSED and len(servers[1].requests) == 3
+        assert pool.check_health() == {down.host: False, up.host: True}
+
+
+def test_all_endpoints_down_raises(servers):
+    servers[0].stop()
+    with EndpointPool([servers[0].url]) as pool:
+        with pytest.raises(Exception):
+            pool.chat(model="fake", messages=MESSAGES)
+
+
+def test_slow_request_is_hedged(servers):
+    slow, fast = servers[:2]
+    slow.latency = 1.0
+    with EndpointPool([slow.url, fast.url], hedge_min_samples=5) as pool:
+        # Known latencies: the slow server looks fastest, p95 is 10 ms
+        for endpoint, latency in zip(pool.endpoints, (0.005, 0.01)):
+            for _ in range(5):
+                pool.record(endpoint, latency, True)
+        start = time.perf_counter()
+        response = pool.chat(model="fake", messages=MESSAGES)
+        assert time.perf_counter() - start < 0.5
+        assert response.message.content
+        stats = pool.stats()
+        assert stats["hedges"] == 1 and stats["endpoints"][1]["hedges"] == 1
+
+
+def test_llm_uses_pool_from_config(servers, tmp_path, monkeypatch):
+    import json
+    from imagecoderx import llm
+
+    (tmp_path / ".imagecoderx.json").write_text(json.dumps({
+        "ollama_model": "fake",
+        "ollama_hosts": [s.url for s in servers],
+        "ollama_pool": {"health_interval": 60},
+    }))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    for _ in range(3):
+        assert "Hello" in llm.process_text_with_llm("shot.png", "Hello", [], "html")
+    assert sum(len(s.requests) for s in servers) == 3
+
+
+def test_get_pool_builds_one_pool_under_concurrent_first_calls(monkeypatch):
+    from imagecoderx import llm_pool
+
+    built = []
+
+    class SlowPool:
+        def __init__(self, hosts, **options):
+            time.sleep(0.05)
+            built.append(self)
+
+        def start_health_checks(self):
+            pass
+
+    monkeypatch.setattr(llm_pool, "EndpointPool", SlowPool)
+    monkeypatch.setattr(llm_pool, "_pools", {})
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pools = list(executor.map(lambda _: llm_pool.get_pool(["http://a", "http://b"]), range(4)))
+    assert len(built) == 1 and all(pool is built[0] for pool in pools)
+
+
+def test_queued_requests_are_not_hedged(servers):
+    a, b = servers[:2]
+    with EndpointPool([a.url, b.url], hedge_min_samples=5, max_hedge_ratio=1.0) as pool:
+        # p95 is 100 ms; each request takes 20 ms, but most wait for one of the 8 pool threads
+        for endpoint in pool.endpoints:
+            for _ in range(5):
+                pool.record(endpoint, 0.1, True)
+        a.latency = b.latency = 0.02
+        with ThreadPoolExecutor(64) as executor:
+            list(executor.map(lambda _: pool.chat(model="fake", messages=MESSAGES), range(64)))
+        assert pool.stats()["hedges"] == 0
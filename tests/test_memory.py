@@ -0,0 +1,54 @@
+"""
+Memory regression guards: peak traced allocations (tracemalloc) of the image
+stages, relative to the size of the decoded screenshot.
+"""
+import json
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+from imagecoderx import core, llm, ocr
+from imagecoderx.algorithms import color_analysis
+
+
+@pytest.fixture
+def screenshot(tmp_path):
+    img = np.full((1080, 1920, 3), 240, np.uint8)
+    for i in range(30):
+        cv2.putText(img, f"Label number {i}", (50 + (i % 3) * 600, 40 + (i // 3) * 90),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (20, 20, 20), 2)
+    path = tmp_path / "shot.png"
+    cv2.imwrite(str(path), img)
+    return str(path), img
+
+
+def peak_ratio(func, nbytes):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / nbytes
+    finally:
+        tracemalloc.stop()
+
+
+def test_background_style_does_not_copy_image(screenshot):
+    _, img = screenshot
+    assert peak_ratio(lambda: color_analysis.detect_background_style(img), img.nbytes) < 0.05
+
+
+def test_convert_peak_memory(screenshot, tmp_path, monkeypatch):
+    path, img = screenshot
+    # A pinned config instead of the developer's ~/.imagecoderx.json (no cache, no resource preset)
+    home = tmp_path / "home"
+    home.mkdir()
+    (home / ".imagecoderx.json").write_text(json.dumps({"ollama_model": "fake", "preset": "balanced"}))
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setattr(ocr, "extract_text_from_image", lambda image, options=(): ("", []))
+    monkeypatch.setattr(llm, "process_text_with_llm", lambda *args, **kwargs: "<p>x</p>")
+    monkeypatch.setattr(llm, "process_final_html", lambda html: html)
+    # A first run outside the measurement, so one-time imports and caches are not counted
+    core.convert_image_to_code(path, "html")
+    # One decoded image plus one single-channel working buffer for region detection
+    assert peak_ratio(lambda: core.convert_image_to_code(path, "html"), img.nbytes) < 1.8
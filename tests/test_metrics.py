@@ -0,0 +1,68 @@
+import threading
+import urllib.request
+
+from imagecoderx import batch
+from imagecoderx.metrics import Registry, start_http_server
+
+
+def test_counters_and_histograms_sum_over_threads():
+    registry = Registry()
+    jobs = registry.counter("jobs", "Jobs", ("result",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            jobs.labels("done").inc()
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latency.observe(5)
+    assert jobs.value("done") == 4000
+    text = registry.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{result="done"} 4000' in text
+    assert 'latency_seconds_bucket{le="0.1"} 4' in text
+    assert 'latency_seconds_bucket{le="1"} 8' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 9' in text
+    assert "latency_seconds_count 9" in text
+    # Cells of finished threads were folded in; the totals do not change
+    assert registry.render() == text
+    assert registry.render(openmetrics=True).endswith("# TYPE latency_seconds histogram\n"
+                                                      + "\n".join(text.splitlines()[-5:]) + "\n# EOF\n")
+
+
+def test_http_endpoint_and_textfile(tmp_path):
+    registry = Registry()
+    registry.counter("images", "Images").inc(3)
+    server = start_http_server(0, "127.0.0.1", registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "images_total 3" in response.read().decode()
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text"})
+        with urllib.request.urlopen(request) as response:
+            body = response.read().decode()
+            assert "# TYPE images counter" in body and body.endswith("# EOF\n")
+    finally:
+        server.shutdown()
+        server.server_close()
+    path = tmp_path / "imagecoderx.prom"
+    registry.write_textfile(str(path))
+    assert "images_total 3" in path.read_text()
+
+
+def test_worker_writes_textfile(tmp_path):
+    queue = batch.open_queue(f"sqlite:///{tmp_path / 'queue.db'}")
+    queue.put("a", {})
+    path = tmp_path / "worker.prom"
+    before = batch.JOBS.value("done")
+    assert batch.run_worker(queue, "w", handler=lambda payload: {"reused": False}, metrics_file=str(path)) == 1
+    assert batch.JOBS.value("done") == before + 1
+    assert 'imagecoderx_batch_jobs_total{result="done"}' in path.read_text()
+    queue.close()
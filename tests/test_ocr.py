@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+from imagecoderx import ocr
+from imagecoderx.testing import install_fake_tesseract
+
+TSV = "\n".join([
+    "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext",
+    "4\t1\t1\t1\t1\t0\t10\t10\t200\t20\t-1\t",
+    "5\t1\t1\t1\t1\t1\t10\t10\t50\t20\t96\tHello",
+    "5\t1\t1\t1\t1\t2\t70\t10\t60\t20\t95\tworld",
+    "5\t1\t1\t1\t2\t1\t10\t40\t40\t20\t90\tnext",
+    "5\t1\t2\t1\t1\t1\t300\t300\t40\t20\t90\tfar",
+    "5\t1\t2\t1\t1\t2\t350\t300\t40\t20\t90\t ",
+])
+
+
+def test_parse_tsv_keeps_words_only():
+    words = ocr.parse_tsv(TSV, dx=5, line_base=10)
+    assert words["text"].tolist() == ["Hello", "world", "next", "far"]
+    assert words["line"].tolist() == [10, 10, 11, 12]
+    assert words["x1"][0] == 15
+
+
+def test_page_text_joins_words_to_regions():
+    words = ocr.parse_tsv(TSV)
+    # Region 1 sits inside region 0; "world" belongs to the smaller one only
+    page = ocr.PageText(words, [(0, 0, 250, 100), (60, 0, 140, 35), (500, 500, 600, 600)])
+    text, _, confidence = page.region_text(0)
+    assert text == "Hello\nnext" and confidence == pytest.approx(93)
+    text, boxes, confidence = page.region_text(1)
+    assert text == "world" and confidence == pytest.approx(95)
+    assert boxes == [{"char": "world", "x1": 10, "y1": 10, "x2": 70, "y2": 30}]
+    assert page.region_text(2) == ("", [], None)
+
+
+@pytest.fixture
+def fake_tesseract(tmp_path, monkeypatch):
+    install_fake_tesseract(str(tmp_path))
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+
+
+def test_tiled_extraction_does_not_duplicate_words(fake_tesseract):
+    img = np.zeros((300, 900, 3), dtype=np.uint8)
+    words = ocr.extract_words(img, tile_size=400, overlap=80)
+    centers = set(zip(((words["x1"] + words["x2"]) // 2).tolist(), ((words["y1"] + words["y2"]) // 2).tolist()))
+    assert len(words) > 0
+    assert len(centers) == len(words)
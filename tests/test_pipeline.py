@@ -0,0 +1,160 @@
+import io
+import json
+import os
+import sys
+import tarfile
+
+import cv2
+import pytest
+
+from imagecoderx import core, metrics
+from imagecoderx.engine.progressive import ProgressiveDocument
+from imagecoderx.testing import FakeOllamaServer, default_responder, install_fake_rembg, install_fake_tesseract, synthetic_screenshot
+
+
+@pytest.fixture
+def fake_services(tmp_path, monkeypatch):
+    with FakeOllamaServer() as server:
+        home = tmp_path / "home"
+        home.mkdir()
+        (home / ".imagecoderx.json").write_text(json.dumps({"ollama_model": "fake", "ollama_host": server.url, "fastpath": False}))
+        monkeypatch.setenv("HOME", str(home))
+        install_fake_tesseract(str(tmp_path / "bin"))
+        monkeypatch.setenv("PATH", str(tmp_path / "bin") + os.pathsep + os.environ["PATH"])
+        yield server
+
+
+def test_convert_image_to_code_end_to_end(tmp_path, fake_services):
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    timings = {}
+    images = metrics.IMAGES.value()
+    llm_requests = metrics.LLM_SECONDS.labels("fake").count()
+    code = core.convert_image_to_code(path, "html", timings=timings)
+    region_requests = [r for r in fake_services.requests if not r["messages"][-1]["content"].startswith("improve")]
+    assert region_requests, "expected one LLM request per detected region"
+    assert all(r["model"] == "fake" for r in fake_services.requests)
+    assert "element-section" in code
+    assert {"detect", "ocr", "llm", "combine", "final_llm", "total"} <= set(timings)
+    assert metrics.IMAGES.value() == images + 1
+    assert metrics.LLM_SECONDS.labels("fake").count() == llm_requests + len(fake_services.requests)
+
+
+def test_fastpath_skips_llm_for_simple_regions(tmp_path, fake_services):
+    config = tmp_path / "home" / ".imagecoderx.json"
+    config.write_text(json.dumps({"ollama_model": "fake", "ollama_host": fake_services.url}))
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    code = core.convert_image_to_code(path, "html")
+    region_requests = [r for r in fake_services.requests if not r["messages"][-1]["content"].startswith("improve")]
+    assert region_requests == []
+    assert "element-section" in code
+
+
+def test_all_formats_from_one_run(tmp_path, fake_services):
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    core.convert_image_to_code(path, "html")
+    single_run = len(fake_services.requests)
+    outputs = core.convert_image_to_formats(path, ["html", "tsx", "jsx", "dart"])
+    assert len(fake_services.requests) == 2 * single_run
+    assert set(outputs) == {"html", "tsx", "jsx", "dart"}
+    assert "className=\"element-section\"" in outputs["jsx"]
+    assert "Positioned(" in outputs["dart"]
+
+
+def test_progressive_draft_then_updates(tmp_path, fake_services):
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    events = []
+    progress = ProgressiveDocument(str(tmp_path / "shot.html"))
+
+    def record(event):
+        # The document on disk is always a complete page
+        with open(progress.path, encoding="utf-8") as f:
+            assert f.read().rstrip().endswith("</html>")
+        events.append(event)
+
+    progress.events = record
+    code = core.convert_image_to_formats(path, ["html"], progress=progress)["html"]
+    region_requests = [r for r in fake_services.requests if not r["messages"][-1]["content"].startswith("improve")]
+    assert events[0]["event"] == "draft" and events[0]["regions"] >= len(region_requests)
+    assert [e["event"] for e in events[1:]] == ["region"] * len(region_requests)
+    assert "body { background" in open(progress.path, encoding="utf-8").read()
+    progress.finish(code)
+    assert events[-1]["event"] == "final" and open(progress.path, encoding="utf-8").read() == code
+
+
+def test_ocr_in_worker_processes_matches_in_process(tmp_path, fake_services):
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    expected = core.convert_image_to_code(path, "html")
+    config = tmp_path / "home" / ".imagecoderx.json"
+    config.write_text(json.dumps({**json.loads(config.read_text()), "cpu_workers": 2}))
+    assert core.convert_image_to_code(path, "html") == expected
+
+
+def test_bytes_in_results_to_stdout(tmp_path, fake_services, monkeypatch):
+    install_fake_rembg(str(tmp_path / "bin"))
+    work = tmp_path / "work"
+    work.mkdir()
+    monkeypatch.chdir(work)
+    data = cv2.imencode(".png", synthetic_screenshot(640, 400, regions=4, words_per_region=3))[1].tobytes()
+    assets = {}
+    outputs = core.convert_bytes(data, ["html", "tsx"], assets)
+    manifest = json.loads(assets["manifest.json"])
+    assert manifest["assets"] and set(assets) == {"manifest.json"} | {asset["file"] for asset in manifest["assets"]}
+    assert "element-section" in outputs["html"] and outputs["tsx"]
+
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+    monkeypatch.setattr(sys, "stdout", stdout)
+    monkeypatch.setattr(sys, "argv", ["imagecoderx", "-", "--assets", "tar"])
+    core.main()
+    with tarfile.open(fileobj=io.BytesIO(stdout.buffer.getvalue())) as tar:
+        assert set(tar.getnames()) == {"page.html"} | set(assets)
+        assert tar.extractfile("page.html").read().decode() == outputs["html"]
+    # Nothing was written next to the input or in the working directory
+    assert os.listdir(work) == []
+
+
+def test_fast_preset_skips_objects_and_final_pass(tmp_path, fake_services):
+    config = tmp_path / "home" / ".imagecoderx.json"
+    config.write_text(json.dumps({**json.loads(config.read_text()), "preset": "fast"}))
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    outputs = core.convert_file(path, str(tmp_path / "shot.html"), ["html"])
+    # Without the final pass the page is the combined sections, with the detected background
+    assert "element-section" in outputs["html"] and "body { background" in outputs["html"]
+    assert not any(r["messages"][-1]["content"].startswith("improve") for r in fake_services.requests)
+    assert not os.path.exists(tmp_path / "shot_objects")
+
+
+def test_progressive_draft_removed_without_html_output(tmp_path, fake_services, monkeypatch):
+    config = tmp_path / "home" / ".imagecoderx.json"
+    config.write_text(json.dumps({**json.loads(config.read_text()), "preset": "fast"}))
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    monkeypatch.setattr(sys, "argv", ["imagecoderx", path, "--out", "typescript", "--progressive"])
+    core.main()
+    assert os.path.exists(tmp_path / "shot.tsx")
+    assert not os.path.exists(tmp_path / "shot.html")
+
+
+def test_html_output_keeps_head_content_and_scripts(tmp_path, fake_services):
+    def responder(request):
+        content = request["messages"][-1]["content"]
+        head, _, page = content.partition(": ")
+        if head.startswith("improve this code"):
+            page = page.replace("</head>", '<link rel="stylesheet" href="site.css"/></head>')
+            page = page.replace("</body>", "<script>init();</script></body>")
+            return f"```html\n{page}\n```"
+        return default_responder(request)
+
+    fake_services.responder = responder
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    outputs = core.convert_image_to_formats(path, ["html", "tsx"])
+    assert '<link rel="stylesheet" href="site.css"/>' in outputs["html"]
+    assert "<script>init();</script>" in outputs["html"]
+    assert "init()" not in outputs["tsx"]
@@ -0,0 +1,41 @@
+from imagecoderx import prompts
+
+
+def word(text, x1, y1, width=40):
+    return {"char": text, "x1": x1, "y1": y1, "x2": x1 + width, "y2": y1 + 12}
+
+
+BOXES = [word("Sign", 0, 0), word("in", 50, 1), word("Email", 0, 40), word("Password", 100, 80)]
+
+
+def test_count_tokens():
+    assert prompts.count_tokens("") == 0
+    assert prompts.count_tokens("Sign in") == 2
+    assert prompts.count_tokens("Notifications!") == 5
+
+
+def test_layout_lines_are_quantized():
+    assert prompts.layout_lines(BOXES, grid=4) == ["[0,0] Sign in", "[0,1] Email", "[2,3] Password"]
+
+
+def test_layout_lines_join_character_boxes_into_words():
+    # Character boxes as extract_text_from_image returns them: 8px letters, 10px word gap
+    chars = [word(c, x, 0, width=8) for c, x in zip("Signin", (0, 9, 18, 27, 45, 54))]
+    chars += [word(c, x, 40, width=8) for c, x in zip("Go", (0, 10))]
+    assert prompts.layout_lines(chars, grid=4) == ["[0,0] Sign in", "[0,3] Go"]
+
+
+def test_region_message_respects_budget():
+    boxes = [word(f"word{i}", 0, i * 20) for i in range(200)]
+    message = prompts.region_message(None, boxes, (0.1, 0.2, 0.3, 0.4), region_id=5, budget=60)
+    assert message.startswith("region_id 5 at 10,20 size 30x40\nLines: [0,0] word0")
+    assert prompts.count_tokens(message) <= 60
+
+
+def test_system_prefix_is_shared_between_regions():
+    config = {"image_interpretation_prompt": "Convert this."}
+    first = prompts.build_messages(config, "html", None, BOXES, (0, 0, 0.5, 0.1), region_id=0)
+    second = prompts.build_messages(config, "html", "Total Orders", None, (0, 0.5, 0.5, 0.1), region_id=1)
+    assert first[0] == second[0] and first[0]["role"] == "system"
+    assert "Convert this. Output format: html." in first[0]["content"]
+    assert second[1]["content"] == "region_id 1 at 0,50 size 50x10\nLines: Total Orders"
@@ -0,0 +1,26 @@
+import cv2
+import numpy as np
+
+from imagecoderx.algorithms.region_classifier import BACKGROUND, CODE, EMPTY, LOGO, classify_boxes
+from imagecoderx.core import classify_regions, detect_text_regions
+from imagecoderx.engine.regions import RegionSet
+from imagecoderx.testing import synthetic_screenshot
+
+
+def test_classify_boxes():
+    img = np.full((800, 1280, 3), 245, np.uint8)
+    cv2.putText(img, "Welcome back", (60, 280), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (30, 30, 30), 2)
+    rng = np.random.default_rng(1)
+    img[550:750, 900:1200] = cv2.resize(rng.integers(0, 255, (20, 30, 3), dtype=np.uint8), (300, 200),
+                                        interpolation=cv2.INTER_CUBIC)
+    cv2.circle(img, (100, 650), 40, (30, 80, 220), -1)
+    cv2.circle(img, (100, 650), 20, (250, 250, 250), -1)
+    boxes = [(50, 245, 300, 295), (900, 550, 1200, 750), (50, 600, 150, 700), (500, 600, 700, 700)]
+    assert classify_boxes(img, boxes).tolist() == [CODE, BACKGROUND, LOGO, EMPTY]
+
+
+def test_text_on_coloured_panels_stays_code():
+    img = synthetic_screenshot(1920, 1080, regions=10, words_per_region=24)
+    regions = RegionSet.from_boxes(detect_text_regions(img), image=img)
+    counts = classify_regions(regions)
+    assert counts == {CODE: len(regions)}
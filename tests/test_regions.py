@@ -0,0 +1,32 @@
+import numpy as np
+
+from imagecoderx.engine.html_orchestrator import combine_html_sections
+from imagecoderx.engine.regions import Region, RegionSet
+
+
+def test_crops_are_views_into_the_image():
+    img = np.zeros((100, 200, 3), dtype=np.uint8)
+    regions = RegionSet.from_boxes([(0.1, 0.2, 0.5, 0.3)], image=img)
+    crop = regions[0].crop
+    assert crop.shape == (30, 100, 3)
+    assert np.shares_memory(crop, img)
+
+
+def test_region_has_no_instance_dict():
+    region = Region((0, 0, 1, 1))
+    assert not hasattr(region, "__dict__")
+
+
+def test_legacy_positions_round_trip():
+    positions = [{"type": "logo", "relative_x": 0.1, "relative_y": 0.2, "width": 0.3, "height": 0.4, "filename": "a.png"}]
+    regions = RegionSet.from_positions(["<p>x</p>"], positions)
+    assert regions.positions() == positions
+    assert regions[0].code == "<p>x</p>"
+
+
+def test_combine_html_sections_accepts_both_forms():
+    regions = RegionSet.from_boxes([(0.1, 0.1, 0.2, 0.2)])
+    regions[0].code = "<body><p>Hello</p></body>"
+    html = combine_html_sections(regions)
+    assert "<p>Hello</p>" in html
+    assert html == combine_html_sections([regions[0].code], regions.positions())
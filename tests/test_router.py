@@ -0,0 +1,57 @@
+import json
+
+from imagecoderx import llm
+from imagecoderx.router import ModelRouter, region_complexity, reply_confidence
+from imagecoderx.testing import FakeOllamaServer, default_responder
+
+TIERS = [
+    {"name": "small", "model": "tiny", "max_complexity": 0.3},
+    {"name": "medium", "model": "mid", "max_complexity": 0.7},
+    {"name": "large", "model": "big"},
+]
+
+
+def test_region_complexity_grows_with_content():
+    short = region_complexity("Sign in", rule_confidence=0.9)
+    long = region_complexity("\n".join(["def f(x): return {x: [x]}"] * 12), nested=3, rule_confidence=0.1)
+    assert 0 <= short < 0.1 < 0.7 < long <= 1
+
+
+def test_pick_and_stats():
+    router = ModelRouter(TIERS)
+    assert [router.pick(c) for c in (0.1, 0.5, 0.9)] == [0, 1, 2]
+    assert router.final_model == "big"
+    router.record(0, accepted=False)
+    router.record(1, accepted=True)
+    router.record(None, accepted=True)
+    stats = router.stats()
+    assert stats["small"] == {"requests": 1, "accepted": 0, "escalated": 1, "share": 0.5}
+    assert stats["large"]["requests"] == 0 and stats["final"]["accepted"] == 1
+    before = router.counts()
+    router.record(2, accepted=True)
+    since = router.stats(since=before)
+    assert since["large"] == {"requests": 1, "accepted": 1, "escalated": 0, "share": 1.0}
+    assert since["small"]["requests"] == 0 and since["final"]["requests"] == 0
+
+
+def test_reply_confidence():
+    assert reply_confidence("```html\n<p>x</p>\n```") == 1.0
+    assert reply_confidence("<p>x</p>") == 0.6
+    assert reply_confidence("The image shows a login form.") == 0.0
+
+
+def test_escalates_only_on_low_confidence(tmp_path, monkeypatch):
+    def responder(request):
+        if request["model"] == "tiny":
+            return "This region contains a greeting."
+        return default_responder(request)
+
+    with FakeOllamaServer(responder=responder) as server:
+        (tmp_path / ".imagecoderx.json").write_text(json.dumps(
+            {"ollama_host": server.url, "model_tiers": TIERS, "final_model": "final"}))
+        monkeypatch.setenv("HOME", str(tmp_path))
+        assert llm.process_text_with_llm("shot.png", "Hello", [], "html", complexity=0.1) == "<body><p>Hello</p></body>"
+        assert [r["model"] for r in server.requests] == ["tiny", "mid"]
+        llm.process_text_with_llm("shot.png", "Hello", [], "html", complexity=0.9)
+        llm.process_final_html("<p>Hello</p>")
+        assert [r["model"] for r in server.requests[2:]] == ["big", "final"]
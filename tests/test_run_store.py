@@ -0,0 +1,58 @@
+import json
+import os
+
+import cv2
+import pytest
+
+from imagecoderx import core
+from imagecoderx.engine.run_store import DONE, FAILED, RunStore, run_id_for
+from imagecoderx.testing import FakeOllamaServer, default_responder, install_fake_tesseract, synthetic_screenshot
+
+
+def is_final(request):
+    return request["messages"][-1]["content"].startswith("improve")
+
+
+@pytest.fixture
+def flaky_env(tmp_path, monkeypatch):
+    """A fake server whose region requests fail while ``server.failing`` is set."""
+    def responder(request):
+        if server.failing and not is_final(request):
+            raise RuntimeError("model runner crashed")
+        return default_responder(request)
+
+    with FakeOllamaServer(responder=responder) as server:
+        server.failing = True
+        (tmp_path / ".imagecoderx.json").write_text(json.dumps(
+            {"ollama_model": "fake", "ollama_host": server.url, "fastpath": False,
+             "llm_retries": 1, "llm_retry_delay": 0.01}))
+        monkeypatch.setenv("HOME", str(tmp_path))
+        install_fake_tesseract(str(tmp_path / "bin"))
+        monkeypatch.setenv("PATH", str(tmp_path / "bin") + os.pathsep + os.environ["PATH"])
+        yield server
+
+
+def test_rerun_only_redoes_failed_regions(tmp_path, flaky_env):
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, synthetic_screenshot(640, 400, regions=4, words_per_region=3))
+    with RunStore(str(tmp_path / "run.db")) as store:
+        code = core.convert_image_to_formats(path, ["html"], store=store)["html"]
+        assert "Ollama processing failed" not in code
+        run_id = run_id_for(cv2.imread(path))
+        failed = store.stats(run_id)[FAILED]
+        # Every region was tried twice (one retry)
+        assert len([r for r in flaky_env.requests if not is_final(r)]) == 2 * failed
+        assert store.load_final(run_id) is None
+
+        flaky_env.failing = False
+        flaky_env.requests.clear()
+        core.convert_image_to_formats(path, ["html"], store=store)
+        assert len([r for r in flaky_env.requests if not is_final(r)]) == failed
+        assert store.stats(run_id) == {DONE: failed}
+        final = store.load_final(run_id)
+        assert final
+
+        # A complete run is restored without any model calls
+        flaky_env.requests.clear()
+        assert core.convert_image_to_formats(path, ["html"], store=store)["html"]
+        assert flaky_env.requests == []
@@ -0,0 +1,53 @@
+import json
+import os
+
+import cv2
+
+from imagecoderx import core, sequence
+from imagecoderx.testing import FakeOllamaServer, install_fake_tesseract, synthetic_screenshot
+
+
+def test_dhash_and_changed_boxes():
+    shot = synthetic_screenshot(640, 400, regions=4, words_per_region=3)
+    edited = shot.copy()
+    cv2.putText(edited, "NEW", (420, 300), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    assert sequence.hamming(sequence.dhash(shot), sequence.dhash(shot.copy())) == 0
+    assert sequence.changed_boxes(shot, shot.copy()) == ([], 0.0)
+    boxes, fraction = sequence.changed_boxes(shot, edited)
+    [(x, y, w, h)] = boxes
+    assert x <= 420 / 640 <= x + w and y <= 290 / 400 <= y + h and fraction < 0.05
+    other = synthetic_screenshot(640, 400, regions=9, words_per_region=5, seed=3)
+    assert sequence.hamming(sequence.dhash(shot), sequence.dhash(other)) > 12
+
+
+def test_sequence_converts_key_frames_and_diffs(tmp_path, monkeypatch):
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    shot = synthetic_screenshot(640, 400, regions=4, words_per_region=3)
+    edited = shot.copy()
+    cv2.putText(edited, "NEW", (420, 300), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    other = synthetic_screenshot(640, 400, regions=9, seed=3)
+    for i, frame in enumerate([shot, shot, edited, other], start=1):
+        cv2.imwrite(str(frames / f"frame{i}.png"), frame)
+    with FakeOllamaServer() as server:
+        home = tmp_path / "home"
+        home.mkdir()
+        (home / ".imagecoderx.json").write_text(json.dumps(
+            {"ollama_model": "fake", "ollama_host": server.url, "fastpath": False}))
+        monkeypatch.setenv("HOME", str(home))
+        install_fake_tesseract(str(tmp_path / "bin"))
+        monkeypatch.setenv("PATH", str(tmp_path / "bin") + os.pathsep + os.environ["PATH"])
+
+        def region_requests():
+            return sum(not r["messages"][-1]["content"].startswith("improve") for r in server.requests)
+
+        manifest = sequence.convert_sequence(str(frames), str(tmp_path / "out"))
+        assert [entry["kind"] for entry in manifest] == ["key", "duplicate", "diff", "key"]
+        assert manifest[1]["outputs"] == manifest[0]["outputs"]
+        assert manifest[2]["carried_regions"] > 0
+        assert os.path.exists(manifest[2]["outputs"]["html"])
+        saved = json.loads((tmp_path / "out" / "sequence.json").read_text())
+        assert [entry["kind"] for entry in saved] == ["key", "duplicate", "diff", "key"]
+        # Carried-over regions were not sent to the LLM again; the duplicate was not converted
+        detected = [len(core.detect_text_regions(frame)) for frame in (shot, edited, other)]
+        assert region_requests() == sum(detected) - manifest[2]["carried_regions"]
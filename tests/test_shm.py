@@ -0,0 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from imagecoderx.engine.shm import SharedImage, attach, run_on_crop
+
+
+def crop_sum(crop, scale=1):
+    return int(crop.sum()) * scale
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(0).integers(0, 256, (120, 200, 3), dtype=np.uint8)
+
+
+def test_workers_read_crops_from_shared_memory(image):
+    with SharedImage(image) as shared:
+        assert np.array_equal(attach(shared.handle), image)
+        boxes = [(0, 0, 50, 40), (60, 30, 200, 120)]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            sums = list(pool.map(run_on_crop, [crop_sum] * 2, [shared.handle] * 2, boxes, [2, 3]))
+        assert sums == [int(image[0:40, 0:50].sum()) * 2, int(image[30:120, 60:200].sum()) * 3]
+
+
+def test_segment_is_removed_on_error(image):
+    with pytest.raises(RuntimeError):
+        with SharedImage(image) as shared:
+            name = shared.handle[0]
+            raise RuntimeError("stage failed")
+    assert shared.closed
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    shared.close()
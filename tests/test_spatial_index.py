@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from imagecoderx.algorithms.spatial_index import (
+    SpatialIndex,
+    merge_overlapping_boxes,
+    remove_contained_boxes,
+)
+
+
+def random_boxes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 1, size=(n, 2))
+    wh = rng.uniform(0.005, 0.08, size=(n, 2))
+    return [tuple(map(float, row)) for row in np.hstack((xy, wh))]
+
+
+def brute_intersects(boxes, q):
+    qx, qy, qw, qh = q
+    return {
+        i for i, (x, y, w, h) in enumerate(boxes)
+        if x <= qx + qw and x + w >= qx and y <= qy + qh and y + h >= qy
+    }
+
+
+def test_intersects_matches_brute_force():
+    boxes = random_boxes(500)
+    index = SpatialIndex(boxes)
+    for q in random_boxes(50, seed=1):
+        assert set(index.intersects(q).tolist()) == brute_intersects(boxes, q)
+
+
+def test_containment_queries():
+    boxes = [(0, 0, 10, 10), (2, 2, 3, 3), (8, 8, 5, 5), (20, 20, 1, 1)]
+    index = SpatialIndex(boxes)
+    assert sorted(index.contained_in((0, 0, 10, 10)).tolist()) == [0, 1]
+    assert sorted(index.containing((3, 3, 1, 1)).tolist()) == [0, 1]
+    assert index.containing((30, 30, 1, 1)).tolist() == []
+
+
+def test_nearest_matches_brute_force():
+    boxes = random_boxes(400)
+    index = SpatialIndex(boxes)
+    corners = index.corners
+    for x, y in np.random.default_rng(2).uniform(-0.2, 1.2, size=(30, 2)):
+        dx = np.maximum(np.maximum(corners[:, 0] - x, 0), x - corners[:, 2])
+        dy = np.maximum(np.maximum(corners[:, 1] - y, 0), y - corners[:, 3])
+        expected = np.sort(np.hypot(dx, dy))[:5]
+        got = index.nearest(x, y, k=5)
+        assert np.allclose(index._distances(got, x, y), expected)
+
+
+def test_intersecting_pairs_matches_brute_force():
+    boxes = random_boxes(300)
+    pairs = {tuple(p) for p in SpatialIndex(boxes).intersecting_pairs().tolist()}
+    expected = {
+        (i, j) for i in range(len(boxes)) for j in brute_intersects(boxes, boxes[i]) if i < j
+    }
+    assert pairs == expected
+
+
+def test_merge_overlapping_boxes():
+    boxes = [(0, 0, 10, 10), (5, 5, 10, 10), (14, 14, 2, 2), (50, 50, 5, 5)]
+    merged = sorted(merge_overlapping_boxes(boxes))
+    assert merged == [(0.0, 0.0, 16.0, 16.0), (50.0, 50.0, 5.0, 5.0)]
+
+
+def test_remove_contained_boxes_keeps_order():
+    boxes = [(5, 5, 1, 1), (0, 0, 10, 10), (0, 0, 10, 10), (20, 20, 2, 2)]
+    assert remove_contained_boxes(boxes) == [(0, 0, 10, 10), (20, 20, 2, 2)]
+
+
+@pytest.mark.parametrize("boxes", [[], [(1, 1, 2, 2)]])
+def test_small_inputs(boxes):
+    index = SpatialIndex(boxes)
+    assert len(index.intersecting_pairs()) == 0
+    assert merge_overlapping_boxes(boxes) == [tuple(map(float, b)) for b in boxes]
+
+
+def test_locate_picks_smallest_containing_box():
+    boxes = [(0, 0, 10, 10), (2, 2, 3, 3), (20, 20, 5, 5)]
+    index = SpatialIndex(boxes)
+    points = [(3, 3), (8, 8), (22, 22), (15, 15), (-5, 0)]
+    assert index.locate(points).tolist() == [1, 0, 2, -1, -1]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from imagecoderx import llm, structured_output
+from imagecoderx.structured_output import PAGE_SCHEMA, SNIPPET_SCHEMA, parse, validate
+from imagecoderx.testing import FakeOllamaServer
+
+
+def test_validate():
+    good = {"region_id": 3, "markup": "<p>Hi</p>", "css": ""}
+    assert validate(good, SNIPPET_SCHEMA, region_id=3) is None
+    assert validate(good, SNIPPET_SCHEMA, region_id=4) == "region_id must be 4"
+    assert validate({"markup": "<p>Hi</p>", "css": ""}, SNIPPET_SCHEMA) == "missing field 'region_id'"
+    assert validate({**good, "region_id": True}, SNIPPET_SCHEMA) == "field 'region_id' must be a integer"
+    assert validate({**good, "markup": "Sure, here it is"}, SNIPPET_SCHEMA) == "markup contains no HTML tags"
+    assert validate(["x"], PAGE_SCHEMA) == "reply is not a JSON object"
+
+
+@pytest.mark.parametrize("content", [
+    '{"markup": "<p>x</p>", "css": ""}',
+    'Here you go:\n```json\n{"markup": "<p>x</p>", "css": ""}\n```',
+    'Sure! {"markup": "<p>x</p>", "css": ""} Hope that helps.',
+])
+def test_parse_repairs_common_deviations(content):
+    assert parse(content) == {"markup": "<p>x</p>", "css": ""}
+
+
+def test_parse_without_json():
+    assert parse("no json here {") is None
+
+
+def test_request_retries_with_the_validation_error():
+    replies = iter(["I think the page says hello", '{"region_id": 1, "markup": "<h1>Hello</h1>", "css": ""}'])
+    sent = []
+
+    def send(messages, schema):
+        sent.append(messages)
+        return next(replies)
+
+    data, _ = structured_output.request(send, [{"role": "user", "content": "x"}], SNIPPET_SCHEMA, region_id=1)
+    assert data["markup"] == "<h1>Hello</h1>"
+    assert len(sent) == 2 and "invalid: reply is not a JSON object" in sent[1][-1]["content"]
+
+
+def test_request_gives_up_after_retries():
+    calls = []
+    data, content = structured_output.request(lambda m, s: calls.append(1) or "nope", [], PAGE_SCHEMA, retries=1)
+    assert data is None and content == "nope" and len(calls) == 2
+
+
+def test_llm_structured_mode(tmp_path, monkeypatch):
+    with FakeOllamaServer() as server:
+        (tmp_path / ".imagecoderx.json").write_text(json.dumps(
+            {"ollama_model": "fake", "ollama_host": server.url, "structured_output": True}))
+        monkeypatch.setenv("HOME", str(tmp_path))
+        code = llm.process_text_with_llm("shot.png", "Hello", [], "html", region_id=7)
+        assert code == "<body><style>p { margin: 0; }</style><p>Hello</p></body>"
+        assert server.requests[0]["format"] == SNIPPET_SCHEMA
+        assert llm.process_final_html("<html><head></head><body>x</body></html>") == \
+            "<html><head></head><body>x</body></html>"